@@ -0,0 +1,317 @@
+"""
+Batch digest runner for a watchlist of keywords.
+
+Crawls and summarizes every keyword in one event loop: crawls are limited per platform,
+digest generation is limited separately for the LLM, and each result is saved to
+digest_history as soon as it completes.
+
+Usage:
+    python -m DailyDigest.batch --watchlist tickers.txt
+
+run_comparison runs the same pipeline for a few keywords on the shared digest loop (the
+Streamlit comparison mode); all comparisons in the process share one set of limits.
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+from datetime import datetime
+from pathlib import Path
+from loguru import logger
+
+from DailyDigest.core import DailyDigest, PLATFORM_LABELS, project_root, close_db_engines, get_digest_loop
+from DailyDigest.event_loop import CallbackRelay
+from DailyDigest.models import save_digest_history, set_digest_cache_history
+from DailyDigest.timings import StageTimings, write_metrics_log
+from MindSpider.llm_client import llm_metrics
+
+# Default concurrent crawls per platform and concurrent LLM calls
+DEFAULT_PLATFORM_LIMITS = {
+    'reddit': 2,
+    'stocktwits': 4,
+    'hackernews': 4,
+}
+DEFAULT_LLM_LIMIT = 3
+# Keywords accepted by one comparison; the shared comparison limits are at least this wide
+MAX_COMPARE_KEYWORDS = 4
+
+
+def load_watchlist(path) -> list:
+    """Read keywords from a file: one per line or comma separated, '#' starts a comment."""
+    keywords = []
+    for line in Path(path).read_text(encoding='utf-8').splitlines():
+        line = line.split('#', 1)[0]
+        for keyword in line.split(','):
+            keyword = keyword.strip()
+            if keyword and keyword not in keywords:
+                keywords.append(keyword)
+    return keywords
+
+
+async def _digest_keyword(digest: DailyDigest, keyword: str, hours: int, max_count: int,
+                          platform_limits: dict, use_cache: bool, on_result=None, crawl: bool = True, on_stage=None, keep_result: bool = False) -> dict:
+    """
+    Crawl, summarize and persist one keyword. Returns its entry for the run report.
+    crawl=False summarizes the posts already stored; on_stage(keyword, stage) is called when the
+    keyword reaches 'crawl' and 'digest'; keep_result=True adds the digest result to the entry.
+    """
+    entry = {
+        "keyword": keyword,
+        "success": False,
+        "crawl": {},
+        "timings": {},
+    }
+    keyword_start = time.perf_counter()
+    spans = StageTimings()
+
+    # Stage 1: crawl every platform, each under its own platform limit
+    async def _crawl(platform, crawl):
+        async with platform_limits[platform]:
+            start = time.perf_counter()
+            try:
+                success, msg, count = await digest.timed_crawl(platform, crawl, keyword, max_count, hours, spans)
+            except Exception as e:
+                logger.exception(f"[Batch] {keyword} {platform} crawl error: {e}")
+                success, msg, count = False, str(e), 0
+            entry["crawl"][platform] = {
+                "success": success,
+                "count": count,
+                "message": msg,
+                "seconds": round(time.perf_counter() - start, 2),
+            }
+            return success
+
+    crawl_ok = True
+    if crawl:
+        if on_stage:
+            on_stage(keyword, 'crawl')
+        crawlers = digest.platform_crawlers()
+        entry["crawl"] = {platform: {} for platform in crawlers}
+        start = time.perf_counter()
+        crawl_results = await asyncio.gather(*(_crawl(platform, c) for platform, c in crawlers.items()))
+        entry["timings"]["crawl"] = round(time.perf_counter() - start, 2)
+        crawl_ok = any(crawl_results)
+
+    if not crawl_ok:
+        entry["error"] = "爬取失败，无法生成摘要"
+    else:
+        # Stage 2: generate the digest (its LLM calls run under the digest's LLM limit)
+        if on_stage:
+            on_stage(keyword, 'digest')
+        start = time.perf_counter()
+        result = await digest.generate_digest(keyword, hours, use_cache=use_cache, timings=spans)
+        entry["timings"]["digest"] = round(time.perf_counter() - start, 2)
+        if keep_result:
+            entry["result"] = result
+
+        entry["cache_hit"] = bool(result.get("cache_hit"))
+        entry["post_count"] = result.get("post_count", 0)
+        entry["mode"] = result.get("mode")
+
+        if not result.get("success"):
+            entry["error"] = result.get("message", "")
+        else:
+            # Stage 3: persist (cached results already have a history record)
+            start = time.perf_counter()
+            history_id = result.get("history_id")
+            if not entry["cache_hit"]:
+                with spans.span("history_save") as span:
+                    saved, history_id = await asyncio.to_thread(save_digest_history, keyword, result)
+                    span["saved"] = saved
+                if saved and result.get("cache_key"):
+                    await asyncio.to_thread(set_digest_cache_history, result["cache_key"], history_id)
+            entry["timings"]["persist"] = round(time.perf_counter() - start, 2)
+            entry["history_id"] = history_id
+            entry["success"] = history_id is not None
+            if keep_result:
+                result["history_id"] = history_id
+
+    entry["timings"]["total"] = round(time.perf_counter() - keyword_start, 2)
+    entry["spans"] = spans.to_dict()["spans"]
+    write_metrics_log("batch", keyword, spans.to_dict(), hours=hours, success=entry["success"],
+                      cache_hit=entry.get("cache_hit", False), post_count=entry.get("post_count", 0))
+    logger.info(
+        f"[Batch] {keyword}: {'OK' if entry['success'] else 'FAILED'} "
+        f"(crawl {entry['timings'].get('crawl', 0)}s, digest {entry['timings'].get('digest', 0)}s)"
+    )
+    if on_result:
+        on_result(entry)
+    return entry
+
+
+async def digest_keywords(keywords, hours: int, max_count: int, platform_semaphores: dict,
+                          llm_semaphore: asyncio.Semaphore, use_cache: bool = True, on_result=None,
+                          crawl: bool = True, on_stage=None, keep_result: bool = False) -> dict:
+    """
+    Run crawl + digest for every keyword concurrently under the given semaphores
+    (llm_semaphore bounds the LLM calls only, not the rest of digest generation).
+    Returns the run report (see run_watchlist); DB engines are left open.
+    """
+    started_at = datetime.now()
+    run_start = time.perf_counter()
+    digest = DailyDigest(llm_limit=llm_semaphore)
+    entries = await asyncio.gather(*(
+        _digest_keyword(digest, keyword, hours, max_count, platform_semaphores,
+                        use_cache, on_result, crawl, on_stage, keep_result)
+        for keyword in keywords
+    ))
+
+    stage_seconds = {}
+    for entry in entries:
+        for stage, seconds in entry["timings"].items():
+            if stage != "total":
+                stage_seconds[stage] = round(stage_seconds.get(stage, 0) + seconds, 2)
+
+    succeeded = sum(1 for e in entries if e["success"])
+    return {
+        "started_at": started_at.strftime('%Y-%m-%d %H:%M:%S'),
+        "finished_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "total_seconds": round(time.perf_counter() - run_start, 2),
+        "hours": hours,
+        "succeeded": succeeded,
+        "failed": len(entries) - succeeded,
+        "stage_seconds": stage_seconds,
+        "keywords": list(entries),
+        "llm": llm_metrics.snapshot(),
+    }
+
+
+async def run_watchlist(keywords, hours: int = 24, max_count: int = 100, platform_limits: dict = None,
+                        llm_limit: int = DEFAULT_LLM_LIMIT, use_cache: bool = True, on_result=None) -> dict:
+    """
+    Run crawl + digest for every keyword concurrently.
+
+    Args:
+        keywords: keyword list
+        hours: digest time window
+        max_count: max posts per platform per keyword
+        platform_limits: {platform: concurrent crawls}, defaults to DEFAULT_PLATFORM_LIMITS
+        llm_limit: concurrent LLM calls
+        use_cache: reuse cached digests for unchanged post sets
+        on_result: called with each keyword's report entry as it completes
+
+    Returns:
+        run report: {"started_at", "finished_at", "total_seconds", "succeeded", "failed",
+                     "stage_seconds", "keywords": [...], "llm": {...}}
+    """
+    limits = dict(DEFAULT_PLATFORM_LIMITS, **(platform_limits or {}))
+    platform_semaphores = {platform: asyncio.Semaphore(n) for platform, n in limits.items()}
+    llm_semaphore = asyncio.Semaphore(llm_limit)
+    logger.info(f"[Batch] Running {len(keywords)} keywords (platform limits {limits}, LLM limit {llm_limit})")
+
+    try:
+        return await digest_keywords(keywords, hours, max_count, platform_semaphores, llm_semaphore,
+                                     use_cache, on_result)
+    finally:
+        await close_db_engines()
+
+
+_shared_limits = None
+_shared_limits_lock = threading.Lock()
+
+
+def get_shared_limits():
+    """
+    Per-platform and LLM semaphores shared by every comparison run on the digest loop.
+    Each is DEFAULT_PLATFORM_LIMITS / DEFAULT_LLM_LIMIT raised to MAX_COMPARE_KEYWORDS, so one
+    comparison runs all of its keywords side by side; concurrent comparisons queue on them together.
+    Returns: (platform_semaphores, llm_semaphore)
+    """
+    global _shared_limits
+    with _shared_limits_lock:
+        if _shared_limits is None:
+            _shared_limits = (
+                {platform: asyncio.Semaphore(max(n, MAX_COMPARE_KEYWORDS))
+                 for platform, n in DEFAULT_PLATFORM_LIMITS.items()},
+                asyncio.Semaphore(max(DEFAULT_LLM_LIMIT, MAX_COMPARE_KEYWORDS)),
+            )
+        return _shared_limits
+
+
+def run_comparison(keywords, hours: int = 24, max_count: int = 100, crawl: bool = True,
+                   use_cache: bool = True, on_result=None, on_stage=None) -> dict:
+    """
+    同步执行多关键词对比：各关键词的爬取和摘要生成在后台事件循环上并发执行，
+    共享每个平台和 LLM 的并发上限（get_shared_limits），总耗时接近单个关键词。
+    on_result: 每个关键词完成时回调 (entry)，entry["result"] 为完整摘要结果，在调用方线程执行
+    on_stage: 关键词进入新阶段时回调 (keyword, stage)，stage 为 'crawl' / 'digest'
+    返回: 运行报告（同 run_watchlist）
+    """
+    relay = CallbackRelay()
+    loop = get_digest_loop()
+
+    async def _run():
+        platform_semaphores, llm_semaphore = get_shared_limits()
+        return await digest_keywords(keywords, hours, max_count, platform_semaphores, llm_semaphore,
+                                     use_cache, relay.wrap(on_result), crawl, relay.wrap(on_stage),
+                                     keep_result=True)
+
+    report = loop.run(_run(), relay=relay)
+    logger.info(f"[Batch] Comparison of {', '.join(keywords)}: {report['succeeded']}/{len(keywords)} "
+                f"succeeded in {report['total_seconds']}s")
+    return report
+
+
+def print_report(report: dict):
+    """Print a short per-keyword table of the run report."""
+    print(f"\nDaily Digest batch: {report['succeeded']} succeeded, {report['failed']} failed, "
+          f"{report['total_seconds']}s total")
+    print(f"{'keyword':<12}{'status':<8}{'posts':>6}{'crawl':>8}{'digest':>8}{'persist':>9}  crawl counts")
+    for entry in report["keywords"]:
+        timings = entry["timings"]
+        counts = " | ".join(
+            f"{PLATFORM_LABELS.get(p, p)}: {r.get('count', 0)}" for p, r in entry["crawl"].items()
+        )
+        status = "cached" if entry["success"] and entry.get("cache_hit") else ("ok" if entry["success"] else "failed")
+        print(f"{entry['keyword']:<12}{status:<8}{entry.get('post_count', 0):>6}"
+              f"{timings.get('crawl', 0):>8}{timings.get('digest', 0):>8}{timings.get('persist', 0):>9}  {counts}")
+        if entry.get("error"):
+            print(f"{'':<12}{entry['error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Daily Digest 批量生成（关注列表）")
+    parser.add_argument("--watchlist", required=True, help="关键词文件，每行一个或以逗号分隔")
+    parser.add_argument("--hours", type=int, default=24, help="时间窗口（小时）")
+    parser.add_argument("--max-count", type=int, default=100, help="每个平台每个关键词最大爬取数量")
+    parser.add_argument("--reddit-concurrency", type=int, default=DEFAULT_PLATFORM_LIMITS['reddit'])
+    parser.add_argument("--stocktwits-concurrency", type=int, default=DEFAULT_PLATFORM_LIMITS['stocktwits'])
+    parser.add_argument("--hackernews-concurrency", type=int, default=DEFAULT_PLATFORM_LIMITS['hackernews'])
+    parser.add_argument("--llm-concurrency", type=int, default=DEFAULT_LLM_LIMIT, help="同时进行的 LLM 调用数量")
+    parser.add_argument("--no-cache", action="store_true", help="不使用摘要缓存")
+    parser.add_argument("--report", help="运行报告 JSON 路径，默认写入 logs/ 目录")
+    args = parser.parse_args(argv)
+
+    keywords = load_watchlist(args.watchlist)
+    if not keywords:
+        print(f"No keywords found in {args.watchlist}")
+        return 1
+
+    report = asyncio.run(run_watchlist(
+        keywords,
+        hours=args.hours,
+        max_count=args.max_count,
+        platform_limits={
+            'reddit': args.reddit_concurrency,
+            'stocktwits': args.stocktwits_concurrency,
+            'hackernews': args.hackernews_concurrency,
+        },
+        llm_limit=args.llm_concurrency,
+        use_cache=not args.no_cache,
+    ))
+
+    report_path = Path(args.report) if args.report else (
+        project_root / "logs" / f"daily_digest_batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    print_report(report)
+    print(f"\nReport saved to {report_path}")
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+Offline benchmark for generate_digest.
+
+Seeds a reproducible weibo_note fixture, runs generate_digest repeatedly against an offline
+LLM backend (stub or replay) and reports throughput plus per-stage latency percentiles.
+
+Usage:
+    python -m DailyDigest.benchmark --posts 2000 --runs 20 --concurrency 4
+    python -m DailyDigest.benchmark --db sqlite --backend stub --latency 0.5
+    python -m DailyDigest.benchmark --backend record --runs 1 --mode single   # record real responses once
+    python -m DailyDigest.benchmark --backend replay --mode single            # then replay them offline
+
+The fixture is generated relative to the current time with a fixed seed, so the same
+--posts/--hours/--seed build the same prompts in single mode and replay hits the recordings.
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime
+from pathlib import Path
+from loguru import logger
+
+from DailyDigest.core import DailyDigest, project_root, close_db_engines
+from DailyDigest.offline import seed_weibo_notes, clear_seeded_notes
+from MindSpider.DeepSentimentCrawling.MediaCrawler.database import db_session
+from MindSpider.llm_client import llm_metrics
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize_stages(results) -> dict:
+    """{stage: {"count", "p50", "p95", "max"}} over the timings of every run."""
+    by_stage = {}
+    for result in results:
+        for span in result.get("timings", {}).get("spans", []):
+            by_stage.setdefault(span["stage"], []).append(span["seconds"])
+    return {
+        stage: {
+            "count": len(values),
+            "p50": round(percentile(values, 50), 3),
+            "p95": round(percentile(values, 95), 3),
+            "max": round(max(values), 3),
+        }
+        for stage, values in by_stage.items()
+    }
+
+
+async def run_benchmark(keyword: str = "BENCH", posts: int = 500, hours: int = 24, seed: int = 42,
+                        runs: int = 10, concurrency: int = 4, backend: str = "stub", latency: float = None,
+                        mode: str = None, stream: bool = False, use_cache: bool = False,
+                        db: str = None, keep_fixture: bool = False) -> dict:
+    """
+    Seed the fixture, run generate_digest `runs` times with `concurrency` in flight, and
+    return the benchmark report.
+    """
+    if db:
+        db_session.config.SAVE_DATA_OPTION = db
+        if db == "sqlite":
+            await db_session.create_tables(db)
+
+    digest = DailyDigest(llm_backend=backend)
+    if latency is not None and hasattr(digest.llm.client, "latency"):
+        digest.llm.client.latency = latency
+    llm_metrics.reset()
+
+    try:
+        seed_start = time.perf_counter()
+        seeded = await seed_weibo_notes(keyword, posts, hours, seed)
+        seed_seconds = time.perf_counter() - seed_start
+        logger.info(f"[Benchmark] Seeded {seeded} posts for '{keyword}' in {seed_seconds:.2f}s")
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _run(i):
+            async with semaphore:
+                start = time.perf_counter()
+                result = await digest.generate_digest(
+                    keyword, hours, on_chunk=(lambda _: None) if stream else None,
+                    use_cache=use_cache, mode=mode
+                )
+                result["wall_seconds"] = time.perf_counter() - start
+                return result
+
+        run_start = time.perf_counter()
+        results = await asyncio.gather(*(_run(i) for i in range(runs)))
+        total_seconds = time.perf_counter() - run_start
+    finally:
+        if not keep_fixture:
+            await clear_seeded_notes(keyword)
+        await close_db_engines()
+
+    wall = [r["wall_seconds"] for r in results]
+    succeeded = [r for r in results if r.get("success")]
+    return {
+        "started_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "backend": backend,
+        "model": digest.llm.model_name,
+        "keyword": keyword,
+        "posts": seeded,
+        "seed": seed,
+        "runs": runs,
+        "concurrency": concurrency,
+        "mode": mode or "default",
+        "stream": stream,
+        "seed_seconds": round(seed_seconds, 3),
+        "total_seconds": round(total_seconds, 3),
+        "digests_per_second": round(runs / total_seconds, 3) if total_seconds else 0.0,
+        "succeeded": len(succeeded),
+        "parsed_cover_cards": sum(1 for r in succeeded if r.get("cover_card")),
+        "errors": sorted({r.get("message", "") for r in results if not r.get("success")}),
+        "wall_seconds": {
+            "p50": round(percentile(wall, 50), 3),
+            "p95": round(percentile(wall, 95), 3),
+            "max": round(max(wall), 3),
+        },
+        "stages": summarize_stages(results),
+        "llm": llm_metrics.snapshot(),
+    }
+
+
+def print_report(report: dict):
+    """Print throughput and the per-stage latency table."""
+    print(f"\ngenerate_digest benchmark ({report['backend']}, {report['posts']} posts, "
+          f"{report['runs']} runs x {report['concurrency']} concurrent)")
+    print(f"  {report['digests_per_second']} digests/s, {report['total_seconds']}s total, "
+          f"{report['succeeded']}/{report['runs']} succeeded, {report['parsed_cover_cards']} cover cards parsed")
+    wall = report["wall_seconds"]
+    print(f"  per digest: p50 {wall['p50']}s  p95 {wall['p95']}s  max {wall['max']}s")
+    print(f"\n  {'stage':<16}{'count':>6}{'p50':>9}{'p95':>9}{'max':>9}")
+    for stage, s in report["stages"].items():
+        print(f"  {stage:<16}{s['count']:>6}{s['p50']:>9}{s['p95']:>9}{s['max']:>9}")
+    for error in report["errors"]:
+        print(f"  error: {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="generate_digest 离线基准测试")
+    parser.add_argument("--keyword", default="BENCH", help="测试数据使用的关键词")
+    parser.add_argument("--posts", type=int, default=500, help="生成的帖子数量")
+    parser.add_argument("--hours", type=int, default=24, help="时间窗口（小时）")
+    parser.add_argument("--seed", type=int, default=42, help="测试数据随机种子")
+    parser.add_argument("--runs", type=int, default=10, help="generate_digest 调用次数")
+    parser.add_argument("--concurrency", type=int, default=4, help="同时进行的调用数")
+    parser.add_argument("--backend", default="stub", choices=["stub", "replay", "record", "gemini"],
+                        help="LLM 后端，stub/replay 不访问网络")
+    parser.add_argument("--latency", type=float, help="stub/replay 的 LLM 延迟（秒）")
+    parser.add_argument("--mode", choices=["single", "mapreduce", "auto"], help="摘要模式，默认读取 DIGEST_MODE")
+    parser.add_argument("--stream", action="store_true", help="使用流式输出")
+    parser.add_argument("--cache", action="store_true", help="启用摘要缓存（默认关闭，避免后续调用直接命中）")
+    parser.add_argument("--db", choices=["sqlite", "postgresql", "mysql"], help="数据库，默认读取 MediaCrawler 配置")
+    parser.add_argument("--keep-fixture", action="store_true", help="结束后保留测试数据")
+    parser.add_argument("--report", help="报告 JSON 路径，默认写入 logs/ 目录")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_benchmark(
+        keyword=args.keyword,
+        posts=args.posts,
+        hours=args.hours,
+        seed=args.seed,
+        runs=args.runs,
+        concurrency=args.concurrency,
+        backend=args.backend,
+        latency=args.latency,
+        mode=args.mode,
+        stream=args.stream,
+        use_cache=args.cache,
+        db=args.db,
+        keep_fixture=args.keep_fixture,
+    ))
+
+    report_path = Path(args.report) if args.report else (
+        project_root / "logs" / f"daily_digest_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    print_report(report)
+    print(f"\nReport saved to {report_path}")
+    return 0 if report["succeeded"] == report["runs"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -32,7 +32,8 @@ def clear_digest_history():
     session = get_digest_session()
     try:
         # Check if table exists first to avoid error if it's empty/missing (though model should create it)
-        session.execute(text("TRUNCATE TABLE digest_history RESTART IDENTITY CASCADE;"))
+        # The sentiment rollups are derived from digest_history, clear them together
+        session.execute(text("TRUNCATE TABLE digest_history, digest_sentiment_rollup RESTART IDENTITY CASCADE;"))
         session.commit()
         print("✅ Digest History cleared.")
     except Exception as e:
@@ -1,9 +1,16 @@
 import sys
 import os
+import re
+import json
+import time
+import hashlib
 import asyncio
+import subprocess
+import threading
+from contextlib import nullcontext
 from datetime import datetime, timedelta
 from pathlib import Path
-from sqlalchemy import select, and_
+from sqlalchemy import select, insert, update, and_, func, union_all
 from loguru import logger
 
 # Load environment variables from .env file
@@ -31,151 +38,401 @@ spec.loader.exec_module(root_config)
 settings = root_config.settings
 
 # Import database modules
-from MindSpider.DeepSentimentCrawling.MediaCrawler.database.db_session import get_session, clear_engine_cache
-from MindSpider.DeepSentimentCrawling.MediaCrawler.database.models import WeiboNote
+from MindSpider.DeepSentimentCrawling.MediaCrawler.database.db_session import get_session, close_engines
+from MindSpider.DeepSentimentCrawling.MediaCrawler.database.models import WeiboNote, numeric_text
 
 # Import prompt
-from DailyDigest.prompts import DAILY_DIGEST_PROMPT
+from DailyDigest.prompts import DAILY_DIGEST_PROMPT, CHUNK_SUMMARY_PROMPT, MAP_REDUCE_POSTS_TEXT
 
-# Import Google Gemini SDK
-from google import genai
+# Digest result cache
+from DailyDigest.models import get_cached_digest, save_digest_cache, get_cached_chunk_summaries, save_chunk_summary
+
+# Background event loop for the sync helpers
+from DailyDigest.event_loop import get_background_loop, CallbackRelay
+
+# Prompt post selection
+from DailyDigest.post_selection import select_posts, estimate_tokens
+
+# Per-stage latency spans
+from DailyDigest.timings import StageTimings, write_metrics_log
+from DailyDigest.crawl_progress import stream_crawler_process, CrawlerLogWatcher, format_progress_event
+
+# Prompt version for cache keys: changes whenever the prompt template is edited
+PROMPT_VERSION = hashlib.sha256(DAILY_DIGEST_PROMPT.encode('utf-8')).hexdigest()[:12]
+CHUNK_PROMPT_VERSION = hashlib.sha256(CHUNK_SUMMARY_PROMPT.encode('utf-8')).hexdigest()[:12]
+
+# Shared async LLM client (pooled, rate-limited, retried)
+from MindSpider.llm_client import GeminiClient, StubLLMClient, ReplayLLMClient
+
+# LLM backend: "gemini" (default), "stub" (offline synthetic responses with a fixed latency),
+# "record" (call Gemini and save each response by prompt hash) or "replay" (serve saved
+# responses only, no network). stub/replay let generate_digest be benchmarked offline.
+LLM_BACKEND = os.getenv("DIGEST_LLM_BACKEND", "gemini").lower()
+STUB_LATENCY = float(os.getenv("DIGEST_LLM_STUB_LATENCY", "1.5"))
+REPLAY_DIR = project_root / os.getenv("DIGEST_LLM_REPLAY_DIR", "logs/llm_replay")
+
+# Per-platform crawl deadlines (seconds)
+CRAWL_TIMEOUTS = {
+    'reddit': 120,
+    'stocktwits': 60,
+    'hackernews': 60,
+}
+
+PLATFORM_LABELS = {
+    'reddit': 'Reddit',
+    'stocktwits': 'Stocktwits',
+    'hackernews': 'HN',
+}
+
+# Crawl mode: "inprocess" runs MediaCrawler inside the current event loop,
+# "subprocess" keeps the old isolated `main.py` child process per platform.
+CRAWL_MODE = os.getenv("DAILY_DIGEST_CRAWL_MODE", "inprocess").lower()
+
+# Prompt post selection: token budget for the posts block and per-post character cap
+POST_TOKEN_BUDGET = int(os.getenv("DIGEST_POST_TOKEN_BUDGET", "40000"))
+POST_MAX_CHARS = int(os.getenv("DIGEST_POST_MAX_CHARS", "1500"))
+# Most recent posts read per digest (memory bound for long windows on busy tickers, 0 = no limit);
+# the result is flagged "truncated" when older posts of the window were left out
+POST_MAX_ROWS = int(os.getenv("DIGEST_MAX_POSTS", "50000"))
+
+# Digest mode: "single" sends one budgeted prompt, "mapreduce" summarizes chunks first,
+# "auto" switches to map-reduce when the de-duplicated posts exceed POST_TOKEN_BUDGET.
+DIGEST_MODE = os.getenv("DIGEST_MODE", "auto").lower()
+# Map-reduce tuning: tokens per chunk, time bucket used to align chunks across
+# overlapping windows, concurrent chunk LLM calls, and the total posts cap
+MAP_CHUNK_TOKENS = int(os.getenv("DIGEST_MAP_CHUNK_TOKENS", "12000"))
+MAP_BUCKET_HOURS = float(os.getenv("DIGEST_MAP_BUCKET_HOURS", "3"))
+MAP_CONCURRENCY = int(os.getenv("DIGEST_MAP_CONCURRENCY", "4"))
+MAP_MAX_TOKENS = int(os.getenv("DIGEST_MAP_MAX_TOKENS", "400000"))
+
+_media_crawler_runner = None
+
+def _load_media_crawler_runner():
+    """
+    Import MediaCrawler's in-process runner (MediaCrawler/runner.py).
+    MediaCrawler uses top-level imports such as `import config`, which clash with the
+    project's root config.py. Its root is put first on sys.path and any foreign `config`
+    module is set aside while the crawler modules bind to MediaCrawler's own config package.
+    """
+    global _media_crawler_runner
+    if _media_crawler_runner is not None:
+        return _media_crawler_runner
+
+    saved_config = sys.modules.get('config')
+    if saved_config is not None and not hasattr(saved_config, 'SAVE_DATA_OPTION'):
+        del sys.modules['config']
+    else:
+        saved_config = None
+    sys.path.insert(0, str(media_crawler_root))
+    try:
+        runner_spec = importlib.util.spec_from_file_location("media_crawler_runner", media_crawler_root / "runner.py")
+        runner = importlib.util.module_from_spec(runner_spec)
+        runner_spec.loader.exec_module(runner)
+        runner.preload_platforms(CRAWL_TIMEOUTS.keys())
+    finally:
+        sys.path.remove(str(media_crawler_root))
+        if saved_config is not None:
+            sys.modules['config'] = saved_config
+
+    _media_crawler_runner = runner
+    return runner
+
+def time_threshold_ms(hours: int) -> int:
+    """Millisecond timestamp for `hours` ago, matching WeiboNote.create_time."""
+    return int((datetime.now() - timedelta(hours=hours)).timestamp() * 1000)
+
+def fingerprint_posts(posts) -> str:
+    """Hash of the selected post set: note ids plus their last_modify_ts."""
+    parts = sorted(f"{p.note_id}:{p.last_modify_ts or 0}" for p in posts)
+    return hashlib.sha256("\n".join(parts).encode('utf-8')).hexdigest()
+
+def digest_cache_key(keyword: str, hours: int, model_name: str, post_fingerprint: str, mode: str = "single") -> str:
+    """Content-addressed cache key for a digest result."""
+    raw = f"{keyword}|{hours}|{model_name}|{PROMPT_VERSION}|{mode}|{post_fingerprint}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def chunk_posts(posts, chunk_tokens: int = MAP_CHUNK_TOKENS, bucket_hours: float = MAP_BUCKET_HOURS):
+    """
+    Split posts into map-reduce chunks.
+    Posts are grouped into fixed wall-clock buckets first, so two overlapping windows
+    produce identical chunks (and chunk cache hits) for the buckets they share;
+    a bucket larger than chunk_tokens is split in (create_time, note_id) order.
+    """
+    bucket_ms = max(int(bucket_hours * 3_600_000), 1)
+    chunks = []
+    current, current_tokens, current_bucket = [], 0, None
+    for post in sorted(posts, key=lambda p: (p.create_time or 0, p.note_id)):
+        bucket = (post.create_time or 0) // bucket_ms
+        tokens = getattr(post, "tokens", 0) or estimate_tokens(post.content or "")
+        if current and (bucket != current_bucket or current_tokens + tokens > chunk_tokens):
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(post)
+        current_tokens += tokens
+        current_bucket = bucket
+    if current:
+        chunks.append(current)
+    return chunks
+
+def chunk_cache_key(keyword: str, model_name: str, chunk_text: str) -> str:
+    """Cache key of a chunk summary, addressed by the chunk's prompt input."""
+    raw = f"{keyword}|{model_name}|{CHUNK_PROMPT_VERSION}|{chunk_text}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def visible_summary(response_text: str) -> str:
+    """Markdown part of a (possibly partial) LLM response, without the trailing cover-card JSON."""
+    return response_text.split("```json")[0]
+
+def parse_digest_response(response_text: str):
+    """
+    Split the LLM response into the markdown summary and the trailing cover-card JSON.
+    Returns: (summary: str, cover_card: dict)
+    """
+    summary = response_text
+    cover_card_data = {}
+    
+    try:
+        # Robust extraction: Split by the start of the JSON code block
+        if "```json" in response_text:
+            parts = response_text.split("```json")
+            summary = parts[0].strip()
+            json_text = parts[-1].split("```")[0].strip() # Take content between ```json and next ```
+            try:
+                cover_card_data = json.loads(json_text)
+            except:
+                 # Fallback if json is malformed, try finding brace
+                 match = re.search(r'(\{.*\})', json_text, re.DOTALL)
+                 if match:
+                     cover_card_data = json.loads(match.group(1))
+        else:
+            # Fallback logic if no code block found
+            last_brace_idx = response_text.rfind('{')
+            if last_brace_idx != -1:
+                json_text = response_text[last_brace_idx:]
+                if json_text.strip().endswith("}"):
+                     try:
+                         cover_card_data = json.loads(json_text)
+                         summary = response_text[:last_brace_idx].strip()
+                     except:
+                         pass
+    except Exception as e:
+        logger.warning(f"Failed to parse cover card JSON: {e}")
+    
+    return summary, cover_card_data
 
 class SimpleLLM:
-    """Simple wrapper around Google Gemini API"""
-    def __init__(self):
+    """
+    Simple wrapper around Google Gemini API (async, via the shared LLM client).
+    limit: optional asyncio.Semaphore held for the duration of each call (shared by several digests).
+    """
+    def __init__(self, backend: str = None, limit: asyncio.Semaphore = None):
+        backend = (backend or LLM_BACKEND).lower()
+        self.limit = limit or nullcontext()
         # Load Google Gemini config from environment
         api_key = os.getenv("GOOGLE_API_KEY")
         model_name = os.getenv("GOOGLE_MODEL_NAME", "gemini-2.0-flash-exp")
+
+        if backend == "stub":
+            # Own model name, so stub results never share digest cache entries with real ones
+            from DailyDigest.offline import stub_digest_response
+            self.client = StubLLMClient(responder=stub_digest_response, model_name="stub", latency=STUB_LATENCY)
+            self.model_name = "stub"
+            self.backend = backend
+            logger.info(f"[SimpleLLM] Initialized offline stub (latency {STUB_LATENCY}s)")
+            return
+        if backend not in ("gemini", "record", "replay"):
+            raise ValueError(f"Unknown DIGEST_LLM_BACKEND: {backend}")
         
-        if not api_key:
+        if not api_key and backend != "replay":
             raise ValueError("GOOGLE_API_KEY is not configured in .env file")
         
         # Configure Google Gemini
-        self.client = genai.Client(api_key=api_key)
+        self.client = GeminiClient(api_key=api_key, model_name=model_name)
         self.model_name = model_name
+        self.backend = backend
+        if backend in ("record", "replay"):
+            self.client = ReplayLLMClient(
+                REPLAY_DIR, mode=backend, inner=self.client if backend == "record" else None, model_name=model_name
+            )
         
-        logger.info(f"[SimpleLLM] Initialized Google Gemini: {model_name}")
+        logger.info(f"[SimpleLLM] Initialized Google Gemini: {model_name} (backend {backend})")
     
-    def chat(self, prompt: str) -> str:
+    async def chat(self, prompt: str) -> str:
         """Simple chat interface using Google Gemini"""
-        try:
+        async with self.limit:
             logger.info(f"[SimpleLLM] Sending request to {self.model_name}")
-            
-            # Generate content using Gemini
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt
-            )
-            
-            # Extract text from response
-            if response and response.text:
-                logger.info(f"[SimpleLLM] Received response ({len(response.text)} chars)")
-                return response.text
-            else:
-                logger.error("[SimpleLLM] Empty response from Gemini")
-                raise ValueError("Empty response from Gemini API")
-                
-        except Exception as e:
-            logger.error(f"[SimpleLLM] Error calling Gemini API: {e}")
-            raise
+            response_text = await self.client.complete(prompt)
+        logger.info(f"[SimpleLLM] Received response ({len(response_text)} chars)")
+        return response_text
+
+    async def chat_stream(self, prompt: str):
+        """Streaming chat interface, yields text chunks as Gemini produces them"""
+        async with self.limit:
+            logger.info(f"[SimpleLLM] Streaming request to {self.model_name}")
+            async for text in self.client.stream(prompt):
+                yield text
 
 class DailyDigest:
-    def __init__(self):
-        self.llm = SimpleLLM()
+    def __init__(self, crawl_mode: str = None, llm_backend: str = None, on_crawl_progress=None,
+                 llm_limit: asyncio.Semaphore = None):
+        """
+        on_crawl_progress(platform, event): optional, called with each crawler progress event
+        (pages, cursors, totals; see crawl_progress.parse_progress_line) while the crawls run.
+        llm_limit: optional semaphore bounding concurrent LLM calls (map chunks and the final prompt).
+        """
+        self.llm = SimpleLLM(llm_backend, limit=llm_limit)
+        self.crawl_mode = crawl_mode or CRAWL_MODE
+        self.on_crawl_progress = on_crawl_progress
+
+    def _report_crawl_progress(self, platform: str, event: dict):
+        logger.info(f"[DailyDigest] {platform} progress: {format_progress_event(event)}")
+        if self.on_crawl_progress:
+            self.on_crawl_progress(platform, event)
     
-    async def _run_media_crawler_subprocess(self, platform: str, keyword: str, max_count: int):
+    async def _run_media_crawler(self, platform: str, keyword: str, max_count: int):
         """
-        Helper to run the MediaCrawler subprocess with config patching
+        Run one platform crawl using the configured crawl mode.
+        Returns (success, error, blocked): success is False when the in-process runner raised or
+        the subprocess exited non-zero; blocked is True when the crawler reported a 403 / block.
         """
-        import subprocess
-        import shutil
-        import re
-        
-        # Paths
-        temp_config_path = media_crawler_root / "config" / "base_config_temp.py"
-        original_config_path = media_crawler_root / "config" / "base_config.py"
-        backup_path = media_crawler_root / "config" / "base_config_backup.py"
+        blocked = []
+
+        def on_progress(platform, event):
+            if event['kind'] == 'blocked':
+                blocked.append(event)
+            self._report_crawl_progress(platform, event)
 
+        if self.crawl_mode == 'subprocess':
+            res = await self._run_media_crawler_subprocess(platform, keyword, max_count, on_progress=on_progress)
+            success = res.returncode == 0
+            error = "" if success else f"{platform} crawler exited with code {res.returncode}"
+        else:
+            res = await self._run_media_crawler_in_process(platform, keyword, max_count, on_progress=on_progress)
+            success, error = res.success, res.error
+        if blocked:
+            logger.error(f"[DailyDigest] {platform} crawler detected 403 Forbidden/Blocked.")
+        return success, error, bool(blocked)
+
+    async def _run_media_crawler_in_process(self, platform: str, keyword: str, max_count: int, timeout: int = None,
+                                            on_progress=None):
+        """
+        Run MediaCrawler inside the current event loop with an immutable per-run config.
+        Returns the runner's CrawlRunResult.
+        """
+        runner = _load_media_crawler_runner()
+        if timeout is None:
+            timeout = CRAWL_TIMEOUTS.get(platform, 60)
+
+        logger.info(f"[DailyDigest] Running {platform} crawler in-process (timeout {timeout}s)")
         try:
-            # 1. Update Config
-            # Backup
-            shutil.copy(original_config_path, backup_path)
-            
-            # Read & Modify
-            with open(original_config_path, 'r', encoding='utf-8') as f:
-                original_content = f.read()
-            
-            modified_content = original_content
-            # Note: We only replace KEYWORDS and MAX_NOTES_COUNT. Platform is passed via CLI.
-            # But the Crawler reads config.KEYWORDS.
-            modified_content = re.sub(r'KEYWORDS = .*', f'KEYWORDS = "{keyword}"', modified_content)
-            modified_content = re.sub(r'CRAWLER_MAX_NOTES_COUNT = .*', f'CRAWLER_MAX_NOTES_COUNT = {max_count}', modified_content)
-            
-            with open(original_config_path, 'w', encoding='utf-8') as f:
-                f.write(modified_content)
-            
-            # 2. Run Subprocess
-            cmd = [
-                'python3',
-                str(media_crawler_root / 'main.py'),
-                '--platform', platform,
-                '--lt', 'qrcode',
-                '--type', 'search',
-                '--save_data_option', 'postgresql'
-            ]
-            
-            logger.info(f"[DailyDigest] Running {platform} crawler: {' '.join(cmd)}")
-            
-            res = subprocess.run(
-                cmd,
-                cwd=str(media_crawler_root),
-                capture_output=True,
-                text=True,
-                timeout=120 if platform == 'reddit' else 60
-            )
+            with CrawlerLogWatcher(platform, on_progress or self._report_crawl_progress, keyword,
+                                   runner.crawl_run_config_var):
+                res = await asyncio.wait_for(
+                    runner.run_crawl(platform, [keyword], max_count, save_data_option='postgresql'),
+                    timeout=timeout
+                )
+        except asyncio.TimeoutError:
+            logger.error(f"[DailyDigest] {platform} crawler timed out after {timeout}s")
+            raise TimeoutError(f"{platform} crawler timed out after {timeout}s")
 
-            # 3. Restore Config
-            shutil.move(backup_path, original_config_path)
-            
-            # 4. Log Output
-            tag = platform.upper()
-            logger.info(f"[DailyDigest] --- {tag} STDOUT ---\n{res.stdout or ''}")
-            if res.stderr:
-                logger.warning(f"[DailyDigest] --- {tag} STDERR ---\n{res.stderr}")
+        logger.info(f"[DailyDigest] {platform} in-process crawl finished in {res.duration_seconds:.1f}s (success={res.success})")
+        return res
 
-            return res
+    async def _run_media_crawler_subprocess(self, platform: str, keyword: str, max_count: int, timeout: int = None,
+                                            on_progress=None):
+        """
+        Helper to run the MediaCrawler subprocess.
+        Keyword and max count are passed on the command line instead of patching
+        base_config.py, so several platforms can crawl at the same time.
+        Output is streamed while the crawler runs: progress lines go to on_crawl_progress and
+        the raw output to logs/crawler/<platform>.log; res.stdout/res.stderr hold only the tail.
+        """
+        if timeout is None:
+            timeout = CRAWL_TIMEOUTS.get(platform, 60)
 
-        except Exception as e:
-            logger.error(f"[DailyDigest] Error in _run_media_crawler_subprocess for {platform}: {e}")
-            # Ensure config restore if error
-            if backup_path.exists():
-                 try:
-                     shutil.move(backup_path, original_config_path)
-                 except:
-                     pass
-            raise e
+        cmd = [
+            'python3',
+            str(media_crawler_root / 'main.py'),
+            '--platform', platform,
+            '--lt', 'qrcode',
+            '--type', 'search',
+            '--keywords', keyword,
+            '--max_notes_count', str(max_count),
+            '--save_data_option', 'postgresql'
+        ]
+
+        logger.info(f"[DailyDigest] Running {platform} crawler (timeout {timeout}s): {' '.join(cmd)}")
+        try:
+            res = await stream_crawler_process(cmd, platform, cwd=str(media_crawler_root), timeout=timeout,
+                                               on_progress=on_progress or self._report_crawl_progress)
+        except subprocess.TimeoutExpired:
+            logger.error(f"[DailyDigest] {platform} crawler timed out after {timeout}s")
+            raise
+
+        if res.returncode != 0:
+            logger.warning(f"[DailyDigest] {platform} crawler exited with code {res.returncode}, "
+                           f"last output:\n{res.stderr[-2000:] or res.stdout[-2000:]}")
+        else:
+            logger.info(f"[DailyDigest] {platform} crawler finished")
+
+        return res
 
     async def _get_platform_count(self, keyword, platform, hours=24):
-        posts = await self.get_recent_posts(keyword, hours)
-        # simplistic filter since get_recent_posts fetches all for keyword
-        return sum(1 for p in posts if p.platform == platform)
+        stats = await self.get_platform_stats(keyword, hours, platform=platform)
+        return stats.get(platform, {}).get('count', 0)
+
+    async def get_platform_stats(self, keyword: str, hours: int = 24, platform: str = None, with_engagement: bool = False):
+        """
+        Count posts per platform for the keyword in the last N hours with one GROUP BY query.
+        with_engagement=True also sums likes and comments (stored as text, non-numeric values count as 0).
+        Returns: {platform: {"count": int, "liked": int, "comments": int}}
+        """
+        try:
+            columns = [WeiboNote.platform, func.count(WeiboNote.id)]
+            if with_engagement:
+                columns += [
+                    func.coalesce(func.sum(numeric_text(WeiboNote.liked_count)), 0),
+                    func.coalesce(func.sum(numeric_text(WeiboNote.comments_count)), 0),
+                ]
+
+            conditions = [
+                WeiboNote.source_keyword == keyword,
+                WeiboNote.create_time >= time_threshold_ms(hours)
+            ]
+            if platform:
+                conditions.append(WeiboNote.platform == platform)
+
+            stmt = select(*columns).where(and_(*conditions)).group_by(WeiboNote.platform)
+
+            async with get_session() as session:
+                if not session:
+                    logger.error("Failed to get database session")
+                    return {}
+                rows = (await session.execute(stmt)).all()
+
+            stats = {}
+            for row in rows:
+                entry = {"count": int(row[1])}
+                if with_engagement:
+                    entry["liked"] = int(row[2])
+                    entry["comments"] = int(row[3])
+                stats[row[0]] = entry
+            return stats
+        except Exception as e:
+            logger.exception(f"Error counting posts: {e}")
+            return {}
 
     async def crawl_reddit(self, keyword: str, max_count: int = 100, hours: int = 24):
         try:
-            res = await self._run_media_crawler_subprocess('reddit', keyword, max_count)
+            success, error, blocked = await self._run_media_crawler('reddit', keyword, max_count)
             count = await self._get_platform_count(keyword, 'reddit', hours)
             
-            # Check 403 / Block
-            combined_output = (res.stdout or "") + (res.stderr or "")
-            crawler_blocked = False
-            if "403" in combined_output and ("Block" in combined_output or "whoa there" in combined_output or "Reddit" in combined_output):
-                logger.error("[DailyDigest] Reddit Crawler detected 403 Forbidden/Blocked.")
-                crawler_blocked = True
-            
-            # Fallback
-            if count == 0 and (crawler_blocked or res.returncode != 0):
+            # Fallback: only when the crawl was blocked or failed, not when the window is just quiet
+            if count == 0 and (blocked or not success):
                  # Try Tavily
                  return await self.crawl_reddit_via_tavily(keyword, max_count)
+            if not success:
+                return False, error, count
             
             return True, "Reddit Finished", count
         except Exception as e:
@@ -184,8 +441,10 @@ class DailyDigest:
 
     async def crawl_stocktwits(self, keyword: str, max_count: int = 100, hours: int = 24):
         try:
-            await self._run_media_crawler_subprocess('stocktwits', keyword, max_count)
+            success, error, _ = await self._run_media_crawler('stocktwits', keyword, max_count)
             count = await self._get_platform_count(keyword, 'stocktwits', hours)
+            if not success:
+                return False, error, count
             return True, "Stocktwits Finished", count
         except Exception as e:
             logger.error(f"[DailyDigest] crawl_stocktwits exception: {e}")
@@ -193,22 +452,81 @@ class DailyDigest:
 
     async def crawl_hackernews(self, keyword: str, max_count: int = 100, hours: int = 24):
         try:
-            await self._run_media_crawler_subprocess('hackernews', keyword, max_count)
+            success, error, _ = await self._run_media_crawler('hackernews', keyword, max_count)
             count = await self._get_platform_count(keyword, 'hackernews', hours)
+            if not success:
+                return False, error, count
             return True, "HackerNews Finished", count
         except Exception as e:
             logger.error(f"[DailyDigest] crawl_hackernews exception: {e}")
             return False, str(e), 0
 
-    async def run_crawlers(self, keyword: str, max_count: int = 100, hours: int = 24):
-        logger.info(f"[DailyDigest] Starting Multi-Platform Crawl for: {keyword} (Window: {hours}h)")
-        
-        r_success, r_msg, r_count = await self.crawl_reddit(keyword, max_count, hours)
-        s_success, s_msg, s_count = await self.crawl_stocktwits(keyword, max_count, hours)
-        h_success, h_msg, h_count = await self.crawl_hackernews(keyword, max_count, hours)
-        
-        total_msg = f"Reddit: {r_count} | Stocktwits: {s_count} | HN: {h_count}"
-        return (r_success or s_success or h_success), total_msg, (r_count + s_count + h_count)
+    def platform_crawlers(self):
+        """Crawl coroutine per platform: crawl(keyword, max_count, hours) -> (success, message, count)"""
+        return {
+            'reddit': self.crawl_reddit,
+            'stocktwits': self.crawl_stocktwits,
+            'hackernews': self.crawl_hackernews,
+        }
+
+    async def timed_crawl(self, platform, crawl, keyword, max_count, hours, timings: StageTimings):
+        """Run one platform crawl inside a crawl.<platform> span."""
+        with timings.span(f"crawl.{platform}", mode=self.crawl_mode) as span:
+            success, msg, count = await crawl(keyword, max_count, hours)
+            span.update(success=success, rows=count)
+        return success, msg, count
+
+    async def iter_crawl_results(self, keyword: str, max_count: int = 100, hours: int = 24,
+                                 timings: StageTimings = None):
+        """
+        Run every platform crawler concurrently.
+        Yields (platform, success, message, count) as soon as each platform finishes.
+        """
+        timings = timings if timings is not None else StageTimings()
+
+        async def _run(platform, crawl):
+            success, msg, count = await self.timed_crawl(platform, crawl, keyword, max_count, hours, timings)
+            return platform, success, msg, count
+
+        tasks = [asyncio.create_task(_run(p, c)) for p, c in self.platform_crawlers().items()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def run_crawlers(self, keyword: str, max_count: int = 100, hours: int = 24,
+                           concurrent: bool = True, on_platform_done=None, timings: StageTimings = None):
+        """
+        Crawl all platforms for the keyword.
+        concurrent=True runs them at the same time, so latency is set by the slowest platform.
+        on_platform_done(platform, success, message, count) is called as each platform finishes.
+        timings: optional StageTimings that receives one crawl.<platform> span per platform.
+        """
+        logger.info(f"[DailyDigest] Starting Multi-Platform Crawl for: {keyword} (Window: {hours}h, concurrent={concurrent})")
+
+        timings = timings if timings is not None else StageTimings()
+        results = {}
+        if concurrent:
+            async for platform, success, msg, count in self.iter_crawl_results(keyword, max_count, hours, timings):
+                results[platform] = (success, msg, count)
+                if on_platform_done:
+                    on_platform_done(platform, success, msg, count)
+        else:
+            for platform, crawl in self.platform_crawlers().items():
+                success, msg, count = await self.timed_crawl(platform, crawl, keyword, max_count, hours, timings)
+                results[platform] = (success, msg, count)
+                if on_platform_done:
+                    on_platform_done(platform, success, msg, count)
+
+        total_msg = " | ".join(
+            f"{PLATFORM_LABELS[p]}: {results[p][2]}" for p in ('reddit', 'stocktwits', 'hackernews')
+        )
+        any_success = any(success for success, _, _ in results.values())
+        total_count = sum(count for _, _, count in results.values())
+        return any_success, total_msg, total_count
 
     async def crawl_reddit_via_tavily(self, keyword: str, max_results: int = 20):
         """
@@ -224,7 +542,9 @@ class DailyDigest:
                 
             client = TavilyClient(api_key=api_key)
             
-            response = client.search(
+            # TavilyClient is synchronous; run it in a thread so concurrent crawls keep going
+            response = await asyncio.to_thread(
+                client.search,
                 query=f'site:reddit.com "{keyword}"',
                 search_depth="advanced",
                 max_results=max_results,
@@ -239,57 +559,62 @@ class DailyDigest:
             
             logger.info(f"[DailyDigest] Tavily found {len(results)} results (Last 3 days). Saving to DB...")
             
-            saved_count = 0
+            # Map every result to a row first; note_id is a stable hash of the URL
+            current_ts = int(datetime.now().timestamp() * 1000)
+            rows = {}
+            for item in results:
+                url = item.get('url', '')
+                content = item.get('content', '')
+                title = item.get('title', '')
+                
+                # 简单的去重/ID生成逻辑
+                note_id_hash = int(hashlib.md5(url.encode()).hexdigest(), 16) % (10**16) # 生成一个大整数ID
+                
+                # Try to parse real publish date from Tavily
+                pub_date_str = item.get('published_date')
+                real_create_time = current_ts # Default to NOW because we filtered by `days=3`
+                
+                if pub_date_str:
+                    try:
+                        dt = datetime.fromisoformat(pub_date_str.replace('Z', '+00:00'))
+                        real_create_time = int(dt.timestamp() * 1000)
+                    except:
+                        pass
+                
+                rows[note_id_hash] = dict(
+                    note_id=note_id_hash,
+                    note_url=url,
+                    content=f"{title}\n\n{content}", # 合并标题和摘要
+                    source_keyword=keyword,
+                    nickname="RedditUser (Via Tavily)",
+                    user_id="tavily_search",
+                    avatar="",
+                    liked_count="0",
+                    comments_count="0",
+                    shared_count="0",
+                    add_ts=current_ts,
+                    last_modify_ts=current_ts,
+                    create_time=real_create_time, 
+                    create_date_time=datetime.fromtimestamp(real_create_time/1000).strftime("%Y-%m-%d %H:%M:%S")
+                )
+            
             async with get_session() as session:
-                for item in results:
-                    # 创建伪造的 WeiboNote (Reddit Post)
-                    url = item.get('url', '')
-                    content = item.get('content', '')
-                    title = item.get('title', '')
-                    
-                    # 简单的去重/ID生成逻辑
-                    import hashlib
-                    note_id_hash = int(hashlib.md5(url.encode()).hexdigest(), 16) % (10**16) # 生成一个大整数ID
-                    
-                    # 检查是否存在
-                    stmt = select(WeiboNote).where(WeiboNote.note_id == note_id_hash)
-                    existing = (await session.execute(stmt)).scalar_one_or_none()
-                    
-                    current_ts = int(datetime.now().timestamp() * 1000)
-                    
-                    # Try to parse real publish date from Tavily
-                    pub_date_str = item.get('published_date')
-                    real_create_time = current_ts # Default to NOW because we filtered by `days=3`
-                    
-                    if pub_date_str:
-                        try:
-                            dt = datetime.fromisoformat(pub_date_str.replace('Z', '+00:00'))
-                            real_create_time = int(dt.timestamp() * 1000)
-                        except:
-                            pass
-                    
-                    if existing:
-                        existing.last_modify_ts = current_ts
-                        existing.source_keyword = keyword
-                    else:
-                        new_note = WeiboNote(
-                            note_id=note_id_hash,
-                            note_url=url,
-                            content=f"{title}\n\n{content}", # 合并标题和摘要
-                            source_keyword=keyword,
-                            nickname="RedditUser (Via Tavily)",
-                            user_id="tavily_search",
-                            avatar="",
-                            liked_count="0",
-                            comments_count="0",
-                            shared_count="0",
-                            add_ts=current_ts,
-                            last_modify_ts=current_ts,
-                            create_time=real_create_time, 
-                            create_date_time=datetime.fromtimestamp(real_create_time/1000).strftime("%Y-%m-%d %H:%M:%S")
-                        )
-                        session.add(new_note)
-                        saved_count += 1
+                # One IN query for the ids we already have, then one statement per write kind
+                existing_ids = set((await session.execute(
+                    select(WeiboNote.note_id).where(WeiboNote.note_id.in_(list(rows)))
+                )).scalars())
+                
+                if existing_ids:
+                    await session.execute(
+                        update(WeiboNote)
+                        .where(WeiboNote.note_id.in_(list(existing_ids)))
+                        .values(last_modify_ts=current_ts, source_keyword=keyword)
+                    )
+                
+                new_rows = [row for note_id, row in rows.items() if note_id not in existing_ids]
+                if new_rows:
+                    await session.execute(insert(WeiboNote), new_rows)
+                saved_count = len(new_rows)
                 
                 await session.commit()
             
@@ -299,197 +624,499 @@ class DailyDigest:
             logger.error(f"[DailyDigest] Tavily fallback failed: {e}")
             return False, str(e), 0
 
+    def recent_posts_query(self, keyword: str, hours: int = 24):
+        """
+        Projected query for the digest's posts: only the columns the digest reads, content cut
+        to POST_MAX_CHARS + 1 in SQL (selection truncates there anyway), newest first.
+        Rows support attribute access (row.content, row.liked_count...) like the ORM objects.
+        Reads one row past POST_MAX_ROWS so the caller can tell the window was cut.
+        """
+        stmt = select(
+            WeiboNote.note_id,
+            WeiboNote.note_url,
+            func.substr(WeiboNote.content, 1, POST_MAX_CHARS + 1).label("content"),
+            WeiboNote.liked_count,
+            WeiboNote.comments_count,
+            WeiboNote.platform,
+            WeiboNote.create_time,
+            WeiboNote.last_modify_ts,
+        ).where(
+            # Strict Filtering: Only include posts created within the time window
+            # We use create_time (post publish time) instead of add_ts (crawl time) for accuracy
+            and_(
+                WeiboNote.source_keyword == keyword,
+                WeiboNote.create_time >= time_threshold_ms(hours)
+            )
+        ).order_by(WeiboNote.create_time.desc())
+        if POST_MAX_ROWS > 0:
+            stmt = stmt.limit(POST_MAX_ROWS + 1)
+        return stmt
+
     async def get_recent_posts(self, keyword: str, hours: int = 24):
         """
         Fetch posts for the given keyword from the last N hours.
+        Returns (posts, truncated): compact row tuples (see recent_posts_query), not full
+        WeiboNote objects; truncated is True when the window held more than POST_MAX_ROWS
+        posts and only the newest POST_MAX_ROWS were read.
         """
         try:
-            # Calculate time threshold (milliseconds timestamp)
-            time_threshold = int((datetime.now() - timedelta(hours=hours)).timestamp() * 1000)
-            
             async with get_session() as session:
                 if not session:
                     logger.error("Failed to get database session")
-                    return []
-
-                # Query WeiboNote (which stores Reddit data)
-                # Strict Filtering: Only include posts created within the time window
-                # We use create_time (post publish time) instead of add_ts (crawl time) for accuracy
-                stmt = select(WeiboNote).where(
-                    and_(
-                        WeiboNote.source_keyword == keyword,
-                        WeiboNote.create_time >= time_threshold
-                    )
-                ).order_by(WeiboNote.create_time.desc())
-                
-                result = await session.execute(stmt)
-                posts = result.scalars().all()
-                
-                logger.info(f"Found {len(posts)} posts for keyword '{keyword}' in the last {hours} hours")
+                    return [], False
+                posts = (await session.execute(self.recent_posts_query(keyword, hours))).all()
+            
+            truncated = POST_MAX_ROWS > 0 and len(posts) > POST_MAX_ROWS
+            if truncated:
+                posts = posts[:POST_MAX_ROWS]
+                logger.warning(f"Post read capped at the newest {POST_MAX_ROWS} rows (DIGEST_MAX_POSTS), "
+                               f"older posts of the {hours}h window are not summarized")
+            logger.info(f"Found {len(posts)} posts for keyword '{keyword}' in the last {hours} hours")
+            
+            # 诊断逻辑：如果没找到帖子，检查是否有数据但关键词不匹配
+            if not posts:
+                logger.info("No posts found matching keyword strictly. Running diagnostics...")
                 
-                # 诊断逻辑：如果没找到帖子，检查是否有数据但关键词不匹配
-                if not posts:
-                    logger.info("No posts found matching keyword strictly. Running diagnostics...")
-                    
+                async with get_session() as session:
+                    if not session:
+                        return [], False
                     # 1. 检查最近1小时是否有任何数据插入
-                    diag_stmt = select(WeiboNote).order_by(WeiboNote.add_ts.desc()).limit(5)
-                    diag_res = await session.execute(diag_stmt)
-                    recent_posts = diag_res.scalars().all()
-                    
-                    if recent_posts:
-                        logger.info(f"Diagnostics: Found {len(recent_posts)} recent posts in DB (ignoring keyword):")
-                        for p in recent_posts:
-                            logger.info(f" - ID: {p.note_id}, Keyword: '{p.source_keyword}', TS: {p.add_ts}, Time: {datetime.fromtimestamp(p.add_ts/1000)}")
-                    else:
-                        logger.warning("Diagnostics: DB is empty or no recent posts found at all. Crawler might have failed.")
+                    diag_stmt = select(
+                        WeiboNote.note_id, WeiboNote.source_keyword, WeiboNote.add_ts
+                    ).order_by(WeiboNote.add_ts.desc()).limit(5)
+                    recent_posts = (await session.execute(diag_stmt)).all()
                 
-                return posts
+                if recent_posts:
+                    logger.info(f"Diagnostics: Found {len(recent_posts)} recent posts in DB (ignoring keyword):")
+                    for p in recent_posts:
+                        logger.info(f" - ID: {p.note_id}, Keyword: '{p.source_keyword}', TS: {p.add_ts}, Time: {datetime.fromtimestamp(p.add_ts/1000)}")
+                else:
+                    logger.warning("Diagnostics: DB is empty or no recent posts found at all. Crawler might have failed.")
+            
+            return posts, truncated
         except Exception as e:
             logger.exception(f"Error fetching posts: {e}")
+            return [], False
+
+    def top_posts_query(self, keyword: str, hours: int = 24, k: int = 5, platforms=None):
+        """
+        Top-k posts by likes: LIMIT k per platform (served by idx_weibo_note_keyword_platform_liked),
+        then the best k overall. Ties go to the newer post.
+        """
+        liked = numeric_text(WeiboNote.liked_count)
+        columns = [
+            func.substr(WeiboNote.content, 1, 100).label("content"),
+            WeiboNote.liked_count,
+            WeiboNote.comments_count,
+            WeiboNote.note_url,
+            WeiboNote.create_time,
+            liked.label("liked_num"),
+        ]
+        conditions = [
+            WeiboNote.source_keyword == keyword,
+            WeiboNote.create_time >= time_threshold_ms(hours)
+        ]
+        if not platforms:
+            return select(*columns).where(and_(*conditions)).order_by(
+                liked.desc(), WeiboNote.create_time.desc()
+            ).limit(k)
+
+        # Each branch is wrapped in a subquery: SQLite rejects ORDER BY/LIMIT directly inside UNION ALL
+        branches = []
+        for platform in sorted(platforms, key=str):
+            branch = select(*columns).where(and_(*conditions, WeiboNote.platform == platform)).order_by(
+                liked.desc(), WeiboNote.create_time.desc()
+            ).limit(k).subquery()
+            branches.append(select(branch))
+        per_platform = union_all(*branches).subquery()
+        return select(per_platform).order_by(
+            per_platform.c.liked_num.desc(), per_platform.c.create_time.desc()
+        ).limit(k)
+
+    async def get_top_posts(self, keyword: str, hours: int = 24, k: int = 5, platforms=None):
+        """
+        Top posts for the digest result, ranked in SQL instead of sorting every post in Python.
+        platforms: platforms present in the window (one LIMIT k branch each); None ranks all rows at once.
+        Returns: [{"content", "score", "comments", "url"}]
+        """
+        try:
+            async with get_session() as session:
+                if not session:
+                    return []
+                rows = (await session.execute(self.top_posts_query(keyword, hours, k, platforms))).all()
+            return [
+                {
+                    "content": (row.content or "") + "...",
+                    "score": row.liked_count,
+                    "comments": row.comments_count,
+                    "url": row.note_url
+                }
+                for row in rows
+            ]
+        except Exception as e:
+            logger.exception(f"Error fetching top posts: {e}")
             return []
 
+    def select_posts_for_llm(self, posts):
+        """
+        Rank, de-duplicate and pack posts into the prompt token budget.
+        """
+        selected = select_posts(posts, token_budget=POST_TOKEN_BUDGET, max_post_chars=POST_MAX_CHARS)
+        logger.info(
+            f"Selected {len(selected)}/{len(posts)} posts for the prompt "
+            f"(~{sum(p.tokens for p in selected)} tokens, budget {POST_TOKEN_BUDGET})"
+        )
+        return selected
+
     def format_posts_for_llm(self, posts):
         """
         Format posts into a text string for the LLM.
+        Expects posts already chosen by select_posts_for_llm.
         保护隐私：不包含用户ID和来源信息
         """
         if not posts:
             return "No posts found."
-            
-        formatted_text = ""
-        for i, post in enumerate(posts[:200]): # 限制到200条帖子避免超过token限制
-            # 数据映射: 
-            # content -> 标题 + 内容
-            # liked_count -> 评分/点赞数
-            # comments_count -> 评论数
-            # 为保护隐私，不显示作者信息
-            
-            formatted_text += f"帖子 {i+1}:\n"
-            formatted_text += f"链接: {post.note_url}\n"
-            formatted_text += f"内容: {post.content}\n"
-            formatted_text += f"互动数据: {post.liked_count}赞, {post.comments_count}评论\n"
-            formatted_text += "-" * 20 + "\n"
-            
-        return formatted_text
 
-    async def generate_digest(self, keyword: str, hours: int = 24):
+        # 数据映射:
+        # content -> 标题 + 内容
+        # liked_count -> 评分/点赞数
+        # comments_count -> 评论数
+        # 为保护隐私，不显示作者信息
+        separator = "-" * 20
+        return "".join(
+            f"帖子 {i+1}:\n"
+            f"链接: {post.note_url}\n"
+            f"内容: {post.content}\n"
+            f"互动数据: {post.liked_count}赞, {post.comments_count}评论\n"
+            f"{separator}\n"
+            for i, post in enumerate(posts)
+        )
+
+    def plan_digest_posts(self, posts, mode: str = None):
+        """
+        Choose the digest mode and the posts it will read.
+        Returns (mode, posts): "single" with the token-budgeted selection, or
+        "mapreduce" with every de-duplicated post up to MAP_MAX_TOKENS.
+        """
+        mode = (mode or DIGEST_MODE).lower()
+        if mode == "single":
+            return "single", self.select_posts_for_llm(posts)
+
+        all_posts = select_posts(posts, token_budget=MAP_MAX_TOKENS, max_post_chars=POST_MAX_CHARS,
+                                 platform_max_share=1.0)
+        total_tokens = sum(p.tokens for p in all_posts)
+        if mode == "auto" and total_tokens <= POST_TOKEN_BUDGET:
+            return "single", all_posts
+
+        logger.info(f"Map-reduce digest over {len(all_posts)}/{len(posts)} posts (~{total_tokens} tokens)")
+        return "mapreduce", all_posts
+
+    async def summarize_chunks(self, keyword: str, texts, post_counts):
+        """
+        Map step: summarize each chunk text with at most MAP_CONCURRENCY LLM calls in flight.
+        Cached chunk summaries are reused. Failed chunks are dropped with a warning.
+        Returns (summaries, cache_hits), summaries aligned with texts (None for failures).
+        """
+        keys = [chunk_cache_key(keyword, self.llm.model_name, text) for text in texts]
+        cached = await asyncio.to_thread(get_cached_chunk_summaries, keys)
+        semaphore = asyncio.Semaphore(MAP_CONCURRENCY)
+
+        async def _summarize(key, text, post_count):
+            if key in cached:
+                return cached[key]
+            async with semaphore:
+                prompt = CHUNK_SUMMARY_PROMPT.format(keyword=keyword, posts_text=text)
+                summary = await self.llm.chat(prompt)
+            await asyncio.to_thread(
+                save_chunk_summary, key, keyword, self.llm.model_name, CHUNK_PROMPT_VERSION, post_count, summary
+            )
+            return summary
+
+        results = await asyncio.gather(
+            *(_summarize(k, t, n) for k, t, n in zip(keys, texts, post_counts)),
+            return_exceptions=True
+        )
+        summaries = []
+        for i, r in enumerate(results):
+            if isinstance(r, Exception):
+                logger.warning(f"[MapReduce] chunk {i + 1}/{len(texts)} failed: {r}")
+                summaries.append(None)
+            else:
+                summaries.append(r)
+        return summaries, sum(1 for k in keys if k in cached)
+
+    async def map_reduce_posts_text(self, keyword: str, posts):
+        """
+        Build the posts_text for DAILY_DIGEST_PROMPT from chunk summaries.
+        If the summaries themselves exceed POST_TOKEN_BUDGET they are grouped and
+        summarized again, level by level, until they fit.
+        Returns (posts_text, stats).
+        """
+        chunks = chunk_posts(posts)
+        texts = [self.format_posts_for_llm(chunk) for chunk in chunks]
+        counts = [len(chunk) for chunk in chunks]
+        stats = {"chunk_count": len(chunks), "chunk_cache_hits": 0, "levels": 0}
+
+        while True:
+            stats["levels"] += 1
+            start_time = time.time()
+            summaries, hits = await self.summarize_chunks(keyword, texts, counts)
+            stats["chunk_cache_hits"] += hits
+            logger.info(
+                f"[MapReduce] level {stats['levels']}: {len(texts)} chunks, {hits} cached, "
+                f"{time.time() - start_time:.2f} seconds"
+            )
+
+            parts = [(s, n) for s, n in zip(summaries, counts) if s]
+            if not parts:
+                raise ValueError("All chunk summaries failed")
+
+            sections = [
+                f"批次 {i + 1}（{n} 条帖子）:\n{summary.strip()}\n"
+                for i, (summary, n) in enumerate(parts)
+            ]
+            if len(sections) == 1 or sum(estimate_tokens(t) for t in sections) <= POST_TOKEN_BUDGET:
+                break
+
+            # Group sections into chunk-sized batches for the next level
+            texts, counts = [], []
+            batch, batch_tokens, batch_posts = [], 0, 0
+            for section, (_, n) in zip(sections, parts):
+                tokens = estimate_tokens(section)
+                if batch and batch_tokens + tokens > MAP_CHUNK_TOKENS:
+                    texts.append("".join(batch))
+                    counts.append(batch_posts)
+                    batch, batch_tokens, batch_posts = [], 0, 0
+                batch.append(section)
+                batch_tokens += tokens
+                batch_posts += n
+            texts.append("".join(batch))
+            counts.append(batch_posts)
+            if len(texts) == len(sections):
+                # Every section is already chunk-sized; another level would not shrink it
+                break
+
+        posts_text = MAP_REDUCE_POSTS_TEXT.format(
+            chunk_count=len(sections), post_count=len(posts), summaries="\n".join(sections)
+        )
+        return posts_text, stats
+
+    async def generate_digest(self, keyword: str, hours: int = 24, on_chunk=None, use_cache: bool = True,
+                              mode: str = None, timings: StageTimings = None):
         """
         Generate the daily digest for the keyword.
+        If on_chunk is given, the LLM response is streamed and on_chunk(partial_summary)
+        is called with the markdown received so far; the cover card is parsed at the end.
+        With use_cache, an unchanged post set returns the cached result without calling the LLM
+        (result["cache_hit"] tells which happened).
+        mode: "single" | "mapreduce" | "auto" (default DIGEST_MODE), see plan_digest_posts.
+        timings: optional StageTimings to add the stage spans to (e.g. one that already holds
+        the crawl spans); result["timings"] always holds the spans of this call.
         """
+        timings = timings if timings is not None else StageTimings()
+
+        def _finish(result):
+            result["timings"] = timings.to_dict()
+            return result
+
         # 1. Fetch posts
-        posts = await self.get_recent_posts(keyword, hours)
+        with timings.span("db_query", hours=hours) as span:
+            posts, truncated = await self.get_recent_posts(keyword, hours)
+            span.update(rows=len(posts), truncated=truncated)
         
         if not posts:
-            return {
+            return _finish({
                 "success": False,
                 "message": f"No posts found for keyword '{keyword}' in the last {hours} hours. Please run the crawler first."
-            }
+            })
+        
+        with timings.span("select_posts", rows=len(posts)) as span:
+            mode, selected_posts = self.plan_digest_posts(posts, mode)
+            span.update(mode=mode, selected=len(selected_posts))
+
+        # Check the digest cache
+        cache_key = None
+        if use_cache:
+            with timings.span("cache_lookup") as span:
+                post_fingerprint = fingerprint_posts(selected_posts)
+                cache_key = digest_cache_key(keyword, hours, self.llm.model_name, post_fingerprint, mode)
+                cached = await asyncio.to_thread(get_cached_digest, cache_key)
+                span["hit"] = bool(cached)
+            if cached:
+                result, history_id = cached
+                logger.info(f"[DigestCache] HIT for '{keyword}' ({hours}h, {len(posts)} posts)")
+                result["cache_hit"] = True
+                result["cache_key"] = cache_key
+                # The key covers only the selected posts: report the current window, not the cached one
+                result["post_count"] = len(posts)
+                result["truncated"] = truncated
+                if history_id:
+                    result["history_id"] = history_id
+                return _finish(result)
+            logger.info(f"[DigestCache] MISS for '{keyword}' ({hours}h, {len(posts)} posts)")
             
-        # 2. Format for LLM
-        posts_text = self.format_posts_for_llm(posts)
+        # 2. Format for LLM (map-reduce mode condenses the posts into chunk summaries first)
+        map_reduce_stats = None
+        if mode == "mapreduce":
+            try:
+                with timings.span("map_reduce", posts=len(selected_posts)) as span:
+                    posts_text, map_reduce_stats = await self.map_reduce_posts_text(keyword, selected_posts)
+                    span.update(map_reduce_stats)
+            except Exception as e:
+                logger.exception(f"Error summarizing chunks: {e}")
+                return _finish({
+                    "success": False,
+                    "message": f"Error summarizing chunks: {str(e)}"
+                })
         
         # 3. Construct Prompt
-        prompt = DAILY_DIGEST_PROMPT.format(keyword=keyword, hours=hours, posts_text=posts_text)
+        with timings.span("prompt_build", posts=len(selected_posts)) as span:
+            if mode != "mapreduce":
+                posts_text = self.format_posts_for_llm(selected_posts)
+            prompt = DAILY_DIGEST_PROMPT.format(keyword=keyword, hours=hours, posts_text=posts_text)
+            span.update(prompt_chars=len(prompt), prompt_tokens=estimate_tokens(prompt))
         
         # 4. Call LLM
         try:
             logger.info(f"Generating summary for '{keyword}'...")
             logger.info(f"Prompt length: {len(prompt)} characters")
             
-            import time
-            start_time = time.time()
-            response_text = self.llm.chat(prompt)
-            end_time = time.time()
-            logger.info(f"LLM call took {end_time - start_time:.2f} seconds")
+            with timings.span("llm", model=self.llm.model_name, streamed=bool(on_chunk)) as span:
+                start_time = time.time()
+                if on_chunk:
+                    response_text = ""
+                    async for chunk in self.llm.chat_stream(prompt):
+                        if not response_text:
+                            span["first_token_seconds"] = round(time.time() - start_time, 3)
+                            logger.info(f"LLM first token after {span['first_token_seconds']:.2f} seconds")
+                        response_text += chunk
+                        on_chunk(visible_summary(response_text))
+                else:
+                    response_text = await self.llm.chat(prompt)
+                span["response_chars"] = len(response_text)
+            logger.info(f"LLM call took {time.time() - start_time:.2f} seconds")
             
             # Parse JSON from the end
-            import json
-            import re
-            
-            summary = response_text
-            cover_card_data = {}
-            
-            try:
-                # Robust extraction: Split by the start of the JSON code block
-                if "```json" in response_text:
-                    parts = response_text.split("```json")
-                    summary = parts[0].strip()
-                    json_text = parts[-1].split("```")[0].strip() # Take content between ```json and next ```
-                    try:
-                        cover_card_data = json.loads(json_text)
-                    except:
-                         # Fallback if json is malformed, try finding brace
-                         match = re.search(r'(\{.*\})', json_text, re.DOTALL)
-                         if match:
-                             cover_card_data = json.loads(match.group(1))
-                else:
-                    # Fallback logic if no code block found
-                    last_brace_idx = response_text.rfind('{')
-                    if last_brace_idx != -1:
-                        json_text = response_text[last_brace_idx:]
-                        if json_text.strip().endswith("}"):
-                             try:
-                                 cover_card_data = json.loads(json_text)
-                                 summary = response_text[:last_brace_idx].strip()
-                             except:
-                                 pass
-            except Exception as e:
-                logger.warning(f"Failed to parse cover card JSON: {e}")
+            with timings.span("parse", response_chars=len(response_text)) as span:
+                summary, cover_card_data = parse_digest_response(response_text)
+                span["cover_card"] = bool(cover_card_data)
 
-            return {
+            with timings.span("top_posts") as span:
+                top_posts = await self.get_top_posts(keyword, hours, 5, {p.platform for p in posts})
+                span["rows"] = len(top_posts)
+
+            result = {
                 "success": True,
                 "date": datetime.now().strftime("%Y-%m-%d"),
                 "summary": summary,
                 "cover_card": cover_card_data,
                 "post_count": len(posts),
-                "top_posts": [
-                    {
-                        "content": p.content[:100] + "...", 
-                        "score": p.liked_count, 
-                        "comments": p.comments_count,
-                        "url": p.note_url
-                    } 
-                    for p in sorted(posts, key=lambda x: int(x.liked_count or 0), reverse=True)[:5]
-                ]
+                "truncated": truncated,
+                "top_posts": top_posts,
+                "mode": mode
             }
+            if map_reduce_stats:
+                result["map_reduce"] = map_reduce_stats
+            
+            if cache_key:
+                with timings.span("cache_save"):
+                    await asyncio.to_thread(
+                        save_digest_cache, cache_key, keyword, hours, self.llm.model_name,
+                        PROMPT_VERSION, post_fingerprint, result, len(prompt)
+                    )
+            result["cache_hit"] = False
+            result["cache_key"] = cache_key
+            return _finish(result)
         except Exception as e:
             logger.exception(f"Error generating summary: {e}")
-            return {
+            return _finish({
                 "success": False,
                 "message": f"Error generating summary: {str(e)}"
-            }
+            })
+
+async def close_db_engines():
+    """Dispose the current loop's DB engines: digest reads and in-process crawler writes."""
+    await close_engines()
+    if _media_crawler_runner is not None:
+        await _media_crawler_runner.close_engines()
+
+_digest_loop = None
+_digest_loop_lock = threading.Lock()
+
+def get_digest_loop():
+    """
+    Background event loop shared by the sync helpers below.
+    DB engines and LLM clients stay bound to it and are reused across calls;
+    engines are disposed when the process exits.
+    """
+    global _digest_loop
+    with _digest_loop_lock:
+        if _digest_loop is None:
+            _digest_loop = get_background_loop()
+            _digest_loop.add_shutdown_hook(close_db_engines)
+        return _digest_loop
 
 # Helper functions for synchronous execution (e.g. from Streamlit)
-def run_crawl(keyword: str, max_count: int = 100, hours: int = 24):
+def run_crawl(keyword: str, max_count: int = 100, hours: int = 24, concurrent: bool = True, on_platform_done=None,
+              timings: StageTimings = None, on_progress=None):
     """
-    同步执行爬取
+    同步执行爬取 (默认各平台并发)
+    on_platform_done: 每个平台完成时回调 (platform, success, message, count)，在调用方线程执行
+    on_progress: 爬取过程中的进度回调 (platform, event)，event 为翻页/游标/累计条数等
+                 (见 crawl_progress.parse_progress_line)，同样在调用方线程执行
+    timings: 可选，传入后各平台耗时记录到该 StageTimings（后续可传给 run_digest_generation 一并输出）；
+             不传时本次爬取耗时单独写入指标日志
     返回: (success: bool, message: str, post_count: int)
     """
-    clear_engine_cache()
-    digest = DailyDigest()
-    return asyncio.run(digest.run_crawlers(keyword, max_count, hours))
+    owned = timings is None
+    timings = StageTimings() if owned else timings
+    relay = CallbackRelay()
+    digest = DailyDigest(on_crawl_progress=relay.wrap(on_progress))
+    success, message, post_count = get_digest_loop().run(
+        digest.run_crawlers(keyword, max_count, hours, concurrent, relay.wrap(on_platform_done), timings),
+        relay=relay
+    )
+    if owned:
+        write_metrics_log("crawl", keyword, timings.to_dict(), success=success, rows=post_count)
+    return success, message, post_count
 
-def run_digest_generation(keyword: str, hours: int = 24):
+def run_digest_generation(keyword: str, hours: int = 24, on_chunk=None, use_cache: bool = True, mode: str = None,
+                          timings: StageTimings = None):
     """
     同步执行摘要生成
+    on_chunk: 可选，流式输出时每收到一段文本回调 (已生成的摘要 markdown)，在调用方线程执行
+    use_cache: 帖子集合未变化时直接返回缓存结果 (result["cache_hit"] 为 True)
+    mode: single | mapreduce | auto，默认读取 DIGEST_MODE
+    timings: 可选，已包含爬取耗时的 StageTimings；各阶段耗时见 result["timings"]，并写入指标日志
     """
-    # Clear engine cache to avoid "attached to a different loop" error
-    # because asyncio.run creates a new loop each time
-    clear_engine_cache()
+    timings = timings if timings is not None else StageTimings()
+    relay = CallbackRelay()
     digest = DailyDigest()
-    result = asyncio.run(digest.generate_digest(keyword, hours))
+    result = get_digest_loop().run(
+        digest.generate_digest(keyword, hours, relay.wrap(on_chunk), use_cache, mode, timings),
+        relay=relay
+    )
     
-    # 如果生成成功，保存到历史记录
-    if result.get('success'):
+    # 如果生成成功，保存到历史记录 (命中缓存的结果已有历史记录)
+    if result.get('success') and not result.get('cache_hit'):
         try:
-            from DailyDigest.models import save_digest_history
-            success, history_id = save_digest_history(keyword, result)
+            from DailyDigest.models import save_digest_history, set_digest_cache_history
+            with timings.span("history_save") as span:
+                success, history_id = save_digest_history(keyword, result)
+                span["saved"] = success
             if success:
                 logger.info(f"Saved digest history with ID: {history_id}")
                 result['history_id'] = history_id
+                if result.get('cache_key'):
+                    set_digest_cache_history(result['cache_key'], history_id)
         except Exception as e:
             logger.warning(f"Failed to save history: {e}")
     
+    result["timings"] = timings.to_dict()
+    write_metrics_log(
+        "digest", keyword, result["timings"], hours=hours, success=bool(result.get("success")),
+        cache_hit=bool(result.get("cache_hit")), mode=result.get("mode"), post_count=result.get("post_count", 0)
+    )
     return result
 
 def run_crawl_and_digest(keyword: str, hours: int = 24, max_count: int = 100):
@@ -499,25 +1126,29 @@ def run_crawl_and_digest(keyword: str, hours: int = 24, max_count: int = 100):
         "crawl_success": bool,
         "crawl_message": str,
         "post_count": int,
-        "digest_result": dict  # 摘要结果
+        "digest_result": dict  # 摘要结果 (含爬取与生成的各阶段耗时 timings)
     }
     """
+    timings = StageTimings()
+
     # Step 1: 爬取
-    crawl_success, crawl_message, post_count = run_crawl(keyword, max_count)
+    crawl_success, crawl_message, post_count = run_crawl(keyword, max_count, timings=timings)
     
     if not crawl_success:
+        write_metrics_log("crawl", keyword, timings.to_dict(), success=False, rows=0)
         return {
             "crawl_success": False,
             "crawl_message": crawl_message,
             "post_count": 0,
             "digest_result": {
                 "success": False,
-                "message": "爬取失败，无法生成摘要"
+                "message": "爬取失败，无法生成摘要",
+                "timings": timings.to_dict()
             }
         }
     
     # Step 2: 生成摘要
-    digest_result = run_digest_generation(keyword, hours)
+    digest_result = run_digest_generation(keyword, hours, timings=timings)
     
     return {
         "crawl_success": True,
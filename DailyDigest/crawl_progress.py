@@ -0,0 +1,224 @@
+"""
+Live crawler progress.
+
+MediaCrawler logs one line per result page ("Found 25 posts in this batch", "Moving to next
+page. Cursor: t3_abc, Total: 50", ...). stream_crawler_process reads the child's stdout and
+stderr line by line while it runs, writes every line to a rotating per-platform log file and
+turns the progress lines into events for a callback, so the UI can show pages and totals
+during the crawl instead of after it. Only a bounded tail of the output is kept in memory.
+
+CrawlerLogWatcher does the same for in-process crawls by listening to the MediaCrawler logger.
+"""
+import os
+import re
+import asyncio
+import logging
+import threading
+import subprocess
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from loguru import logger
+
+CRAWL_LOG_DIR = Path(__file__).resolve().parents[1] / os.getenv("DIGEST_CRAWL_LOG_DIR", "logs/crawler")
+# Size of each raw output log and how many rotated files are kept per platform
+CRAWL_LOG_MAX_BYTES = int(os.getenv("DIGEST_CRAWL_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+CRAWL_LOG_BACKUPS = int(os.getenv("DIGEST_CRAWL_LOG_BACKUPS", "3"))
+# Last lines of each stream kept in memory (returned to the caller, e.g. for the 403 check)
+CRAWL_OUTPUT_TAIL_LINES = int(os.getenv("DIGEST_CRAWL_OUTPUT_TAIL_LINES", "500"))
+# Longest output line read from the child (asyncio's default is 64 KiB)
+CRAWL_LINE_LIMIT = 1024 * 1024
+
+# Log tag of each platform crawler
+CRAWLER_TAGS = {
+    'RedditCrawler': 'reddit',
+    'StocktwitsCrawler': 'stocktwits',
+    'HackerNewsCrawler': 'hackernews',
+}
+
+_TAG_RE = re.compile(r"\[(\w+Crawler)\]\s*(.*)")
+# (kind, pattern) tried in order against the text after the crawler tag
+_PROGRESS_PATTERNS = [
+    ('page', re.compile(r"Found (?P<found>\d+) \w+ in this batch\.? \((?:Target: (?P<target>\d+)|Total: (?P<total>\d+))\)")),
+    ('page', re.compile(r"Found (?P<found>\d+) \w+ on page (?P<page>\d+)")),
+    ('cursor', re.compile(r"Moving to next page\. Cursor: (?P<cursor>\S+), Total: (?P<total>\d+)")),
+    ('start', re.compile(r"Starting (?:search|crawl) for:? (?:keyword: |symbol: )?(?P<keyword>.+?), target: (?P<target>\d+)")),
+    ('done', re.compile(r"Search completed\. Total processed: (?P<total>\d+)")),
+    ('stop', re.compile(r"(?P<reason>No more \w+ found|No data returned|Reached already-stored \w+|No 'after' cursor)")),
+]
+_BLOCKED_RE = re.compile(r"(?<!\d)403(?!\d).*(?:Forbidden|Block|错误)|whoa there", re.IGNORECASE)
+
+
+def parse_progress_line(line: str):
+    """
+    Turn one MediaCrawler log line into a progress event, or None if it is not a progress line.
+    Event: {"platform", "kind": start|page|cursor|stop|done|blocked, "message", and whichever of
+    "found", "page", "cursor", "total", "target", "keyword", "reason" the line carries}.
+    """
+    match = _TAG_RE.search(line)
+    platform = CRAWLER_TAGS.get(match.group(1)) if match else None
+    if _BLOCKED_RE.search(line):
+        return {'platform': platform, 'kind': 'blocked', 'message': line.strip()}
+    if not match:
+        return None
+    text = match.group(2).strip()
+    for kind, pattern in _PROGRESS_PATTERNS:
+        found = pattern.search(text)
+        if found:
+            event = {'platform': platform, 'kind': kind, 'message': text}
+            for key, value in found.groupdict().items():
+                if value is not None:
+                    event[key] = int(value) if value.isdigit() and key != 'cursor' else value
+            return event
+    return None
+
+
+def format_progress_event(event: dict) -> str:
+    """Short human-readable form of a progress event (for logs and the UI)."""
+    kind = event['kind']
+    if kind == 'start':
+        return f"开始爬取，目标 {event.get('target', '?')} 条"
+    if kind == 'page':
+        page = f"第 {event['page']} 页" if 'page' in event else "本页"
+        total = f"，累计 {event['total']}" if 'total' in event else ""
+        return f"{page}找到 {event['found']} 条{total}"
+    if kind == 'cursor':
+        return f"翻页 (cursor {event['cursor']})，累计 {event['total']} 条"
+    if kind == 'done':
+        return f"爬取结束，共处理 {event['total']} 条"
+    if kind == 'blocked':
+        return "请求被拒绝 (403)"
+    return event.get('reason') or event['message']
+
+
+_crawl_log_handlers = {}
+_crawl_log_lock = threading.Lock()
+
+
+def get_crawl_output_log(platform: str) -> logging.Logger:
+    """Logger writing raw crawler output to logs/crawler/<platform>.log, rotated by size."""
+    name = f"daily_digest.crawler.{platform}"
+    with _crawl_log_lock:
+        if platform not in _crawl_log_handlers:
+            CRAWL_LOG_DIR.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(CRAWL_LOG_DIR / f"{platform}.log", maxBytes=CRAWL_LOG_MAX_BYTES,
+                                          backupCount=CRAWL_LOG_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            output_log = logging.getLogger(name)
+            output_log.setLevel(logging.INFO)
+            output_log.propagate = False
+            output_log.addHandler(handler)
+            _crawl_log_handlers[platform] = handler
+    return logging.getLogger(name)
+
+
+async def _pump_stream(stream, name: str, platform: str, output_log, tail: deque, on_progress):
+    prefix = "ERR " if name == 'stderr' else "OUT "
+    while True:
+        raw = await stream.readline()
+        if not raw:
+            return
+        line = raw.decode('utf-8', errors='replace').rstrip('\r\n')
+        tail.append(line)
+        output_log.info(prefix + line)
+        if on_progress is None:
+            continue
+        event = parse_progress_line(line)
+        if event is None:
+            continue
+        event['platform'] = event['platform'] or platform
+        try:
+            on_progress(platform, event)
+        except Exception as e:
+            logger.warning(f"[CrawlProgress] progress callback failed: {e}")
+
+
+async def stream_crawler_process(cmd: list, platform: str, cwd: str = None, timeout: float = None,
+                                 on_progress=None) -> subprocess.CompletedProcess:
+    """
+    Run a crawler subprocess, streaming its output while it runs.
+    Every line goes to the platform's rotating output log; progress lines are passed to
+    on_progress(platform, event) as they arrive.
+    Returns a CompletedProcess whose stdout/stderr hold the last CRAWL_OUTPUT_TAIL_LINES lines.
+    Raises subprocess.TimeoutExpired after `timeout` seconds; the child is killed on timeout
+    or cancellation.
+    """
+    output_log = get_crawl_output_log(platform)
+    output_log.info(f"===== {' '.join(cmd)}")
+    stdout_tail = deque(maxlen=CRAWL_OUTPUT_TAIL_LINES)
+    stderr_tail = deque(maxlen=CRAWL_OUTPUT_TAIL_LINES)
+
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        limit=CRAWL_LINE_LIMIT
+    )
+
+    async def _communicate():
+        await asyncio.gather(
+            _pump_stream(proc.stdout, 'stdout', platform, output_log, stdout_tail, on_progress),
+            _pump_stream(proc.stderr, 'stderr', platform, output_log, stderr_tail, on_progress),
+        )
+        return await proc.wait()
+
+    try:
+        returncode = await asyncio.wait_for(_communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        output_log.info(f"===== timed out after {timeout}s")
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+
+    output_log.info(f"===== exit code {returncode}")
+    return subprocess.CompletedProcess(cmd, returncode, "\n".join(stdout_tail), "\n".join(stderr_tail))
+
+
+class CrawlerLogWatcher(logging.Handler):
+    """
+    Logging handler on the MediaCrawler logger that reports progress lines of one crawl.
+    Used for in-process crawls, where there is no child output to read:
+
+        with CrawlerLogWatcher('reddit', on_progress, keyword, runner.crawl_run_config_var):
+            await runner.run_crawl('reddit', [keyword], ...)
+
+    The logger is shared by every crawl in the process. Handlers run synchronously in the
+    task that logs, so run_config_var (MediaCrawler's crawl_run_config_var) holds the config
+    of the crawl that wrote the line; lines of other crawls of the same platform are ignored.
+    Without a keyword and run_config_var only the platform is checked.
+    """
+
+    def __init__(self, platform: str, on_progress, keyword: str = None, run_config_var=None,
+                 logger_name: str = "MediaCrawler"):
+        super().__init__(level=logging.INFO)
+        self.platform = platform
+        self.on_progress = on_progress
+        self.keyword = keyword
+        self.run_config_var = run_config_var
+        self._logger = logging.getLogger(logger_name)
+
+    def _is_own_crawl(self) -> bool:
+        if self.keyword is None or self.run_config_var is None:
+            return True
+        run_config = self.run_config_var.get()
+        return run_config is not None and run_config.platform == self.platform and self.keyword in run_config.keywords
+
+    def emit(self, record):
+        try:
+            event = parse_progress_line(record.getMessage())
+            if event is not None and event['platform'] == self.platform and self._is_own_crawl():
+                self.on_progress(self.platform, event)
+        except Exception:
+            self.handleError(record)
+
+    def __enter__(self):
+        if self.on_progress is not None:
+            self._logger.addHandler(self)
+        return self
+
+    def __exit__(self, *exc):
+        self._logger.removeHandler(self)
+        return False
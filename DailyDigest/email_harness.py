@@ -0,0 +1,222 @@
+"""
+Offline harness for the email outbox.
+
+Starts an in-process SMTP server (aiosmtpd) that accepts any login and can reject a share
+of recipients with a temporary 451 (or a permanent 550) error, points the outbox at it and
+at a throwaway SQLite database, queues one report for N recipients and waits for the
+sender threads to drain the outbox. Reports throughput, delivery status, attempts per
+recipient, SMTP latency and how many SMTP sessions were opened.
+
+Usage:
+    python -m DailyDigest.email_harness --emails 200 --senders 3
+    python -m DailyDigest.email_harness --emails 50 --transient-ratio 0.2 --failures-per-recipient 2
+    python -m DailyDigest.email_harness --emails 50 --permanent-ratio 0.1 --delay 0.05
+
+Requires aiosmtpd (pip install aiosmtpd).
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+from DailyDigest import models
+from DailyDigest.email_outbox import EmailOutboxWorker, queue_report_email
+from DailyDigest.offline import stub_digest_response
+
+
+class FlakySMTPHandler:
+    """
+    aiosmtpd handler that stores delivered messages and fails chosen recipients.
+    transient: recipients answered 451 for their first `failures_per_recipient` attempts.
+    permanent: recipients always answered 550.
+    """
+
+    def __init__(self, transient=(), permanent=(), failures_per_recipient: int = 1, delay: float = 0.0):
+        self.transient = set(transient)
+        self.permanent = set(permanent)
+        self.failures_per_recipient = failures_per_recipient
+        self.delay = delay
+        self.attempts = {}
+        self.delivered = []
+        self.sessions = set()
+        self._lock = threading.Lock()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        with self._lock:
+            self.sessions.add(id(session))
+            self.attempts[address] = self.attempts.get(address, 0) + 1
+            attempt = self.attempts[address]
+        if address in self.permanent:
+            return "550 5.1.1 No such user"
+        if address in self.transient and attempt <= self.failures_per_recipient:
+            return "451 4.3.0 Try again later"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        with self._lock:
+            self.delivered.extend(envelope.rcpt_tos)
+        return "250 Message accepted for delivery"
+
+
+def _accept_any_login(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=True, auth_data=auth_data)
+
+
+def _free_port(hostname: str) -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((hostname, 0))
+        return sock.getsockname()[1]
+
+
+def start_smtp_server(handler, hostname: str = "127.0.0.1", port: int = None) -> Controller:
+    """
+    Start aiosmtpd in a background thread; AUTH is offered without TLS and accepts anything.
+    port: None picks a free port (the Controller cannot bind port 0 itself).
+    """
+    port = port or _free_port(hostname)
+    controller = Controller(handler, hostname=hostname, port=port,
+                            authenticator=_accept_any_login, auth_require_tls=False)
+    controller.start()
+    return controller
+
+
+def use_test_environment(smtp_port: int, db_url: str, hostname: str = "127.0.0.1"):
+    """Point SMTP settings and the DailyDigest database at the local stand-ins."""
+    os.environ.update({
+        "SMTP_SERVER": hostname,
+        "SMTP_PORT": str(smtp_port),
+        "SMTP_EMAIL": "digest@example.com",
+        "SMTP_PASSWORD": "harness",
+        "SMTP_STARTTLS": "false",
+        "DIGEST_DATABASE_URL": db_url,
+    })
+    models.dispose_engine()
+
+
+def wait_for_outbox(message_id: int, timeout: float = 60) -> dict:
+    """Poll until no email of the message is pending or sending; returns the final status."""
+    deadline = time.perf_counter() + timeout
+    status = models.get_outbox_status(message_id)
+    while status and status['pending'] + status['sending'] and time.perf_counter() < deadline:
+        time.sleep(0.05)
+        status = models.get_outbox_status(message_id)
+    return status
+
+
+def run_harness(emails: int = 200, senders: int = 3, transient_ratio: float = 0.0,
+                permanent_ratio: float = 0.0, failures_per_recipient: int = 1, delay: float = 0.0,
+                max_attempts: int = 3, retry_backoff: float = 0.05, seed: int = 42,
+                db_url: str = None, timeout: float = 120) -> dict:
+    """Queue one report for `emails` recipients through a local SMTP server and report the outcome."""
+    rng = random.Random(seed)
+    recipients = [f"subscriber{i}@example.com" for i in range(emails)]
+    shuffled = rng.sample(recipients, len(recipients))
+    permanent = shuffled[:int(emails * permanent_ratio)]
+    transient = shuffled[len(permanent):len(permanent) + int(emails * transient_ratio)]
+    handler = FlakySMTPHandler(transient, permanent, failures_per_recipient, delay)
+
+    tmp_dir = None
+    if not db_url:
+        tmp_dir = tempfile.TemporaryDirectory()
+        db_url = f"sqlite:///{Path(tmp_dir.name) / 'outbox.db'}"
+
+    controller = start_smtp_server(handler)
+    worker = None
+    try:
+        use_test_environment(controller.port, db_url, controller.hostname)
+        models.get_engine()
+        worker = EmailOutboxWorker(senders=senders, poll_seconds=0.05, max_attempts=max_attempts,
+                                   retry_backoff=retry_backoff)
+        worker.start()
+
+        start = time.perf_counter()
+        summary = stub_digest_response('关键词 "HARNESS"')
+        queued = queue_report_email(recipients, "Harness Digest", summary, {"ticker": "HARNESS",
+                                    "sentiment_score": 6.5, "sentiment_label": "乐观"}, "HARNESS")
+        if not queued["success"]:
+            raise RuntimeError(queued["message"])
+        enqueue_seconds = time.perf_counter() - start
+        worker.wake()
+        status = wait_for_outbox(queued["message_id"], timeout)
+        total_seconds = time.perf_counter() - start
+    finally:
+        if worker is not None:
+            worker.stop()
+        controller.stop()
+        models.dispose_engine()
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+    results = status['results']
+    latencies = sorted(r['latency_seconds'] for r in results if r['status'] == 'sent')
+    attempts = {}
+    for r in results:
+        attempts[r['attempts']] = attempts.get(r['attempts'], 0) + 1
+    return {
+        "emails": emails,
+        "senders": senders,
+        "transient_recipients": len(transient),
+        "permanent_recipients": len(permanent),
+        "enqueue_seconds": round(enqueue_seconds, 3),
+        "total_seconds": round(total_seconds, 3),
+        "emails_per_second": round(status['sent'] / total_seconds, 1) if total_seconds else 0.0,
+        "sent": status['sent'],
+        "failed": status['failed'],
+        "unfinished": status['pending'] + status['sending'],
+        "attempts": dict(sorted(attempts.items())),
+        "latency_seconds": {
+            "p50": latencies[len(latencies) // 2] if latencies else None,
+            "max": latencies[-1] if latencies else None,
+        },
+        "smtp_sessions": len(handler.sessions),
+        "delivered_to_server": len(handler.delivered),
+        "errors": sorted({r['last_error'] for r in results if r['status'] == 'failed'}),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="邮件发件箱离线测试（本地 aiosmtpd 服务器）")
+    parser.add_argument("--emails", type=int, default=200, help="收件人数量")
+    parser.add_argument("--senders", type=int, default=3, help="发送线程数（同时保持的 SMTP 连接数）")
+    parser.add_argument("--transient-ratio", type=float, default=0.0, help="返回 451 临时错误的收件人比例")
+    parser.add_argument("--failures-per-recipient", type=int, default=1, help="临时错误收件人前几次投递失败")
+    parser.add_argument("--permanent-ratio", type=float, default=0.0, help="返回 550 永久错误的收件人比例")
+    parser.add_argument("--delay", type=float, default=0.0, help="服务器每封邮件的处理延迟（秒）")
+    parser.add_argument("--max-attempts", type=int, default=3, help="每个收件人最多尝试次数")
+    parser.add_argument("--retry-backoff", type=float, default=0.05, help="重试基础退避时间（秒）")
+    parser.add_argument("--db-url", help="发件箱数据库，默认使用临时 SQLite 文件")
+    args = parser.parse_args(argv)
+    # aiosmtpd logs every SMTP command at INFO
+    logging.getLogger("mail.log").setLevel(logging.WARNING)
+
+    report = run_harness(
+        emails=args.emails,
+        senders=args.senders,
+        transient_ratio=args.transient_ratio,
+        permanent_ratio=args.permanent_ratio,
+        failures_per_recipient=args.failures_per_recipient,
+        delay=args.delay,
+        max_attempts=args.max_attempts,
+        retry_backoff=args.retry_backoff,
+        db_url=args.db_url,
+    )
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if report["unfinished"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+Email outbox: report emails are queued in the database and delivered by background threads.
+
+queue_report_email renders the report once and writes one outbox row per recipient; the
+Streamlit page only calls this and polls get_outbox_status. EmailOutboxWorker runs a few
+sender threads, each keeping one SMTP session open while there is work. Failed deliveries
+are retried with exponential backoff; every row records its status, attempts, last error
+and SMTP latency.
+
+The app starts the worker with get_outbox_worker(); emails queued by other processes
+(e.g. batch runs) are picked up at its next poll.
+"""
+import os
+import time
+import socket
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from email.mime.text import MIMEText
+from loguru import logger
+
+from DailyDigest.email_service import (
+    get_smtp_config, open_smtp, close_smtp, render_report, build_message,
+    describe_smtp_error, is_transient_smtp_error, is_connection_error,
+    SMTP_BULK_CONNECTIONS, SMTP_MAX_ATTEMPTS, SMTP_RETRY_BACKOFF
+)
+from DailyDigest.models import (
+    enqueue_email, get_email_message, claim_outbox_emails, update_outbox_email,
+    requeue_stale_emails
+)
+
+# Seconds between outbox polls when idle (enqueueing in this process wakes the senders at once)
+OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "5"))
+# Rows a sender claims at a time
+OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "10"))
+# Rows of another host stuck in 'sending' this long belong to a sender that died and are queued
+# again (rows of this host are requeued only when their sender process is gone)
+OUTBOX_STALE_SECONDS = int(os.getenv("EMAIL_OUTBOX_STALE_SECONDS", "300"))
+# Message bodies kept in memory by the senders
+MAX_CACHED_MESSAGES = 20
+
+
+class EmailOutboxWorker:
+    """Sender threads draining the email_outbox table."""
+
+    def __init__(self, senders: int = None, poll_seconds: float = None, batch_size: int = None,
+                 max_attempts: int = None, retry_backoff: float = None):
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self.senders = senders or SMTP_BULK_CONNECTIONS
+        self.poll_seconds = OUTBOX_POLL_SECONDS if poll_seconds is None else poll_seconds
+        self.batch_size = batch_size or OUTBOX_BATCH_SIZE
+        self.max_attempts = max_attempts or SMTP_MAX_ATTEMPTS
+        self.retry_backoff = SMTP_RETRY_BACKOFF if retry_backoff is None else retry_backoff
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        # Serializes claims within the process (SQLite has no SKIP LOCKED)
+        self._claim_lock = threading.Lock()
+        self._messages_lock = threading.Lock()
+        self._messages = {}
+        self._threads = []
+
+    def start(self):
+        requeued = requeue_stale_emails(socket.gethostname(), self.worker, OUTBOX_STALE_SECONDS)
+        if requeued:
+            logger.warning(f"[EmailOutbox] Re-queued {requeued} email(s) left in 'sending'")
+        for i in range(self.senders):
+            thread = threading.Thread(target=self._sender_loop, name=f"email-outbox-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"[EmailOutbox] Started {self.senders} sender(s)")
+
+    def wake(self):
+        """Check the outbox now instead of at the next poll."""
+        self._wake.set()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _sender_loop(self):
+        server = None
+        while not self._stop.is_set():
+            with self._claim_lock:
+                batch = claim_outbox_emails(self.worker, self.batch_size)
+            if not batch:
+                # Nothing due: release the SMTP session until there is work again
+                if server is not None:
+                    close_smtp(server, quit=True)
+                    server = None
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+                continue
+            for row in batch:
+                server = self._deliver(row, server)
+        if server is not None:
+            close_smtp(server, quit=True)
+
+    def _message(self, message_id: int):
+        with self._messages_lock:
+            message = self._messages.get(message_id)
+        if message is None:
+            message = get_email_message(message_id)
+            if message is None:
+                return None
+            # Encode the parts once per message, not once per recipient
+            message['parts'] = (MIMEText(message['text_body'] or '', "plain"),
+                                MIMEText(message['html_body'] or '', "html"))
+            with self._messages_lock:
+                if len(self._messages) >= MAX_CACHED_MESSAGES:
+                    self._messages.clear()
+                self._messages[message_id] = message
+        return message
+
+    def _deliver(self, row: dict, server):
+        """Send one outbox row and record the outcome. Returns the (possibly reopened) SMTP session."""
+        config = get_smtp_config()
+        if not config:
+            update_outbox_email(row['id'], status='failed',
+                                last_error="SMTP credentials (SMTP_EMAIL, SMTP_PASSWORD) are not set in .env")
+            return server
+        message = self._message(row['message_id'])
+        if message is None:
+            update_outbox_email(row['id'], status='failed', last_error="Email message not found")
+            return server
+
+        # The claim time covers the whole batch; mark when this row's delivery actually starts
+        update_outbox_email(row['id'])
+        start = time.perf_counter()
+        try:
+            if server is None:
+                server = open_smtp(config)
+            text_part, html_part = message['parts']
+            msg = build_message(config["email"], row['to_email'], message['subject'], text_part, html_part)
+            server.sendmail(config["email"], row['to_email'], msg.as_string())
+            update_outbox_email(row['id'], status='sent', last_error=None, sent_at=datetime.now(),
+                                latency_seconds=round(time.perf_counter() - start, 3))
+            return server
+        except Exception as e:
+            error = describe_smtp_error(e, config)
+            if is_connection_error(e) or isinstance(e, smtplib.SMTPConnectError):
+                # Broken session: the next delivery reconnects
+                if server is not None:
+                    close_smtp(server)
+                server = None
+            fields = {'last_error': error, 'latency_seconds': round(time.perf_counter() - start, 3)}
+            if is_transient_smtp_error(e) and row['attempts'] < self.max_attempts:
+                delay = self.retry_backoff * 2 ** (row['attempts'] - 1)
+                update_outbox_email(row['id'], status='pending',
+                                    next_attempt_at=datetime.now() + timedelta(seconds=delay), **fields)
+                logger.info(f"[EmailOutbox] {row['to_email']}: attempt {row['attempts']} failed ({error}), "
+                            f"retrying in {delay:.1f}s")
+            else:
+                update_outbox_email(row['id'], status='failed', **fields)
+                logger.warning(f"[EmailOutbox] {row['to_email']}: giving up after {row['attempts']} attempt(s): {error}")
+            return server
+
+
+def queue_report_email(recipients: list, subject: str, summary_md: str, cover_card: dict = None,
+                       ticker: str = "", date_str: str = None) -> dict:
+    """
+    Render the report once and queue it for every recipient; returns immediately.
+    Wakes this process's outbox worker if it is running.
+
+    Returns:
+        dict: {"success": bool, "message": str, "message_id": int, "queued": int}
+    """
+    recipients = list(dict.fromkeys(r.strip() for r in recipients if r and r.strip()))
+    if not recipients:
+        return {"success": False, "message": "No recipients", "message_id": None, "queued": 0}
+    if not get_smtp_config():
+        return {"success": False, "message": "SMTP credentials (SMTP_EMAIL, SMTP_PASSWORD) are not set in .env",
+                "message_id": None, "queued": 0}
+
+    try:
+        plain_text, full_html = render_report(summary_md, cover_card, ticker, date_str)
+    except Exception as e:
+        logger.error(f"Failed to render email: {e}")
+        return {"success": False, "message": f"Failed to render email: {str(e)}", "message_id": None, "queued": 0}
+
+    message_id, queued = enqueue_email(subject, plain_text, full_html, recipients)
+    if message_id is None:
+        return {"success": False, "message": "Failed to queue email", "message_id": None, "queued": 0}
+    if _outbox_worker is not None:
+        _outbox_worker.wake()
+    return {"success": True, "message": f"Queued {queued} email(s)", "message_id": message_id, "queued": queued}
+
+
+_outbox_worker = None
+_outbox_worker_lock = threading.Lock()
+
+
+def get_outbox_worker() -> EmailOutboxWorker:
+    """Process-wide outbox worker, started on first use."""
+    global _outbox_worker
+    with _outbox_worker_lock:
+        if _outbox_worker is None:
+            _outbox_worker = EmailOutboxWorker()
+            _outbox_worker.start()
+        return _outbox_worker
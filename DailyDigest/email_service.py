@@ -1,6 +1,12 @@
 import smtplib
 import os
 import re # Added for fallback
+import json
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
@@ -20,6 +26,155 @@ except ImportError:
 # Load environment variables
 load_dotenv()
 
+# Bulk sending: SMTP sessions opened in parallel, attempts per recipient and the base retry delay (seconds)
+SMTP_BULK_CONNECTIONS = int(os.getenv("SMTP_BULK_CONNECTIONS", "3"))
+SMTP_MAX_ATTEMPTS = int(os.getenv("SMTP_MAX_ATTEMPTS", "3"))
+SMTP_RETRY_BACKOFF = float(os.getenv("SMTP_RETRY_BACKOFF", "2"))
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+
+RECIPIENTS_FILES = [
+    Path(__file__).resolve().parents[1] / "SingleEngineApp" / "recipients.json",
+    Path("SingleEngineApp/recipients.json"),
+    Path("recipients.json"),
+]
+
+
+def recipients_path() -> Path:
+    """The recipients.json in use, or None."""
+    for path in RECIPIENTS_FILES:
+        if path.exists():
+            return path
+    return None
+
+
+def load_recipients() -> list:
+    """Email addresses from recipients.json (a JSON list of strings); [] when missing or invalid."""
+    path = recipients_path()
+    if path is None:
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Failed to read {path}: {e}")
+        return []
+
+
+def get_smtp_config() -> dict:
+    """SMTP settings from the environment; None when credentials are missing."""
+    sender_email = os.getenv("SMTP_EMAIL")
+    sender_password = os.getenv("SMTP_PASSWORD")
+    if not sender_email or not sender_password:
+        return None
+    return {
+        "server": os.getenv("SMTP_SERVER", "smtp.gmail.com"),
+        "port": int(os.getenv("SMTP_PORT", "587")),
+        "email": sender_email,
+        "password": sender_password,
+        # Local relays and test servers may not offer STARTTLS
+        "starttls": os.getenv("SMTP_STARTTLS", "true").lower() not in ("0", "false", "no"),
+    }
+
+
+def open_smtp(config: dict) -> smtplib.SMTP:
+    """Connected and authenticated SMTP session."""
+    # Choose valid connection method based on port
+    if config["port"] == 465:
+        # Implicit SSL
+        server = smtplib.SMTP_SSL(config["server"], config["port"], timeout=SMTP_TIMEOUT)
+    else:
+        server = smtplib.SMTP(config["server"], config["port"], timeout=SMTP_TIMEOUT)
+        if config["starttls"]:
+            server.starttls()  # Secure the connection (Explicit SSL)
+    try:
+        server.login(config["email"], config["password"])
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+def clean_summary_markdown(summary_md: str) -> str:
+    """Strip the cover card JSON block and fix the markdown quirks of LLM output."""
+    # Strip JSON Block (Existing)
+    summary_md = re.sub(r'```json.*$', '', summary_md, flags=re.DOTALL | re.IGNORECASE)
+    summary_md = re.sub(r'```\s*$', '', summary_md.strip())
+
+    # 1. Fix Lists: Convert lines starting with "* " to "- " (Standard Markdown list)
+    # This fixes the issue where lists aren't rendering as HTML <ul>
+    summary_md = re.sub(r'^\s*\*\s+', '- ', summary_md, flags=re.MULTILINE)
+
+    # 2. Fix broken Bold: Remove stray asterisks at the end of lines/sentences if they don't have a pair
+    # Example: "Title**:" -> "Title:" (It's cleaner to just remove broken bolds than try to close them)
+    summary_md = re.sub(r'([^\*])\*\*:', r'\1:', summary_md) # Fix "Word**:" -> "Word:"
+    summary_md = re.sub(r'([^\*])\*:', r'\1:', summary_md)   # Fix "Word*:" -> "Word:"
+
+    # 3. Standardize Bold Spacing
+    summary_md = re.sub(r'\*\*\s+(.*?)\s+\*\*', r'**\1**', summary_md)
+    
+    # 4. Enforce Newline before Highlights (User feedback fix)
+    # Ensure there is a double newline before "**亮点：**" to separate it from the previous paragraph
+    summary_md = re.sub(r'([^\n])\s*\*\*(亮点|Highlights)[：:]\*\*', r'\1\n\n**\2：**', summary_md)
+    summary_md = re.sub(r'(\n)\s*\*\*(亮点|Highlights)[：:]\*\*', r'\n\n**\2：**', summary_md)
+    
+    # 5. Ensure proper spacing for References section
+    summary_md = re.sub(r'(?i)([^\n])\s*\*\*(参考文献|References)[：:]\*\*', r'\1\n\n**\2：**', summary_md)
+    summary_md = re.sub(r'(?i)(\n)\s*\*\*(参考文献|References)[：:]\*\*', r'\n\n**\2：**', summary_md)
+    
+    # Clean up any trailing whitespace left
+    return summary_md.strip()
+
+
+def markdown_to_html(summary_md: str) -> str:
+    """Convert the cleaned summary to HTML (simple fallback when markdown is not installed)."""
+    if markdown:
+        return markdown.markdown(summary_md, extensions=['extra', 'nl2br'])
+
+    logger.warning("Markdown library not found. Using simple fallback for email HTML.")
+    # Simple Fallback:
+    # 1. Escape HTML (minimal) - assuming input is safe or we trust content
+    html_content = summary_md.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    # 2. Headers
+    html_content = re.sub(r'^### (.*)$', r'<h3>\1</h3>', html_content, flags=re.MULTILINE)
+    html_content = re.sub(r'^## (.*)$', r'<h2>\1</h2>', html_content, flags=re.MULTILINE)
+    html_content = re.sub(r'^# (.*)$', r'<h1>\1</h1>', html_content, flags=re.MULTILINE)
+    # 3. Bold
+    html_content = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', html_content)
+    # 4. Newlines to <br> or <p>
+    lines = html_content.split('\n')
+    html_content = ""
+    for line in lines:
+        if line.strip().startswith("<h"):
+            html_content += line
+        else:
+            html_content += f"<p>{line}</p>"
+    return html_content
+
+
+def render_report(summary_md: str, cover_card: dict = None, ticker: str = "", date_str: str = None) -> tuple:
+    """
+    Render the report once for any number of recipients.
+    
+    Returns:
+        tuple: (plain_text, full_html)
+    """
+    summary_md = clean_summary_markdown(summary_md)
+    return summary_md, _create_email_html(markdown_to_html(summary_md), cover_card, ticker, date_str)
+
+
+def build_message(sender_email: str, to_email: str, subject: str, text_part: MIMEText, html_part: MIMEText):
+    """multipart/alternative message around already encoded text and HTML parts."""
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = subject
+    msg["From"] = sender_email
+    msg["To"] = to_email
+    # Add plain text version (optional but good practice)
+    msg.attach(text_part)
+    # Add HTML version
+    msg.attach(html_part)
+    return msg
+
+
 def send_report_email(to_email: str, subject: str, summary_md: str, cover_card: dict = None, ticker: str = "", date_str: str = None) -> dict:
     """
     Send the Daily Digest report via email.
@@ -36,119 +191,196 @@ def send_report_email(to_email: str, subject: str, summary_md: str, cover_card:
         dict: {"success": bool, "message": str}
     """
     # 1. Get SMTP Configuration
-    smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
-    sender_email = os.getenv("SMTP_EMAIL")
-    sender_password = os.getenv("SMTP_PASSWORD")
-    
-    if not sender_email or not sender_password:
+    config = get_smtp_config()
+    if not config:
         return {
             "success": False, 
             "message": "SMTP credentials (SMTP_EMAIL, SMTP_PASSWORD) are not set in .env"
         }
         
     try:
-        # 2. Convert Markdown to HTML
-        # Strip JSON Block (Existing)
-        summary_md = re.sub(r'```json.*$', '', summary_md, flags=re.DOTALL | re.IGNORECASE)
-        summary_md = re.sub(r'```\s*$', '', summary_md.strip())
-
-        # 1. Fix Lists: Convert lines starting with "* " to "- " (Standard Markdown list)
-        # This fixes the issue where lists aren't rendering as HTML <ul>
-        summary_md = re.sub(r'^\s*\*\s+', '- ', summary_md, flags=re.MULTILINE)
-
-        # 2. Fix broken Bold: Remove stray asterisks at the end of lines/sentences if they don't have a pair
-        # Example: "Title**:" -> "Title:" (It's cleaner to just remove broken bolds than try to close them)
-        summary_md = re.sub(r'([^\*])\*\*:', r'\1:', summary_md) # Fix "Word**:" -> "Word:"
-        summary_md = re.sub(r'([^\*])\*:', r'\1:', summary_md)   # Fix "Word*:" -> "Word:"
-
-        # 3. Standardize Bold Spacing
-        summary_md = re.sub(r'\*\*\s+(.*?)\s+\*\*', r'**\1**', summary_md)
-        
-        # 4. Enforce Newline before Highlights (User feedback fix)
-        # Ensure there is a double newline before "**亮点：**" to separate it from the previous paragraph
-        summary_md = re.sub(r'([^\n])\s*\*\*(亮点|Highlights)[：:]\*\*', r'\1\n\n**\2：**', summary_md)
-        summary_md = re.sub(r'(\n)\s*\*\*(亮点|Highlights)[：:]\*\*', r'\n\n**\2：**', summary_md)
-        
-        # 5. Ensure proper spacing for References section
-        summary_md = re.sub(r'(?i)([^\n])\s*\*\*(参考文献|References)[：:]\*\*', r'\1\n\n**\2：**', summary_md)
-        summary_md = re.sub(r'(?i)(\n)\s*\*\*(参考文献|References)[：:]\*\*', r'\n\n**\2：**', summary_md)
-        
-        # Clean up any trailing whitespace left
-        summary_md = summary_md.strip()
-
-        if markdown:
-            # 4. Convert to HTML
-            html_content = markdown.markdown(summary_md, extensions=['extra', 'nl2br'])
-        else:
-            logger.warning("Markdown library not found. Using simple fallback for email HTML.")
-            # Simple Fallback:
-            # 1. Escape HTML (minimal) - assuming input is safe or we trust content
-            html_content = summary_md.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-            # 2. Headers
-            html_content = re.sub(r'^### (.*)$', r'<h3>\1</h3>', html_content, flags=re.MULTILINE)
-            html_content = re.sub(r'^## (.*)$', r'<h2>\1</h2>', html_content, flags=re.MULTILINE)
-            html_content = re.sub(r'^# (.*)$', r'<h1>\1</h1>', html_content, flags=re.MULTILINE)
-            # 3. Bold
-            html_content = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', html_content)
-            # 4. Newlines to <br> or <p>
-            lines = html_content.split('\n')
-            html_content = ""
-            for line in lines:
-                if line.strip().startswith("<h"):
-                    html_content += line
-                else:
-                    html_content += f"<p>{line}</p>"
-        
-        # 3. Create HTML Body
-        full_html = _create_email_html(html_content, cover_card, ticker, date_str)
-        
-        # 4. Create Message
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
-        msg["From"] = sender_email
-        msg["To"] = to_email
+        # 2. Render text and HTML bodies
+        plain_text, full_html = render_report(summary_md, cover_card, ticker, date_str)
         
-        # Add plain text version (optional but good practice)
-        text_part = MIMEText(summary_md, "plain")
-        msg.attach(text_part)
+        # 3. Create Message
+        msg = build_message(config["email"], to_email, subject,
+                            MIMEText(plain_text, "plain"), MIMEText(full_html, "html"))
         
-        # Add HTML version
-        html_part = MIMEText(full_html, "html")
-        msg.attach(html_part)
-        
-        # 5. Send Email
-        logger.info(f"Sending email to {to_email} via {smtp_server}:{smtp_port}")
+        # 4. Send Email
+        logger.info(f"Sending email to {to_email} via {config['server']}:{config['port']}")
         
         try:
-            # Choose valid connection method based on port
-            if smtp_port == 465:
-                # Implicit SSL
-                server = smtplib.SMTP_SSL(smtp_server, smtp_port, timeout=30)
-            else:
-                # STARTTLS (Explicit SSL)
-                server = smtplib.SMTP(smtp_server, smtp_port, timeout=30)
-                server.starttls() # Secure the connection
-            
-            with server:
-                server.login(sender_email, sender_password)
-                server.sendmail(sender_email, to_email, msg.as_string())
+            with open_smtp(config) as server:
+                server.sendmail(config["email"], to_email, msg.as_string())
             
             logger.info("Email sent successfully.")
             return {"success": True, "message": "Email sent successfully!"}
             
-        except smtplib.SMTPConnectError:
-            return {"success": False, "message": f"Could not connect to {smtp_server}:{smtp_port}. Check network or firewall."}
-        except smtplib.SMTPAuthenticationError:
-            return {"success": False, "message": "Authentication failed. Check your email and password (or App Password)."}
-        except OSError as e:
-             # Handle "Network is unreachable" and other socket errors
-            return {"success": False, "message": f"Network error: {str(e)}. Try changing port to 465 in .env if using 587."}
+        except (smtplib.SMTPConnectError, smtplib.SMTPAuthenticationError, OSError) as e:
+            return {"success": False, "message": describe_smtp_error(e, config)}
             
     except Exception as e:
         logger.error(f"Failed to send email: {e}")
         return {"success": False, "message": f"Failed to send email: {str(e)}"}
 
+
+def describe_smtp_error(error: Exception, config: dict) -> str:
+    """User-facing message for connection level SMTP errors."""
+    if isinstance(error, smtplib.SMTPConnectError):
+        return f"Could not connect to {config['server']}:{config['port']}. Check network or firewall."
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return "Authentication failed. Check your email and password (or App Password)."
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return "Recipient refused: " + "; ".join(
+            f"{code} {reply.decode(errors='replace') if isinstance(reply, bytes) else reply}"
+            for code, reply in error.recipients.values()
+        )
+    if isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException):
+        # Handle "Network is unreachable" and other socket errors
+        return f"Network error: {str(error)}. Try changing port to 465 in .env if using 587."
+    return str(error)
+
+
+def is_transient_smtp_error(error: Exception) -> bool:
+    """Whether sending to this recipient again may succeed (dropped connection, 4xx reply)."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return is_connection_error(error)
+
+
+def is_connection_error(error: Exception) -> bool:
+    """Dropped or unusable session (SMTPException derives from OSError, so socket errors are checked explicitly)."""
+    return isinstance(error, smtplib.SMTPServerDisconnected) or (
+        isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+    )
+
+
+def send_bulk_report_email(recipients: list, subject: str, summary_md: str, cover_card: dict = None,
+                           ticker: str = "", date_str: str = None, connections: int = None,
+                           max_attempts: int = None) -> dict:
+    """
+    Send one report to many recipients.
+    
+    The report is rendered once; up to `connections` SMTP sessions (one per worker thread) are
+    opened, authenticated once and reused for every recipient they handle. A recipient whose
+    send fails transiently is retried with exponential backoff, on a fresh session if the
+    connection dropped.
+    
+    Returns:
+        dict: {"success", "message", "total", "sent", "failed", "seconds", "connections_opened",
+               "results": [{"to", "success", "attempts", "seconds", "message"}]}
+    """
+    start = time.perf_counter()
+    recipients = list(dict.fromkeys(r.strip() for r in recipients if r and r.strip()))
+    report = {"success": False, "message": "", "total": len(recipients), "sent": 0, "failed": 0,
+              "seconds": 0.0, "connections_opened": 0, "results": []}
+    if not recipients:
+        report["message"] = "No recipients"
+        return report
+
+    config = get_smtp_config()
+    if not config:
+        report["message"] = "SMTP credentials (SMTP_EMAIL, SMTP_PASSWORD) are not set in .env"
+        return report
+
+    try:
+        plain_text, full_html = render_report(summary_md, cover_card, ticker, date_str)
+    except Exception as e:
+        logger.error(f"Failed to render email: {e}")
+        report["message"] = f"Failed to render email: {str(e)}"
+        return report
+    text_part, html_part = MIMEText(plain_text, "plain"), MIMEText(full_html, "html")
+    max_attempts = max_attempts or SMTP_MAX_ATTEMPTS
+
+    pending = queue.Queue()
+    for to_email in recipients:
+        pending.put(to_email)
+    lock = threading.Lock()
+    results = {}
+    # Set when the server rejects our credentials: every other recipient would fail the same way
+    fatal = []
+
+    def _worker():
+        server = None
+        try:
+            while not fatal:
+                try:
+                    to_email = pending.get_nowait()
+                except queue.Empty:
+                    return
+                sent_start = time.perf_counter()
+                message = build_message(config["email"], to_email, subject, text_part, html_part).as_string()
+                attempt, error = 0, None
+                while attempt < max_attempts and not fatal:
+                    attempt += 1
+                    try:
+                        if server is None:
+                            server = open_smtp(config)
+                            with lock:
+                                report["connections_opened"] += 1
+                        server.sendmail(config["email"], to_email, message)
+                        error = None
+                        break
+                    except smtplib.SMTPAuthenticationError as e:
+                        error = e
+                        fatal.append(describe_smtp_error(e, config))
+                    except Exception as e:
+                        error = e
+                        if not is_transient_smtp_error(e):
+                            break
+                        if is_connection_error(e) or isinstance(e, smtplib.SMTPConnectError):
+                            # Broken session: reconnect on the next attempt
+                            close_smtp(server)
+                            server = None
+                        if attempt < max_attempts:
+                            time.sleep(SMTP_RETRY_BACKOFF * 2 ** (attempt - 1))
+                with lock:
+                    results[to_email] = {
+                        "to": to_email,
+                        "success": error is None,
+                        "attempts": attempt,
+                        "seconds": round(time.perf_counter() - sent_start, 3),
+                        "message": "sent" if error is None else (
+                            fatal[0] if fatal else describe_smtp_error(error, config)
+                        ),
+                    }
+                if error is not None:
+                    logger.warning(f"Failed to send email to {to_email} after {attempt} attempt(s): {error}")
+        finally:
+            if server is not None:
+                close_smtp(server, quit=True)
+
+    workers = min(connections or SMTP_BULK_CONNECTIONS, len(recipients))
+    logger.info(f"Sending report to {len(recipients)} recipients via {config['server']}:{config['port']} "
+                f"({workers} connections)")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="smtp") as executor:
+        for future in [executor.submit(_worker) for _ in range(workers)]:
+            future.result()
+
+    # Recipients never attempted because the run was aborted
+    for to_email in recipients:
+        results.setdefault(to_email, {"to": to_email, "success": False, "attempts": 0, "seconds": 0.0,
+                                      "message": fatal[0] if fatal else "not sent"})
+    report["results"] = [results[to_email] for to_email in recipients]
+    report["sent"] = sum(1 for r in report["results"] if r["success"])
+    report["failed"] = report["total"] - report["sent"]
+    report["success"] = report["failed"] == 0
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    report["message"] = fatal[0] if fatal else f"Sent {report['sent']}/{report['total']} emails"
+    logger.info(f"{report['message']} in {report['seconds']}s, {report['connections_opened']} SMTP connection(s)")
+    return report
+
+
+def close_smtp(server, quit: bool = False):
+    """Close a session, ignoring errors (quit=True says goodbye first, for healthy sessions)."""
+    try:
+        server.quit() if quit else server.close()
+    except Exception:
+        pass
+
+
 def _create_email_html(content_html: str, card: dict, ticker: str, date_str: str = None) -> str:
     """Helper to construct the full HTML email."""
     
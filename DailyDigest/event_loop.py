@@ -0,0 +1,129 @@
+"""
+Long-lived background event loop for synchronous callers (e.g. Streamlit).
+
+Coroutines are submitted to one loop running in a daemon thread, so async DB engines
+and LLM clients bound to that loop are reused across calls instead of being rebuilt
+by asyncio.run every time.
+"""
+import time
+import atexit
+import queue
+import asyncio
+import threading
+from loguru import logger
+
+
+class CallbackRelay:
+    """
+    Runs callbacks on the calling thread.
+    Callbacks fired on the loop thread are queued and executed by BackgroundLoop.run
+    while the caller waits (Streamlit elements can only be updated from the script thread).
+    """
+    def __init__(self):
+        self._queue = queue.Queue()
+
+    def wrap(self, fn):
+        if fn is None:
+            return None
+
+        def _relay(*args, **kwargs):
+            self._queue.put((fn, args, kwargs))
+        return _relay
+
+    def run_pending(self, timeout: float = 0):
+        """Execute queued callbacks; waits up to `timeout` seconds for the first one."""
+        try:
+            fn, args, kwargs = self._queue.get(timeout=timeout) if timeout else self._queue.get_nowait()
+        except queue.Empty:
+            return
+        while True:
+            fn(*args, **kwargs)
+            try:
+                fn, args, kwargs = self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+
+class BackgroundLoop:
+    """An asyncio event loop running forever in a daemon thread."""
+
+    def __init__(self, name: str = "daily-digest-loop"):
+        self._shutdown_hooks = []
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def add_shutdown_hook(self, hook):
+        """Register an async callable awaited on the loop before it stops (e.g. engine disposal)."""
+        self._shutdown_hooks.append(hook)
+
+    def submit(self, coro):
+        """Schedule a coroutine; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, relay: CallbackRelay = None, timeout: float = None):
+        """
+        Run a coroutine on the background loop and block until it finishes.
+        Callbacks wrapped with `relay` are executed on this thread while waiting.
+        Raises TimeoutError after `timeout` seconds. On a timeout, or when a relayed callback
+        raises, the coroutine is cancelled so it does not keep running with nobody waiting.
+        """
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("BackgroundLoop.run() called from the loop thread")
+
+        future = self.submit(coro)
+        try:
+            if relay is None:
+                return future.result(timeout)
+
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not future.done():
+                wait = 0.05 if deadline is None else min(0.05, deadline - time.monotonic())
+                if wait <= 0:
+                    raise TimeoutError(f"BackgroundLoop.run() timed out after {timeout}s")
+                relay.run_pending(timeout=wait)
+            relay.run_pending()
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+    def shutdown(self, timeout: float = 10):
+        """Run the shutdown hooks, then stop and close the loop."""
+        if self.loop.is_closed():
+            return
+
+        async def _close():
+            for hook in self._shutdown_hooks:
+                try:
+                    await hook()
+                except Exception as e:
+                    logger.warning(f"[BackgroundLoop] shutdown hook failed: {e}")
+
+        if self.loop.is_running():
+            try:
+                self.submit(_close()).result(timeout)
+            except Exception as e:
+                logger.warning(f"[BackgroundLoop] shutdown failed: {e}")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+        if not self.loop.is_running():
+            self.loop.close()
+
+
+_background_loop = None
+_background_loop_lock = threading.Lock()
+
+
+def get_background_loop() -> BackgroundLoop:
+    """Process-wide background loop, started on first use and shut down at exit."""
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            _background_loop = BackgroundLoop()
+            atexit.register(_background_loop.shutdown)
+        return _background_loop
@@ -0,0 +1,258 @@
+"""
+Background digest jobs for the Streamlit UI.
+
+The UI submits a job and gets a job id back immediately; a thread pool runs the crawl and
+the digest generation. Progress lives in memory for fast polling and is flushed to the
+digest_job table, so a reloaded page (or another browser) can reattach by job id.
+"""
+import os
+import uuid
+import socket
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+
+from DailyDigest.core import run_crawl, run_digest_generation, PLATFORM_LABELS
+from DailyDigest.crawl_progress import format_progress_event
+from DailyDigest.batch import run_comparison, MAX_COMPARE_KEYWORDS
+from DailyDigest.models import (
+    create_digest_job, update_digest_job, get_digest_job, list_digest_jobs, mark_interrupted_jobs
+)
+from DailyDigest.timings import StageTimings
+
+# Concurrent jobs and how often streamed summary text is written to the jobs table (seconds)
+JOB_WORKERS = int(os.getenv("DIGEST_JOB_WORKERS", "2"))
+JOB_FLUSH_SECONDS = float(os.getenv("DIGEST_JOB_FLUSH_SECONDS", "2"))
+
+ACTIVE_STATUSES = ('queued', 'running')
+FINISHED_STATUSES = ('succeeded', 'failed', 'interrupted')
+# Finished jobs kept in memory; older ones are read back from the table
+MAX_FINISHED_IN_MEMORY = 50
+
+
+class DigestJobManager:
+    """Thread pool running digest jobs, with their state mirrored to the digest_job table."""
+
+    def __init__(self, max_workers: int = None):
+        self.host = socket.gethostname()
+        self.worker = f"{self.host}:{os.getpid()}"
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or JOB_WORKERS,
+                                            thread_name_prefix="digest-job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+        interrupted = mark_interrupted_jobs(self.host, self.worker)
+        if interrupted:
+            logger.warning(f"[DigestJobs] Marked {interrupted} job(s) of a previous process as interrupted")
+
+    def submit(self, keyword: str, hours: int = 24, auto_crawl: bool = True, max_count: int = 100) -> str:
+        """Queue a crawl + digest job and return its job id."""
+        job_id = self._create(keyword, hours, auto_crawl, max_count)
+        self._executor.submit(self._run, job_id)
+        logger.info(f"[DigestJobs] Queued job {job_id} for '{keyword}' ({hours}h, crawl={auto_crawl})")
+        return job_id
+
+    def submit_comparison(self, keywords: list, hours: int = 24, auto_crawl: bool = True,
+                          max_count: int = 100) -> str:
+        """
+        Queue one job that crawls and summarizes several keywords concurrently.
+        job['result'] is {"kind": "compare", "keywords": [...], "stages": {keyword: stage},
+        "entries": {keyword: batch report entry}} and fills in as each keyword finishes.
+        """
+        keywords = list(dict.fromkeys(k.strip() for k in keywords if k and k.strip()))[:MAX_COMPARE_KEYWORDS]
+        if not keywords:
+            raise ValueError("No keywords to compare")
+        job_id = self._create(", ".join(keywords)[:100], hours, auto_crawl, max_count)
+        self._update(job_id, result={'kind': 'compare', 'keywords': keywords, 'stages': {}, 'entries': {}})
+        self._executor.submit(self._run_comparison, job_id)
+        logger.info(f"[DigestJobs] Queued comparison job {job_id} for {keywords} ({hours}h, crawl={auto_crawl})")
+        return job_id
+
+    def _create(self, keyword: str, hours: int, auto_crawl: bool, max_count: int) -> str:
+        job_id = uuid.uuid4().hex
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            finished = [k for k, j in self._jobs.items() if j['status'] in FINISHED_STATUSES]
+            for stale in finished[:max(len(finished) - MAX_FINISHED_IN_MEMORY, 0)]:
+                del self._jobs[stale]
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'keyword': keyword,
+                'hours': hours,
+                'max_count': max_count,
+                'auto_crawl': auto_crawl,
+                'status': 'queued',
+                'stage': None,
+                'worker': self.worker,
+                'progress': [],
+                'partial_summary': '',
+                'result': None,
+                'error': None,
+                'history_id': None,
+                'created_at': now,
+                'started_at': None,
+                'finished_at': None,
+            }
+        create_digest_job(job_id, keyword, hours, max_count, auto_crawl, self.worker)
+        return job_id
+
+    def get(self, job_id: str):
+        """Current state of a job: in-memory while this process owns it, otherwise from the table."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job, progress=list(job['progress']))
+        return get_digest_job(job_id)
+
+    def active_jobs(self, limit: int = 20):
+        """Queued and running jobs (for reattaching after a reload)."""
+        return list_digest_jobs(ACTIVE_STATUSES, limit)
+
+    def forget(self, job_id: str):
+        """Drop a finished job from memory; it stays readable from the table."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job['status'] in FINISHED_STATUSES:
+                del self._jobs[job_id]
+
+    def _update(self, job_id: str, persist: bool = True, **fields):
+        with self._lock:
+            # Same shape as DigestJob.to_dict(): timestamps as strings
+            self._jobs[job_id].update({
+                k: v.strftime('%Y-%m-%d %H:%M:%S') if isinstance(v, datetime) else v for k, v in fields.items()
+            })
+            progress = list(self._jobs[job_id]['progress'])
+        if persist:
+            update_digest_job(job_id, progress=progress, **fields)
+
+    def _log(self, job_id: str, message: str, level: str = 'info', key: str = None, persist: bool = True):
+        """
+        Append a progress event and persist it.
+        key: an event with the same key is replaced in place (one live line per crawler).
+        persist=False keeps the change in memory until the next persisted update.
+        """
+        event = {'time': datetime.now().strftime('%H:%M:%S'), 'level': level, 'message': message}
+        if key:
+            event['key'] = key
+        with self._lock:
+            progress = self._jobs[job_id]['progress']
+            index = next((i for i, e in enumerate(progress) if key and e.get('key') == key), None)
+            if index is None:
+                progress.append(event)
+            else:
+                progress[index] = event
+        self._update(job_id, persist=persist)
+
+    def _run(self, job_id: str):
+        job = self.get(job_id)
+        keyword, hours = job['keyword'], job['hours']
+        timings = StageTimings()
+        self._update(job_id, status='running', started_at=datetime.now())
+
+        try:
+            if job['auto_crawl']:
+                self._update(job_id, stage='crawl')
+                self._log(job_id, "📡 步骤 1/2: 正在爬取 Reddit, Stocktwits 和 Hacker News 数据...")
+
+                def on_platform_done(platform, success, message, count):
+                    icon = "✅" if success else "⚠️"
+                    self._log(job_id, f"{icon} {PLATFORM_LABELS.get(platform, platform)}: {count} 条 ({message})",
+                              'info' if success else 'warning')
+
+                def on_progress(platform, event):
+                    # Page-level progress is shown live but only reaches the table with the next event
+                    self._log(job_id, f"⏳ {PLATFORM_LABELS.get(platform, platform)}: {format_progress_event(event)}",
+                              'warning' if event['kind'] == 'blocked' else 'info',
+                              key=f"crawl.{platform}", persist=False)
+
+                crawl_success, crawl_message, _ = run_crawl(
+                    keyword, job['max_count'], hours, on_platform_done=on_platform_done, timings=timings,
+                    on_progress=on_progress
+                )
+                if not crawl_success:
+                    self._log(job_id, f"❌ 爬取失败: {crawl_message}", 'error')
+                    self._finish(job_id, 'failed', error=crawl_message)
+                    return
+                self._log(job_id, f"✅ {crawl_message}")
+
+            self._update(job_id, stage='digest')
+            self._log(job_id, "📊 步骤 2/2: 生成情绪摘要..." if job['auto_crawl'] else "📊 正在生成情绪摘要...")
+
+            last_flush = [0.0]
+
+            def on_chunk(partial_summary):
+                # Every chunk goes to memory; the table is refreshed at most every JOB_FLUSH_SECONDS
+                now = datetime.now().timestamp()
+                persist = now - last_flush[0] >= JOB_FLUSH_SECONDS
+                if persist:
+                    last_flush[0] = now
+                self._update(job_id, persist=persist, partial_summary=partial_summary)
+
+            result = run_digest_generation(keyword, hours, on_chunk=on_chunk, timings=timings)
+            if result.get('success'):
+                self._log(job_id, "✅ 处理完成！")
+                self._finish(job_id, 'succeeded', result=result, history_id=result.get('history_id'))
+            else:
+                self._log(job_id, f"⚠️ 摘要生成失败: {result.get('message', '')}", 'error')
+                self._finish(job_id, 'failed', result=result, error=result.get('message', ''))
+        except Exception as e:
+            logger.exception(f"[DigestJobs] Job {job_id} failed: {e}")
+            self._log(job_id, f"❌ 发生错误: {e}", 'error')
+            self._finish(job_id, 'failed', error=str(e))
+
+    def _run_comparison(self, job_id: str):
+        job = self.get(job_id)
+        compare = job['result']
+        keywords = compare['keywords']
+        self._update(job_id, status='running', stage='compare', started_at=datetime.now())
+        self._log(job_id, f"🆚 正在并发生成 {len(keywords)} 个关键词的摘要: {', '.join(keywords)}")
+
+        def _set_result(**changes):
+            with self._lock:
+                current = self._jobs[job_id]['result']
+                updated = dict(current, **{k: dict(current[k], **v) for k, v in changes.items()})
+            self._update(job_id, result=updated)
+
+        def on_stage(keyword, stage):
+            _set_result(stages={keyword: stage})
+
+        def on_result(entry):
+            keyword = entry['keyword']
+            _set_result(stages={keyword: 'done'}, entries={keyword: entry})
+            if entry['success']:
+                self._log(job_id, f"✅ {keyword}: {entry.get('post_count', 0)} 条帖子，"
+                                  f"用时 {entry['timings'].get('total', 0)}s")
+            else:
+                self._log(job_id, f"⚠️ {keyword}: {entry.get('error', '')}", 'warning')
+
+        try:
+            report = run_comparison(keywords, job['hours'], job['max_count'], crawl=job['auto_crawl'],
+                                    on_result=on_result, on_stage=on_stage)
+            self._log(job_id, f"✅ 对比完成: {report['succeeded']}/{len(keywords)} 成功，"
+                              f"总用时 {report['total_seconds']}s")
+            if report['succeeded']:
+                self._finish(job_id, 'succeeded')
+            else:
+                self._finish(job_id, 'failed', error="所有关键词的摘要均生成失败")
+        except Exception as e:
+            logger.exception(f"[DigestJobs] Comparison job {job_id} failed: {e}")
+            self._log(job_id, f"❌ 发生错误: {e}", 'error')
+            self._finish(job_id, 'failed', error=str(e))
+
+    def _finish(self, job_id: str, status: str, **fields):
+        self._update(job_id, status=status, stage='done', finished_at=datetime.now(), **fields)
+        logger.info(f"[DigestJobs] Job {job_id} {status}")
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> DigestJobManager:
+    """Process-wide job manager, created on first use."""
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = DigestJobManager()
+        return _job_manager
@@ -1,11 +1,16 @@
 """
 Daily Digest 历史记录数据模型
 """
-from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, create_engine
+from datetime import datetime, timedelta
+from sqlalchemy import (
+    Column, Integer, String, Text, DateTime, Float, Index, UniqueConstraint, create_engine, tuple_, case, inspect, and_, or_
+)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
+import atexit
+import threading
 from pathlib import Path
 
 Base = declarative_base()
@@ -32,33 +37,244 @@ class DigestHistory(Base):
     # 热门帖子（JSON格式）
     top_posts = Column(Text, nullable=True)
     
+    # 历史列表按 (created_at, id) 倒序做 keyset 分页，可选按关键词过滤
+    __table_args__ = (
+        Index('idx_digest_history_created_id', 'created_at', 'id'),
+        Index('idx_digest_history_keyword_created_id', 'keyword', 'created_at', 'id'),
+    )
+    
     def to_dict(self):
         """转换为字典"""
         import json
+        cover_card = {
+            'ticker': self.ticker,
+            'sentiment_score': self.sentiment_score,
+            'sentiment_label': self.sentiment_label,
+            'headline': self.headline,
+            'key_factors': json.loads(self.key_factors) if self.key_factors else []
+        }
+        if self.sentiment_score is None:
+            # 没有评分的记录不带该字段，由展示端使用默认值
+            del cover_card['sentiment_score']
         return {
             'id': self.id,
             'keyword': self.keyword,
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
             'summary': self.summary,
             'post_count': self.post_count,
-            'cover_card': {
-                'ticker': self.ticker,
-                'sentiment_score': self.sentiment_score,
-                'sentiment_label': self.sentiment_label,
-                'headline': self.headline,
-                'key_factors': json.loads(self.key_factors) if self.key_factors else []
-            },
+            'cover_card': cover_card,
             'top_posts': json.loads(self.top_posts) if self.top_posts else []
         }
 
 
-# 数据库连接
-def get_db_session():
-    """获取数据库会话"""
+class DigestSentimentRollup(Base):
+    """情绪时间序列汇总表（按关键词 + 天/小时分桶，保存 digest_history 时同步更新）"""
+    __tablename__ = 'digest_sentiment_rollup'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    keyword = Column(String(100), nullable=False)
+    granularity = Column(String(10), nullable=False)  # day / hour
+    bucket_start = Column(DateTime, nullable=False)
+    
+    # 平均分 = score_sum / digest_count
+    digest_count = Column(Integer, default=0, nullable=False)
+    score_sum = Column(Float, default=0.0, nullable=False)
+    score_min = Column(Float, nullable=True)
+    score_max = Column(Float, nullable=True)
+    post_count = Column(Integer, default=0, nullable=False)
+    
+    updated_at = Column(DateTime, default=datetime.now, nullable=True)
+    
+    # 唯一索引同时服务于写入时的定位和按关键词读取整条序列
+    __table_args__ = (
+        UniqueConstraint('keyword', 'granularity', 'bucket_start', name='uq_digest_sentiment_rollup_bucket'),
+    )
+    
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'bucket': self.bucket_start.strftime('%Y-%m-%d %H:%M'),
+            'avg_score': round(self.score_sum / self.digest_count, 2) if self.digest_count else None,
+            'min_score': self.score_min,
+            'max_score': self.score_max,
+            'post_count': self.post_count,
+            'digest_count': self.digest_count
+        }
+
+
+class DigestCache(Base):
+    """Digest 结果缓存表（按关键词、时间窗口、模型、Prompt版本和帖子集合指纹寻址）"""
+    __tablename__ = 'digest_cache'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    cache_key = Column(String(64), nullable=False, unique=True, index=True)
+    keyword = Column(String(100), nullable=False, index=True)
+    hours = Column(Integer, nullable=False)
+    model_name = Column(String(100), nullable=True)
+    prompt_version = Column(String(32), nullable=True)
+    post_fingerprint = Column(String(64), nullable=False)
+    
+    # 缓存的摘要结果（JSON格式）
+    result = Column(Text, nullable=False)
+    history_id = Column(Integer, nullable=True)
+    prompt_chars = Column(Integer, default=0)
+    
+    # 过期与命中统计
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    hit_count = Column(Integer, default=0, nullable=False)
+    last_hit_at = Column(DateTime, nullable=True)
+
+
+class DigestJob(Base):
+    """Digest 后台任务表（Streamlit 提交任务后轮询状态，刷新页面后可按 job_id 重新关联）"""
+    __tablename__ = 'digest_job'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(String(32), nullable=False, unique=True, index=True)
+    keyword = Column(String(100), nullable=False, index=True)
+    hours = Column(Integer, default=24)
+    max_count = Column(Integer, default=100)
+    auto_crawl = Column(Integer, default=1)
+    
+    # queued / running / succeeded / failed / interrupted
+    status = Column(String(20), nullable=False, default='queued', index=True)
+    stage = Column(String(20), nullable=True)
+    worker = Column(String(100), nullable=True)  # host:pid，用于识别进程重启后遗留的任务
+    
+    # 进度事件与流式摘要（JSON / markdown）
+    progress = Column(Text, nullable=True)
+    partial_summary = Column(Text, nullable=True)
+    
+    # 结果
+    result = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    history_id = Column(Integer, nullable=True)
+    
+    created_at = Column(DateTime, default=datetime.now, nullable=False, index=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.now, nullable=True)
+    
+    def to_dict(self):
+        """转换为字典"""
+        import json
+        return {
+            'job_id': self.job_id,
+            'keyword': self.keyword,
+            'hours': self.hours,
+            'max_count': self.max_count,
+            'auto_crawl': bool(self.auto_crawl),
+            'status': self.status,
+            'stage': self.stage,
+            'worker': self.worker,
+            'progress': json.loads(self.progress) if self.progress else [],
+            'partial_summary': self.partial_summary or '',
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'history_id': self.history_id,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
+            'started_at': self.started_at.strftime('%Y-%m-%d %H:%M:%S') if self.started_at else None,
+            'finished_at': self.finished_at.strftime('%Y-%m-%d %H:%M:%S') if self.finished_at else None,
+        }
+
+
+class EmailMessage(Base):
+    """待发送邮件的正文（渲染一次，发给多个收件人时共用）"""
+    __tablename__ = 'email_message'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    subject = Column(String(500), nullable=False)
+    text_body = Column(Text, nullable=True)
+    html_body = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+
+
+class EmailOutbox(Base):
+    """邮件发件箱（每个收件人一行，由后台发送线程投递、失败重试）"""
+    __tablename__ = 'email_outbox'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    message_id = Column(Integer, nullable=False, index=True)
+    to_email = Column(String(320), nullable=False)
+    
+    # pending / sending / sent / failed
+    status = Column(String(20), nullable=False, default='pending')
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.now, nullable=False)
+    worker = Column(String(100), nullable=True)
+    last_error = Column(Text, nullable=True)
+    
+    # 最后一次 SMTP 投递耗时（秒）
+    latency_seconds = Column(Float, nullable=True)
+    
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.now, nullable=True)
+    
+    # 发送线程按 (status, next_attempt_at) 领取到期的邮件
+    __table_args__ = (
+        Index('idx_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+    
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'to': self.to_email,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'latency_seconds': self.latency_seconds,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
+            'sent_at': self.sent_at.strftime('%Y-%m-%d %H:%M:%S') if self.sent_at else None,
+        }
+
+
+class DigestChunkCache(Base):
+    """Map-reduce 分块摘要缓存表（按分块输入内容寻址，时间窗口重叠时可复用）"""
+    __tablename__ = 'digest_chunk_cache'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    chunk_key = Column(String(64), nullable=False, unique=True, index=True)
+    keyword = Column(String(100), nullable=False, index=True)
+    model_name = Column(String(100), nullable=True)
+    prompt_version = Column(String(32), nullable=True)
+    post_count = Column(Integer, default=0)
+    summary = Column(Text, nullable=False)
+    
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    hit_count = Column(Integer, default=0, nullable=False)
+
+
+# Digest 缓存配置
+DIGEST_CACHE_TTL_HOURS = float(os.getenv('DIGEST_CACHE_TTL_HOURS', '6'))
+DIGEST_CACHE_MAX_ENTRIES = int(os.getenv('DIGEST_CACHE_MAX_ENTRIES', '500'))
+# 分块摘要只依赖分块内容本身，可以保留更久
+DIGEST_CHUNK_CACHE_TTL_HOURS = float(os.getenv('DIGEST_CHUNK_CACHE_TTL_HOURS', '72'))
+
+
+# 连接池配置：常驻连接数、高峰时额外连接数、取连接超时与连接回收时间（秒）
+DIGEST_DB_POOL_SIZE = int(os.getenv('DIGEST_DB_POOL_SIZE', '5'))
+DIGEST_DB_MAX_OVERFLOW = int(os.getenv('DIGEST_DB_MAX_OVERFLOW', '10'))
+DIGEST_DB_POOL_TIMEOUT = float(os.getenv('DIGEST_DB_POOL_TIMEOUT', '30'))
+DIGEST_DB_POOL_RECYCLE = int(os.getenv('DIGEST_DB_POOL_RECYCLE', '1800'))
+
+_engine = None
+_session_factory = None
+_engine_lock = threading.Lock()
+
+
+def get_database_url():
+    """从环境变量构建数据库连接字符串 (优先使用项目统一的 DB_* 配置)"""
     from dotenv import load_dotenv
     load_dotenv()
     
-    # 从环境变量读取数据库配置 (优先使用项目统一的 DB_* 配置)
+    # 显式指定的连接字符串优先（例如离线测试使用 sqlite）
+    if os.getenv('DIGEST_DATABASE_URL'):
+        return os.getenv('DIGEST_DATABASE_URL')
+    
     db_user = os.getenv('DB_USER', os.getenv('POSTGRES_USER', 'postgres'))
     db_password = os.getenv('DB_PASSWORD', os.getenv('POSTGRES_PASSWORD', ''))
     db_host = os.getenv('DB_HOST', os.getenv('POSTGRES_HOST', 'localhost'))
@@ -68,18 +284,61 @@ def get_db_session():
     # 确保端口是字符串
     db_port = str(db_port)
     
-    # 创建连接字符串 (使用 psycopg 3 驱动)
-    database_url = f'postgresql+psycopg://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}'
-    
-    # 创建引擎
-    engine = create_engine(database_url, echo=False)
-    
-    # 创建表（如果不存在）
-    Base.metadata.create_all(engine)
-    
-    # 创建会话
-    Session = sessionmaker(bind=engine)
-    return Session()
+    # 使用 psycopg 3 驱动
+    return f'postgresql+psycopg://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}'
+
+
+def get_engine():
+    """
+    进程内共享的数据库引擎（带连接池）
+    首次调用时创建引擎并建表，之后直接复用，避免每次查询都重新握手和扫描系统表
+    """
+    global _engine, _session_factory
+    if _session_factory is not None:
+        return _engine
+    with _engine_lock:
+        if _session_factory is None:
+            engine = _engine or create_engine(
+                get_database_url(),
+                echo=False,
+                pool_size=DIGEST_DB_POOL_SIZE,
+                max_overflow=DIGEST_DB_MAX_OVERFLOW,
+                pool_timeout=DIGEST_DB_POOL_TIMEOUT,
+                pool_recycle=DIGEST_DB_POOL_RECYCLE,
+                pool_pre_ping=True,  # 数据库重启或空闲断开后自动换新连接
+            )
+            _engine = engine
+            # 创建表（如果不存在），只在进程内执行一次；失败时下次调用重试
+            has_rollups = inspect(engine).has_table(DigestSentimentRollup.__tablename__)
+            Base.metadata.create_all(engine)
+            # create_all 不会给已存在的表补建索引，历史列表的分页索引单独检查
+            for index in DigestHistory.__table__.indexes:
+                index.create(engine, checkfirst=True)
+            _session_factory = sessionmaker(bind=engine)
+            if not has_rollups:
+                # 汇总表首次创建：用已有历史记录回填
+                rebuild_sentiment_rollups()
+        return _engine
+
+
+# 数据库连接
+def get_db_session():
+    """获取数据库会话（从共享连接池取连接）"""
+    get_engine()
+    return _session_factory()
+
+
+def dispose_engine():
+    """关闭连接池中的所有连接（进程退出时自动调用）"""
+    global _engine, _session_factory
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+        _engine = None
+        _session_factory = None
+
+
+atexit.register(dispose_engine)
 
 
 def save_digest_history(keyword, result):
@@ -90,7 +349,9 @@ def save_digest_history(keyword, result):
         session = get_db_session()
         
         # 提取卡片信息
-        cover_card = result.get('cover_card', {})
+        cover_card = result.get('cover_card') or {}
+        # 封面卡片缺少评分时存 NULL，不用默认值，避免拉偏情绪汇总
+        score = cover_card.get('sentiment_score')
         
         # 创建历史记录
         history = DigestHistory(
@@ -98,7 +359,7 @@ def save_digest_history(keyword, result):
             summary=result.get('summary', ''),
             post_count=result.get('post_count', 0),
             ticker=cover_card.get('ticker', keyword),
-            sentiment_score=float(cover_card.get('sentiment_score', 5.0)),
+            sentiment_score=float(score) if score is not None else None,
             sentiment_label=cover_card.get('sentiment_label', 'N/A'),
             headline=cover_card.get('headline', ''),
             key_factors=json.dumps(cover_card.get('key_factors', []), ensure_ascii=False),
@@ -106,7 +367,15 @@ def save_digest_history(keyword, result):
         )
         
         session.add(history)
+        session.flush()
+        
+        # 同一事务内更新情绪汇总（没有评分的记录不计入）
+        if history.sentiment_score is not None:
+            for granularity in ROLLUP_GRANULARITIES:
+                _add_to_rollup(session, keyword, granularity, history.created_at,
+                               history.sentiment_score, history.post_count or 0)
         session.commit()
+        _bump_history_version()
         
         return True, history.id
     except Exception as e:
@@ -116,32 +385,211 @@ def save_digest_history(keyword, result):
         session.close()
 
 
-def get_digest_history_list(limit=50):
-    """获取历史记录列表"""
+# 本进程内保存历史记录的次数，页面缓存以此判断历史列表、情绪走势是否需要重新查询
+_history_version = 0
+_history_version_lock = threading.Lock()
+
+
+def _bump_history_version():
+    global _history_version
+    with _history_version_lock:
+        _history_version += 1
+
+
+def get_history_version():
+    """本进程内历史记录的版本号，每保存一条记录加一"""
+    return _history_version
+
+
+ROLLUP_GRANULARITIES = ('day', 'hour')
+
+
+def _bucket_start(value, granularity):
+    """时间所在分桶的起点"""
+    if granularity == 'hour':
+        return value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_to_rollup(session, keyword, granularity, created_at, score, post_count):
+    """把一条历史记录计入对应分桶：原子地累加，分桶不存在时插入"""
+    bucket = _bucket_start(created_at, granularity)
+    rollup = DigestSentimentRollup
+    
+    def _increment():
+        return session.query(rollup).filter_by(
+            keyword=keyword, granularity=granularity, bucket_start=bucket
+        ).update({
+            rollup.digest_count: rollup.digest_count + 1,
+            rollup.score_sum: rollup.score_sum + score,
+            rollup.score_min: case((rollup.score_min <= score, rollup.score_min), else_=score),
+            rollup.score_max: case((rollup.score_max >= score, rollup.score_max), else_=score),
+            rollup.post_count: rollup.post_count + post_count,
+            rollup.updated_at: datetime.now()
+        }, synchronize_session=False)
+    
+    if _increment():
+        return
+    try:
+        # 并发写入同一分桶时唯一约束冲突，回到累加
+        with session.begin_nested():
+            session.add(rollup(
+                keyword=keyword, granularity=granularity, bucket_start=bucket,
+                digest_count=1, score_sum=score, score_min=score, score_max=score,
+                post_count=post_count, updated_at=datetime.now()
+            ))
+    except IntegrityError:
+        _increment()
+
+
+def rebuild_sentiment_rollups(keyword=None):
+    """根据 digest_history 重建情绪汇总（汇总表首次创建时自动执行，也可手动修复数据）"""
+    session = None
     try:
         session = get_db_session()
         
-        # 按时间倒序查询
-        histories = session.query(DigestHistory).order_by(
-            DigestHistory.created_at.desc()
-        ).limit(limit).all()
+        query = session.query(
+            DigestHistory.keyword, DigestHistory.created_at, DigestHistory.sentiment_score, DigestHistory.post_count
+        ).filter(
+            DigestHistory.sentiment_score.isnot(None),
+            # 旧版本在封面卡片缺失时写入默认分 5.0 和标签 N/A，这些记录同样没有真实评分
+            ~and_(DigestHistory.sentiment_score == 5.0, DigestHistory.sentiment_label == 'N/A')
+        )
+        rollups = session.query(DigestSentimentRollup)
+        if keyword:
+            query = query.filter(DigestHistory.keyword == keyword)
+            rollups = rollups.filter(DigestSentimentRollup.keyword == keyword)
+        
+        buckets = {}
+        for h in query.yield_per(1000):
+            for granularity in ROLLUP_GRANULARITIES:
+                key = (h.keyword, granularity, _bucket_start(h.created_at, granularity))
+                b = buckets.setdefault(key, {'digest_count': 0, 'score_sum': 0.0, 'score_min': h.sentiment_score,
+                                             'score_max': h.sentiment_score, 'post_count': 0})
+                b['digest_count'] += 1
+                b['score_sum'] += h.sentiment_score
+                b['score_min'] = min(b['score_min'], h.sentiment_score)
+                b['score_max'] = max(b['score_max'], h.sentiment_score)
+                b['post_count'] += h.post_count or 0
         
-        result = []
-        for h in histories:
-            result.append({
+        rollups.delete(synchronize_session=False)
+        now = datetime.now()
+        session.bulk_insert_mappings(DigestSentimentRollup, [
+            dict(keyword=kw, granularity=granularity, bucket_start=bucket, updated_at=now, **b)
+            for (kw, granularity, bucket), b in buckets.items()
+        ])
+        session.commit()
+        return len(buckets)
+    except Exception as e:
+        print(f"重建情绪汇总失败: {e}")
+        return 0
+    finally:
+        if session:
+            session.close()
+
+
+def get_sentiment_series(keyword, granularity='day', since=None, until=None):
+    """
+    获取关键词的情绪时间序列（单次索引查询）
+    granularity: day / hour；since / until: 可选的起止时间（datetime，含起点不含终点）
+    返回: [{'bucket', 'avg_score', 'min_score', 'max_score', 'post_count', 'digest_count'}]，按时间正序
+    """
+    session = None
+    try:
+        session = get_db_session()
+        
+        query = session.query(DigestSentimentRollup).filter(
+            DigestSentimentRollup.keyword == keyword,
+            DigestSentimentRollup.granularity == granularity
+        )
+        if since:
+            query = query.filter(DigestSentimentRollup.bucket_start >= _bucket_start(since, granularity))
+        if until:
+            query = query.filter(DigestSentimentRollup.bucket_start < until)
+        
+        return [r.to_dict() for r in query.order_by(DigestSentimentRollup.bucket_start.asc()).all()]
+    except Exception as e:
+        print(f"获取情绪趋势失败: {e}")
+        return []
+    finally:
+        if session:
+            session.close()
+
+
+# 历史列表只读取这些列，不加载 summary / top_posts 等大字段
+HISTORY_LIST_COLUMNS = (
+    DigestHistory.id,
+    DigestHistory.keyword,
+    DigestHistory.created_at,
+    DigestHistory.ticker,
+    DigestHistory.sentiment_score,
+    DigestHistory.sentiment_label,
+    DigestHistory.headline,
+    DigestHistory.post_count,
+)
+
+
+def get_digest_history_page(keyword=None, date_from=None, date_to=None, cursor=None, limit=20):
+    """
+    分页获取历史记录列表（按 created_at, id 倒序的 keyset 分页）
+    keyword: 关键词精确匹配；date_from / date_to: 起止日期（含当天，date 或 datetime）
+    cursor: 上一页返回的 next_cursor，None 表示第一页
+    返回: {'items': [...], 'next_cursor': (created_at, id) 或 None}
+    """
+    session = None
+    try:
+        session = get_db_session()
+        
+        query = session.query(*HISTORY_LIST_COLUMNS)
+        if keyword:
+            query = query.filter(DigestHistory.keyword == keyword.strip())
+        if date_from:
+            query = query.filter(DigestHistory.created_at >= _day_start(date_from))
+        if date_to:
+            query = query.filter(DigestHistory.created_at < _day_start(date_to) + timedelta(days=1))
+        if cursor:
+            created_at, history_id = cursor
+            query = query.filter(
+                tuple_(DigestHistory.created_at, DigestHistory.id) < tuple_(created_at, history_id)
+            )
+        
+        # 多取一条判断是否还有下一页
+        rows = query.order_by(
+            DigestHistory.created_at.desc(), DigestHistory.id.desc()
+        ).limit(limit + 1).all()
+        
+        page = rows[:limit]
+        items = [
+            {
                 'id': h.id,
                 'keyword': h.keyword,
                 'created_at': h.created_at.strftime('%Y-%m-%d %H:%M'),
+                'ticker': h.ticker,
+                'sentiment_score': h.sentiment_score,
                 'sentiment_label': h.sentiment_label,
+                'headline': h.headline,
                 'post_count': h.post_count
-            })
-        
-        return result
+            }
+            for h in page
+        ]
+        next_cursor = (page[-1].created_at, page[-1].id) if len(rows) > limit else None
+        return {'items': items, 'next_cursor': next_cursor}
     except Exception as e:
         print(f"获取历史记录失败: {e}")
-        return []
+        return {'items': [], 'next_cursor': None}
     finally:
-        session.close()
+        if session is not None:
+            session.close()
+
+
+def _day_start(value):
+    """date / datetime 转为当天 00:00"""
+    return datetime(value.year, value.month, value.day)
+
+
+def get_digest_history_list(limit=50):
+    """获取历史记录列表（最新的 limit 条）"""
+    return get_digest_history_page(limit=limit)['items']
 
 
 def get_digest_by_id(history_id):
@@ -159,3 +607,510 @@ def get_digest_by_id(history_id):
         return None
     finally:
         session.close()
+
+
+def get_cached_digest(cache_key):
+    """
+    按缓存键读取未过期的digest结果，命中时累计命中次数
+    返回: (result: dict, history_id) 或 None
+    """
+    import json
+    
+    session = None
+    try:
+        session = get_db_session()
+        
+        entry = session.query(DigestCache).filter(
+            DigestCache.cache_key == cache_key,
+            DigestCache.expires_at > datetime.now()
+        ).first()
+        
+        if not entry:
+            return None
+        
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_hit_at = datetime.now()
+        session.commit()
+        
+        return json.loads(entry.result), entry.history_id
+    except Exception as e:
+        print(f"读取digest缓存失败: {e}")
+        return None
+    finally:
+        if session:
+            session.close()
+
+
+def save_digest_cache(cache_key, keyword, hours, model_name, prompt_version, post_fingerprint, result, prompt_chars=0):
+    """保存digest结果到缓存，并清理过期和超出数量上限的条目"""
+    import json
+    
+    session = None
+    try:
+        session = get_db_session()
+        now = datetime.now()
+        
+        entry = session.query(DigestCache).filter_by(cache_key=cache_key).first()
+        if entry is None:
+            entry = DigestCache(cache_key=cache_key)
+            session.add(entry)
+        
+        entry.keyword = keyword
+        entry.hours = hours
+        entry.model_name = model_name
+        entry.prompt_version = prompt_version
+        entry.post_fingerprint = post_fingerprint
+        entry.result = json.dumps(result, ensure_ascii=False)
+        entry.prompt_chars = prompt_chars
+        entry.created_at = now
+        entry.expires_at = now + timedelta(hours=DIGEST_CACHE_TTL_HOURS)
+        entry.hit_count = 0
+        
+        # 清理过期条目
+        session.query(DigestCache).filter(DigestCache.expires_at <= now).delete(synchronize_session=False)
+        session.flush()
+        
+        # 超出上限时淘汰最早创建的条目
+        overflow = session.query(DigestCache).count() - DIGEST_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            stale_ids = [
+                row.id for row in session.query(DigestCache.id).order_by(DigestCache.created_at.asc()).limit(overflow)
+            ]
+            session.query(DigestCache).filter(DigestCache.id.in_(stale_ids)).delete(synchronize_session=False)
+        
+        session.commit()
+        return True
+    except Exception as e:
+        print(f"保存digest缓存失败: {e}")
+        return False
+    finally:
+        if session:
+            session.close()
+
+
+def set_digest_cache_history(cache_key, history_id):
+    """记录缓存条目对应的历史记录ID"""
+    session = None
+    try:
+        session = get_db_session()
+        session.query(DigestCache).filter_by(cache_key=cache_key).update({'history_id': history_id})
+        session.commit()
+        return True
+    except Exception as e:
+        print(f"更新digest缓存失败: {e}")
+        return False
+    finally:
+        if session:
+            session.close()
+
+
+def get_digest_cache_stats():
+    """
+    获取缓存统计
+    返回: {"entries": int, "hits": int, "saved_prompt_chars": int}
+    saved_prompt_chars 为命中缓存而未发送给LLM的Prompt字符数，可用于估算节省的调用成本
+    """
+    from sqlalchemy import func
+    
+    session = None
+    try:
+        session = get_db_session()
+        entries, hits, saved_chars = session.query(
+            func.count(DigestCache.id),
+            func.coalesce(func.sum(DigestCache.hit_count), 0),
+            func.coalesce(func.sum(DigestCache.hit_count * DigestCache.prompt_chars), 0)
+        ).filter(DigestCache.expires_at > datetime.now()).one()
+        
+        return {
+            "entries": int(entries),
+            "hits": int(hits),
+            "saved_prompt_chars": int(saved_chars)
+        }
+    except Exception as e:
+        print(f"获取digest缓存统计失败: {e}")
+        return {"entries": 0, "hits": 0, "saved_prompt_chars": 0}
+    finally:
+        if session:
+            session.close()
+
+
+
+def get_cached_chunk_summaries(chunk_keys):
+    """
+    批量读取未过期的分块摘要
+    返回: {chunk_key: summary}
+    """
+    if not chunk_keys:
+        return {}
+    
+    session = None
+    try:
+        session = get_db_session()
+        
+        entries = session.query(DigestChunkCache).filter(
+            DigestChunkCache.chunk_key.in_(list(chunk_keys)),
+            DigestChunkCache.expires_at > datetime.now()
+        ).all()
+        
+        if entries:
+            session.query(DigestChunkCache).filter(
+                DigestChunkCache.id.in_([e.id for e in entries])
+            ).update({'hit_count': DigestChunkCache.hit_count + 1}, synchronize_session=False)
+            session.commit()
+        
+        return {e.chunk_key: e.summary for e in entries}
+    except Exception as e:
+        print(f"读取分块摘要缓存失败: {e}")
+        return {}
+    finally:
+        if session:
+            session.close()
+
+
+def save_chunk_summary(chunk_key, keyword, model_name, prompt_version, post_count, summary):
+    """保存分块摘要到缓存，并清理过期条目"""
+    session = None
+    try:
+        session = get_db_session()
+        now = datetime.now()
+        
+        entry = session.query(DigestChunkCache).filter_by(chunk_key=chunk_key).first()
+        if entry is None:
+            entry = DigestChunkCache(chunk_key=chunk_key)
+            session.add(entry)
+        
+        entry.keyword = keyword
+        entry.model_name = model_name
+        entry.prompt_version = prompt_version
+        entry.post_count = post_count
+        entry.summary = summary
+        entry.created_at = now
+        entry.expires_at = now + timedelta(hours=DIGEST_CHUNK_CACHE_TTL_HOURS)
+        entry.hit_count = 0
+        
+        session.query(DigestChunkCache).filter(DigestChunkCache.expires_at <= now).delete(synchronize_session=False)
+        session.commit()
+        return True
+    except Exception as e:
+        print(f"保存分块摘要缓存失败: {e}")
+        return False
+    finally:
+        if session:
+            session.close()
+
+
+def create_digest_job(job_id, keyword, hours, max_count, auto_crawl, worker):
+    """新建排队中的后台任务"""
+    session = None
+    try:
+        session = get_db_session()
+        session.add(DigestJob(
+            job_id=job_id,
+            keyword=keyword,
+            hours=hours,
+            max_count=max_count,
+            auto_crawl=1 if auto_crawl else 0,
+            status='queued',
+            worker=worker,
+            created_at=datetime.now(),
+            updated_at=datetime.now()
+        ))
+        session.commit()
+        return True
+    except Exception as e:
+        print(f"创建后台任务失败: {e}")
+        return False
+    finally:
+        if session:
+            session.close()
+
+
+def update_digest_job(job_id, **fields):
+    """
+    更新后台任务字段
+    progress / result 传入 Python 对象，自动序列化为 JSON
+    """
+    import json
+    
+    session = None
+    try:
+        session = get_db_session()
+        for name in ('progress', 'result'):
+            if name in fields and fields[name] is not None and not isinstance(fields[name], str):
+                fields[name] = json.dumps(fields[name], ensure_ascii=False, default=str)
+        fields['updated_at'] = datetime.now()
+        session.query(DigestJob).filter_by(job_id=job_id).update(fields, synchronize_session=False)
+        session.commit()
+        return True
+    except Exception as e:
+        print(f"更新后台任务失败: {e}")
+        return False
+    finally:
+        if session:
+            session.close()
+
+
+def get_digest_job(job_id):
+    """根据 job_id 获取后台任务"""
+    session = None
+    try:
+        session = get_db_session()
+        job = session.query(DigestJob).filter_by(job_id=job_id).first()
+        return job.to_dict() if job else None
+    except Exception as e:
+        print(f"获取后台任务失败: {e}")
+        return None
+    finally:
+        if session:
+            session.close()
+
+
+def list_digest_jobs(statuses=None, limit=20):
+    """获取最近的后台任务（不含结果和流式摘要），可按状态过滤"""
+    session = None
+    try:
+        session = get_db_session()
+        query = session.query(
+            DigestJob.job_id, DigestJob.keyword, DigestJob.hours, DigestJob.status,
+            DigestJob.stage, DigestJob.created_at
+        )
+        if statuses:
+            query = query.filter(DigestJob.status.in_(list(statuses)))
+        rows = query.order_by(DigestJob.created_at.desc()).limit(limit).all()
+        return [
+            {
+                'job_id': r.job_id,
+                'keyword': r.keyword,
+                'hours': r.hours,
+                'status': r.status,
+                'stage': r.stage,
+                'created_at': r.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            }
+            for r in rows
+        ]
+    except Exception as e:
+        print(f"获取后台任务列表失败: {e}")
+        return []
+    finally:
+        if session:
+            session.close()
+
+
+def _process_alive(pid):
+    """本机进程是否仍在运行（signal 0 只检查进程是否存在，不发送信号）"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # 进程存在，但属于其他用户
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def mark_interrupted_jobs(host, current_worker):
+    """
+    把本机已退出进程留下的 queued / running 任务标记为 interrupted（进程已重启，任务不会再继续）
+    同一台机器上仍在运行的其他进程（另一个 Streamlit 实例、多进程部署的其他 worker）的任务不受影响
+    返回: 标记的任务数
+    """
+    session = None
+    try:
+        session = get_db_session()
+        workers = [row[0] for row in session.query(DigestJob.worker).filter(
+            DigestJob.status.in_(['queued', 'running']),
+            DigestJob.worker.like(f"{host}:%"),
+            DigestJob.worker != current_worker
+        ).distinct()]
+        
+        dead_workers = []
+        for worker in workers:
+            pid = worker.rsplit(':', 1)[-1]
+            if not pid.isdigit() or not _process_alive(int(pid)):
+                dead_workers.append(worker)
+        if not dead_workers:
+            return 0
+        
+        count = session.query(DigestJob).filter(
+            DigestJob.status.in_(['queued', 'running']),
+            DigestJob.worker.in_(dead_workers)
+        ).update({
+            'status': 'interrupted',
+            'error': '服务重启，任务已中断',
+            'finished_at': datetime.now(),
+            'updated_at': datetime.now()
+        }, synchronize_session=False)
+        session.commit()
+        return count
+    except Exception as e:
+        print(f"标记中断任务失败: {e}")
+        return 0
+    finally:
+        if session:
+            session.close()
+
+
+def enqueue_email(subject, text_body, html_body, recipients):
+    """
+    邮件正文写入一次，每个收件人写入一条待发送记录
+    返回: (message_id, 收件人数)，失败时 (None, 0)
+    """
+    session = None
+    try:
+        session = get_db_session()
+        message = EmailMessage(subject=subject, text_body=text_body, html_body=html_body)
+        session.add(message)
+        session.flush()
+        
+        now = datetime.now()
+        session.bulk_insert_mappings(EmailOutbox, [
+            dict(message_id=message.id, to_email=to_email, status='pending', attempts=0,
+                 next_attempt_at=now, created_at=now, updated_at=now)
+            for to_email in recipients
+        ])
+        session.commit()
+        return message.id, len(recipients)
+    except Exception as e:
+        print(f"写入发件箱失败: {e}")
+        return None, 0
+    finally:
+        if session:
+            session.close()
+
+
+def get_email_message(message_id):
+    """获取邮件正文 {'subject', 'text_body', 'html_body'}"""
+    session = None
+    try:
+        session = get_db_session()
+        message = session.query(EmailMessage).filter_by(id=message_id).first()
+        if message is None:
+            return None
+        return {'subject': message.subject, 'text_body': message.text_body, 'html_body': message.html_body}
+    except Exception as e:
+        print(f"获取邮件正文失败: {e}")
+        return None
+    finally:
+        if session:
+            session.close()
+
+
+def claim_outbox_emails(worker, limit=10):
+    """
+    领取到期的待发送邮件并标记为 sending（PostgreSQL 下用 SKIP LOCKED，多个进程不会领到同一封）
+    返回: [{'id', 'message_id', 'to_email', 'attempts'}]，attempts 已包含本次
+    """
+    session = None
+    try:
+        session = get_db_session()
+        now = datetime.now()
+        rows = session.query(EmailOutbox).filter(
+            EmailOutbox.status == 'pending',
+            EmailOutbox.next_attempt_at <= now
+        ).order_by(EmailOutbox.next_attempt_at.asc(), EmailOutbox.id.asc()).limit(limit).with_for_update(
+            skip_locked=True
+        ).all()
+        
+        claimed = []
+        for row in rows:
+            row.status = 'sending'
+            row.attempts += 1
+            row.worker = worker
+            row.updated_at = now
+            claimed.append({'id': row.id, 'message_id': row.message_id, 'to_email': row.to_email,
+                            'attempts': row.attempts})
+        session.commit()
+        return claimed
+    except Exception as e:
+        print(f"领取待发送邮件失败: {e}")
+        return []
+    finally:
+        if session:
+            session.close()
+
+
+def update_outbox_email(outbox_id, **fields):
+    """更新发件箱记录（status / last_error / latency_seconds / next_attempt_at / sent_at）"""
+    session = None
+    try:
+        session = get_db_session()
+        fields['updated_at'] = datetime.now()
+        session.query(EmailOutbox).filter_by(id=outbox_id).update(fields, synchronize_session=False)
+        session.commit()
+        return True
+    except Exception as e:
+        print(f"更新发件箱失败: {e}")
+        return False
+    finally:
+        if session:
+            session.close()
+
+
+def requeue_stale_emails(host, current_worker, stale_seconds=300):
+    """
+    把发送进程在投递途中退出而停留在 sending 的邮件放回队列
+    本机的记录按 worker（host:pid）检查进程是否存在，发送进程仍在运行时不动（避免重复发送）；
+    当前进程尚未开始发送，worker 与之相同的记录来自 pid 相同的旧进程
+    其他机器的进程无法检查，只放回超过 stale_seconds 未更新的记录（每封邮件开始投递时都会更新 updated_at）
+    返回: 放回的邮件数
+    """
+    session = None
+    try:
+        session = get_db_session()
+        now = datetime.now()
+        workers = [row[0] for row in session.query(EmailOutbox.worker).filter(
+            EmailOutbox.status == 'sending',
+            EmailOutbox.worker.like(f"{host}:%")
+        ).distinct()]
+        
+        dead_workers = []
+        for worker in workers:
+            pid = worker.rsplit(':', 1)[-1]
+            if worker == current_worker or not pid.isdigit() or not _process_alive(int(pid)):
+                dead_workers.append(worker)
+        
+        stale = and_(
+            or_(EmailOutbox.worker.is_(None), ~EmailOutbox.worker.like(f"{host}:%")),
+            EmailOutbox.updated_at < now - timedelta(seconds=stale_seconds)
+        )
+        requeue = or_(EmailOutbox.worker.in_(dead_workers), stale) if dead_workers else stale
+        count = session.query(EmailOutbox).filter(
+            EmailOutbox.status == 'sending',
+            requeue
+        ).update({
+            'status': 'pending',
+            'next_attempt_at': now,
+            'updated_at': now
+        }, synchronize_session=False)
+        session.commit()
+        return count
+    except Exception as e:
+        print(f"重置发件箱失败: {e}")
+        return 0
+    finally:
+        if session:
+            session.close()
+
+
+def get_outbox_status(message_id):
+    """
+    一封邮件的投递状态
+    返回: {'message_id', 'total', 'pending', 'sending', 'sent', 'failed', 'results': [...]}
+    """
+    session = None
+    try:
+        session = get_db_session()
+        rows = session.query(EmailOutbox).filter_by(message_id=message_id).order_by(EmailOutbox.id.asc()).all()
+        status = {'message_id': message_id, 'total': len(rows), 'pending': 0, 'sending': 0, 'sent': 0, 'failed': 0}
+        for row in rows:
+            status[row.status] = status.get(row.status, 0) + 1
+        status['results'] = [row.to_dict() for row in rows]
+        return status
+    except Exception as e:
+        print(f"获取投递状态失败: {e}")
+        return None
+    finally:
+        if session:
+            session.close()
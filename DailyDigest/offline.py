@@ -0,0 +1,171 @@
+"""
+Offline stand-ins for benchmarking the digest pipeline without network access.
+
+- stub_digest_response: deterministic LLM response in the digest format (markdown plus a
+  ```json cover card), or a short intermediate summary for map-reduce chunk prompts.
+- seed_weibo_notes / clear_seeded_notes: a reproducible synthetic weibo_note fixture.
+"""
+import re
+import json
+import random
+import hashlib
+from datetime import datetime
+
+from sqlalchemy import insert, delete, and_
+
+from MindSpider.DeepSentimentCrawling.MediaCrawler.database.db_session import get_session
+from MindSpider.DeepSentimentCrawling.MediaCrawler.database.models import WeiboNote
+from DailyDigest.prompts import CHUNK_SUMMARY_PROMPT
+
+# user_id of every fixture row, so cleanup never touches crawled data
+FIXTURE_USER_ID = "digest_fixture"
+# note_id range of fixture rows (far above real platform ids and Tavily hashes)
+FIXTURE_NOTE_ID_BASE = 9 * 10 ** 17
+
+_CHUNK_PROMPT_HEAD = CHUNK_SUMMARY_PROMPT.strip().split("\n", 1)[0][:20]
+
+_SENTIMENTS = [
+    (8.2, "积极", "Positive", "看涨"),
+    (6.5, "乐观", "Optimistic", "偏多"),
+    (5.0, "中性", "Neutral", "观望"),
+    (3.6, "谨慎", "Cautious", "偏空"),
+    (1.8, "恐慌", "Fear", "看跌"),
+]
+_TOPICS = [
+    ("财报预期", "Earnings"), ("产品发布", "Product launch"), ("估值争议", "Valuation"),
+    ("机构持仓", "Institutions"), ("技术路线", "Tech roadmap"), ("监管消息", "Regulation"),
+    ("期权异动", "Options flow"), ("管理层变动", "Leadership"),
+]
+_PHRASES = [
+    "{kw} earnings beat expectations, guidance looks strong",
+    "Loading more {kw} before the call, volume is picking up",
+    "{kw} is overvalued at these levels, waiting for a pullback",
+    "Deep dive: why {kw}'s roadmap matters for the next two years",
+    "Short interest on {kw} keeps climbing, careful here",
+    "{kw} options flow is unusually bullish today",
+    "Regulatory news could weigh on {kw} this quarter",
+    "{kw} 这波回调是上车机会还是下跌中继？",
+    "技术面看 {kw} 已经突破关键阻力位",
+    "HN thread: is {kw}'s architecture actually production ready?",
+]
+_PLATFORMS = [("reddit", 0.3), ("stocktwits", 0.5), ("hackernews", 0.2)]
+
+
+def _rng_for(text: str) -> random.Random:
+    return random.Random(int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:16], 16))
+
+
+def stub_digest_response(prompt: str) -> str:
+    """
+    Deterministic response for a digest or chunk-summary prompt.
+    The same prompt always produces the same text; the keyword, post count and links
+    are taken from the prompt so parsing and rendering see realistic content.
+    """
+    rng = _rng_for(prompt)
+    match = re.search(r'关键词 "(.+?)"', prompt)
+    keyword = match.group(1) if match else "TICKER"
+    urls = re.findall(r"(https?://\S+?)[)\s]", prompt)[:10]
+    post_count = len(re.findall(r"^帖子 \d+:", prompt, re.MULTILINE))
+    score, label, label_en, stance = _SENTIMENTS[rng.randrange(len(_SENTIMENTS))]
+    topics = rng.sample(_TOPICS, 3)
+
+    if prompt.lstrip().startswith(_CHUNK_PROMPT_HEAD):
+        lines = [
+            f"- **情绪倾向**：{label}，{stance}观点约占 {rng.randint(40, 80)}%",
+            "- **主要话题**：",
+            *[f"  - {zh}：{post_count or rng.randint(5, 50)} 条帖子提及" for zh, _ in topics],
+            "- **代表性帖子**：",
+            *[f"  - {topics[i % 3][0]}相关讨论 ({url})" for i, url in enumerate(urls[:5])],
+        ]
+        return "\n".join(lines)
+
+    references = "\n".join(f"- [{i + 1}] [Post {i + 1}]({url})" for i, url in enumerate(urls))
+    card = {
+        "ticker": keyword,
+        "sentiment_score": score,
+        "sentiment_label": label,
+        "sentiment_label_en": label_en,
+        "headline": f"{keyword}{topics[0][0]}引发热议"[:15],
+        "headline_en": f"{keyword}: {topics[0][1]} in focus"[:40],
+        "key_factors": [zh[:6] for zh, _ in topics],
+        "key_factors_en": [en[:15] for _, en in topics],
+    }
+    return (
+        f"**Disclaimer**: Aggregated from public information, not investment advice.\n\n"
+        f"## Daily Sentiment: {label_en}\n\n"
+        f"**Key Topics:**\n" + "".join(f"- {en}\n" for _, en in topics) +
+        f"\n**Summary:**\nDiscussion around {keyword} is {label_en.lower()} overall.\n\n"
+        f"**免责声明**：本内容基于网络公开信息汇总，不构成任何投资建议。\n\n"
+        f"## 每日情绪：{label}\n\n"
+        f"**关键话题：**\n" + "".join(f"- {zh}\n" for zh, _ in topics) +
+        f"\n**总结：**\n围绕 {keyword} 的讨论整体{label}，{stance}观点占多数。\n\n"
+        f"---\n\n### References\n{references}\n\n"
+        f"```json\n{json.dumps(card, ensure_ascii=False, indent=2)}\n```\n"
+    )
+
+
+def fixture_rows(keyword: str, count: int = 500, hours: int = 24, seed: int = 42,
+                 duplicate_ratio: float = 0.1, now_ms: int = None):
+    """
+    Build `count` synthetic weibo_note rows for the keyword, spread over the last `hours`.
+    Engagement is heavy-tailed and about duplicate_ratio of the posts repeat an earlier
+    text, so ranking and de-duplication have realistic work to do.
+    """
+    rng = random.Random(f"{seed}:{keyword}")
+    now_ms = now_ms or int(datetime.now().timestamp() * 1000)
+    window_ms = hours * 3_600_000
+    platforms, weights = zip(*_PLATFORMS)
+    keyword_offset = int(hashlib.sha256(keyword.encode("utf-8")).hexdigest()[:8], 16) * 10 ** 6
+
+    rows, texts = [], []
+    for i in range(count):
+        platform = rng.choices(platforms, weights)[0]
+        if texts and rng.random() < duplicate_ratio:
+            content = rng.choice(texts)
+        else:
+            sentences = [rng.choice(_PHRASES).format(kw=keyword) for _ in range(rng.randint(1, 6))]
+            content = f"{' '.join(sentences)} (#{i})"
+            texts.append(content)
+        create_time = now_ms - rng.randrange(window_ms)
+        note_id = FIXTURE_NOTE_ID_BASE + keyword_offset + i
+        rows.append(dict(
+            note_id=note_id,
+            note_url=f"https://example.com/{platform}/{note_id}",
+            content=content,
+            source_keyword=keyword,
+            platform=platform,
+            nickname="fixture",
+            user_id=FIXTURE_USER_ID,
+            avatar="",
+            liked_count=str(int(rng.paretovariate(1.2)) - 1),
+            comments_count=str(int(rng.paretovariate(1.5)) - 1),
+            shared_count="0",
+            add_ts=now_ms,
+            last_modify_ts=now_ms,
+            create_time=create_time,
+            create_date_time=datetime.fromtimestamp(create_time / 1000).strftime("%Y-%m-%d %H:%M:%S"),
+        ))
+    return rows
+
+
+async def clear_seeded_notes(keyword: str) -> int:
+    """Delete the fixture rows of the keyword. Returns the number of deleted rows."""
+    async with get_session() as session:
+        result = await session.execute(
+            delete(WeiboNote).where(and_(
+                WeiboNote.source_keyword == keyword,
+                WeiboNote.user_id == FIXTURE_USER_ID,
+            ))
+        )
+        return result.rowcount or 0
+
+
+async def seed_weibo_notes(keyword: str, count: int = 500, hours: int = 24, seed: int = 42,
+                           duplicate_ratio: float = 0.1) -> int:
+    """Replace the keyword's fixture rows with a fresh seeded set. Returns the number of rows."""
+    rows = fixture_rows(keyword, count, hours, seed, duplicate_ratio)
+    await clear_seeded_notes(keyword)
+    async with get_session() as session:
+        for start in range(0, len(rows), 1000):
+            await session.execute(insert(WeiboNote), rows[start:start + 1000])
+    return len(rows)
@@ -0,0 +1,192 @@
+"""
+Post selection for the Daily Digest prompt.
+
+Ranks posts by normalized engagement and recency, drops exact and near duplicates,
+caps per-post length and packs the result into a token budget.
+"""
+import math
+import re
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List
+
+# Token estimate: CJK characters are roughly one token each, other text ~4 chars per token
+_CJK_RE = re.compile(r'[぀-ヿ㐀-䶿一-鿿가-힯＀-￯]')
+_WORD_RE = re.compile(r'\w+')
+
+# Fixed per-post overhead of the prompt template ("帖子 N:", "链接:", separators...)
+POST_OVERHEAD_TOKENS = 30
+
+
+@dataclass(slots=True)
+class SelectedPost:
+    """Compact view of a post chosen for the prompt."""
+    note_id: int
+    note_url: str
+    content: str
+    liked_count: str
+    comments_count: str
+    platform: str
+    create_time: int
+    last_modify_ts: int
+    score: float
+    tokens: int
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate for mixed Chinese/English text."""
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def _to_int(value) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_WORD_RE.findall((text or "").lower()))
+
+
+def _simhash(text: str) -> int:
+    """64-bit SimHash over word 3-grams (character 3-grams for text without spaces)."""
+    tokens = text.split()
+    if len(tokens) < 3:
+        tokens = [text[i:i + 3] for i in range(max(len(text) - 2, 1))]
+    else:
+        tokens = [" ".join(tokens[i:i + 3]) for i in range(len(tokens) - 2)]
+
+    weights = [0] * 64
+    for token in tokens:
+        h = int.from_bytes(hashlib.md5(token.encode('utf-8')).digest()[:8], 'big')
+        for bit in range(64):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+class _NearDuplicateIndex:
+    """
+    SimHash index. Two posts within `max_distance` bits share at least one of the
+    (max_distance + 1) bands exactly, so only same-band candidates are compared.
+    """
+    def __init__(self, max_distance: int = 3):
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = 64 // self.bands
+        self.buckets = [dict() for _ in range(self.bands)]
+
+    def _band_keys(self, h: int):
+        mask = (1 << self.band_bits) - 1
+        return [(h >> (i * self.band_bits)) & mask for i in range(self.bands)]
+
+    def add_if_new(self, h: int) -> bool:
+        keys = self._band_keys(h)
+        for bucket, key in zip(self.buckets, keys):
+            for other in bucket.get(key, ()):
+                if bin(h ^ other).count("1") <= self.max_distance:
+                    return False
+        for bucket, key in zip(self.buckets, keys):
+            bucket.setdefault(key, []).append(h)
+        return True
+
+
+def select_posts(posts, token_budget: int = 40000, max_post_chars: int = 1500,
+                 platform_max_share: float = 0.6, recency_half_life_hours: float = 12.0,
+                 engagement_weight: float = 0.6) -> List[SelectedPost]:
+    """
+    Pick the posts to send to the LLM.
+
+    - score = engagement_weight * engagement + (1 - engagement_weight) * recency,
+      engagement is log-scaled likes + 2x comments normalized within each platform,
+      recency halves every `recency_half_life_hours`
+    - exact duplicates (same normalized text) and near duplicates (SimHash) are dropped,
+      keeping the higher-scored post
+    - content is cut to `max_post_chars`
+    - posts are packed greedily by score until `token_budget` is used; one platform may
+      take at most `platform_max_share` of the budget unless others have nothing left
+
+    Returns the selected posts, best first.
+    """
+    if not posts:
+        return []
+
+    now_ms = datetime.now().timestamp() * 1000
+
+    # Engagement normalized per platform so Stocktwits likes don't drown HN points
+    raw_engagement = [
+        math.log1p(_to_int(p.liked_count) + 2 * _to_int(p.comments_count)) for p in posts
+    ]
+    platform_max = {}
+    for p, e in zip(posts, raw_engagement):
+        platform = p.platform or "unknown"
+        platform_max[platform] = max(platform_max.get(platform, 0.0), e)
+
+    candidates = []
+    for p, e in zip(posts, raw_engagement):
+        platform = p.platform or "unknown"
+        engagement = e / platform_max[platform] if platform_max[platform] > 0 else 0.0
+        age_hours = max(now_ms - (p.create_time or now_ms), 0) / 3_600_000
+        recency = 0.5 ** (age_hours / recency_half_life_hours)
+        score = engagement_weight * engagement + (1 - engagement_weight) * recency
+        candidates.append((score, p))
+    candidates.sort(key=lambda item: item[0], reverse=True)
+
+    # Greedy packing by score; the per-platform share is enforced in the first pass and
+    # posts deferred by it fill whatever budget is left. Duplicate checks run only for
+    # posts that would fit, so a large backlog stops being hashed once the budget is full.
+    platform_cap = token_budget * platform_max_share
+    seen_exact = set()
+    near_index = _NearDuplicateIndex()
+    selected, deferred = [], []
+    used = 0
+    platform_used = {}
+    for score, p in candidates:
+        if token_budget - used < POST_OVERHEAD_TOKENS:
+            break
+
+        content = p.content or ""
+        if len(content) > max_post_chars:
+            content = content[:max_post_chars] + "…"
+        tokens = estimate_tokens(content) + estimate_tokens(p.note_url or "") + POST_OVERHEAD_TOKENS
+        if used + tokens > token_budget:
+            continue
+
+        normalized = _normalize(p.content)
+        exact_key = hashlib.md5(normalized.encode('utf-8')).hexdigest()
+        if exact_key in seen_exact:
+            continue
+        seen_exact.add(exact_key)
+        if normalized and not near_index.add_if_new(_simhash(normalized)):
+            continue
+
+        post = SelectedPost(
+            note_id=p.note_id,
+            note_url=p.note_url,
+            content=content,
+            liked_count=p.liked_count,
+            comments_count=p.comments_count,
+            platform=p.platform or "unknown",
+            create_time=p.create_time or 0,
+            last_modify_ts=p.last_modify_ts or 0,
+            score=score,
+            tokens=tokens,
+        )
+        if platform_used.get(post.platform, 0) + tokens > platform_cap:
+            deferred.append(post)
+            continue
+        selected.append(post)
+        used += tokens
+        platform_used[post.platform] = platform_used.get(post.platform, 0) + tokens
+
+    for post in deferred:
+        if used + post.tokens <= token_budget:
+            selected.append(post)
+            used += post.tokens
+
+    selected.sort(key=lambda p: p.score, reverse=True)
+    return selected
@@ -73,3 +73,26 @@ Finally, output a JSON object (and ONLY the JSON) at the very end of your respon
 
 Ensure the JSON is valid and appears at the very end of the response.
 """
+
+# Map-reduce 模式：分块摘要 Prompt（输入可以是帖子，也可以是上一级的分块摘要）
+CHUNK_SUMMARY_PROMPT = """
+你是一位专业的社交媒体舆情分析师。以下是关于关键词 "{keyword}" 的一批社交媒体材料（帖子或上一级的分批摘要），它只是完整数据的一部分。
+
+请提炼这批材料，输出一份供后续汇总使用的中间摘要（中文，不超过 400 字）：
+
+- **情绪倾向**：积极/消极/中性，以及看涨、看跌观点的大致比例
+- **主要话题**：3-5 个，每个一句话，保留关键数字、事件和论据
+- **代表性帖子**：最多 5 条，每条一句话概括并附上原链接，格式为 `- 概括 (URL)`
+
+不要输出用户ID，不要编造材料中没有的信息，不要输出 JSON。
+
+**材料：**
+{posts_text}
+"""
+
+# Map-reduce 模式：汇总阶段替代 {posts_text} 的说明文字
+MAP_REDUCE_POSTS_TEXT = """以下不是原始帖子，而是按时间分批整理的 {chunk_count} 份中间摘要（共覆盖 {post_count} 条帖子）。
+请把它们视为全部帖子的浓缩，“热门帖子亮点”和参考链接请使用摘要中给出的原链接。
+
+{summaries}
+"""
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# @Desc    : 爬虫进度解析测试（使用各平台爬虫实际输出的日志格式）
+
+import asyncio
+import contextvars
+import logging
+import unittest
+from types import SimpleNamespace
+
+from DailyDigest.crawl_progress import parse_progress_line, format_progress_event, CrawlerLogWatcher
+
+# 与 media_platform/*/core.py 中的日志格式一致；子进程输出的行前面带有日志前缀
+LOG_PREFIX = "2026-10-17 10:00:00 MediaCrawler INFO (core.py:53) - "
+
+
+class TestParseProgressLine(unittest.TestCase):
+
+    def assertEvent(self, line, **expected):
+        event = parse_progress_line(LOG_PREFIX + line)
+        self.assertIsNotNone(event, line)
+        for key, value in expected.items():
+            self.assertEqual(event.get(key), value, f"{key} of {line!r}")
+        return event
+
+    def test_start_lines(self):
+        self.assertEvent("[RedditCrawler] Starting search for keyword: NVDA, target: 100",
+                         platform='reddit', kind='start', keyword='NVDA', target=100)
+        self.assertEvent("[StocktwitsCrawler] Starting crawl for symbol: NVDA, target: 50",
+                         platform='stocktwits', kind='start', keyword='NVDA', target=50)
+        self.assertEvent("[HackerNewsCrawler] Starting crawl for: NVDA, target: 100",
+                         platform='hackernews', kind='start', keyword='NVDA', target=100)
+
+    def test_page_lines(self):
+        self.assertEvent("[RedditCrawler] Found 25 posts in this batch (Target: 100)",
+                         platform='reddit', kind='page', found=25, target=100)
+        self.assertEvent("[StocktwitsCrawler] Found 30 messages in this batch. (Total: 60)",
+                         platform='stocktwits', kind='page', found=30, total=60)
+        self.assertEvent("[HackerNewsCrawler] Found 20 stories on page 2",
+                         platform='hackernews', kind='page', found=20, page=2)
+
+    def test_cursor_keeps_text(self):
+        self.assertEvent("[RedditCrawler] Moving to next page. Cursor: t3_1abc9, Total: 50",
+                         kind='cursor', cursor='t3_1abc9', total=50)
+        event = self.assertEvent("[RedditCrawler] Moving to next page. Cursor: 12345, Total: 50", kind='cursor')
+        self.assertEqual(event['cursor'], '12345')
+
+    def test_done_and_stop_lines(self):
+        for tag in ("RedditCrawler", "StocktwitsCrawler", "HackerNewsCrawler"):
+            self.assertEvent(f"[{tag}] Search completed. Total processed: 42", kind='done', total=42)
+        self.assertEvent("[RedditCrawler] No more posts found for keyword: NVDA", kind='stop')
+        self.assertEvent("[RedditCrawler] Reached already-stored posts, stopping pagination.", kind='stop')
+        self.assertEvent("[RedditCrawler] No 'after' cursor, pagination finished.", kind='stop')
+        self.assertEvent("[StocktwitsCrawler] No data returned or end of stream.", kind='stop')
+        self.assertEvent("[StocktwitsCrawler] No more messages found.", kind='stop')
+        self.assertEvent("[HackerNewsCrawler] No more hits found.", kind='stop')
+
+    def test_blocked_lines(self):
+        self.assertEvent("[RedditCrawler] Search failed: 403 Forbidden: https://www.reddit.com/search.rss?q=NVDA",
+                         platform='reddit', kind='blocked')
+        self.assertEvent("[RedditClient] 403错误 via RSS", platform=None, kind='blocked')
+        self.assertIsNone(parse_progress_line(LOG_PREFIX + "[RedditCrawler] Found 1403 posts in total"))
+
+    def test_other_lines_are_ignored(self):
+        self.assertIsNone(parse_progress_line(LOG_PREFIX + "[HackerNewsCrawler] Filtering stories created after: 2026-10-16"))
+        self.assertIsNone(parse_progress_line("plain output without a crawler tag"))
+
+    def test_format_progress_event(self):
+        event = parse_progress_line("[HackerNewsCrawler] Found 20 stories on page 2")
+        self.assertEqual(format_progress_event(event), "第 2 页找到 20 条")
+        event = parse_progress_line("[HackerNewsCrawler] Starting crawl for: NVDA, target: 100")
+        self.assertEqual(format_progress_event(event), "开始爬取，目标 100 条")
+
+
+class TestCrawlerLogWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger("DailyDigestTestCrawler")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.run_config_var = contextvars.ContextVar("test_crawl_run_config", default=None)
+
+    def crawl(self, platform, keyword, tag):
+        async def _crawl():
+            self.run_config_var.set(SimpleNamespace(platform=platform, keywords=(keyword,)))
+            self.logger.info(f"[{tag}] Starting crawl for: {keyword}, target: 10")
+            await asyncio.sleep(0)
+            self.logger.info(f"[{tag}] Search completed. Total processed: 10")
+        return asyncio.create_task(_crawl())
+
+    def test_concurrent_crawls_of_one_platform_are_separated(self):
+        events = []
+
+        async def _scenario():
+            with CrawlerLogWatcher('hackernews', lambda p, e: events.append(e), 'NVDA', self.run_config_var,
+                                   logger_name=self.logger.name):
+                await asyncio.gather(
+                    self.crawl('hackernews', 'NVDA', 'HackerNewsCrawler'),
+                    self.crawl('hackernews', 'AMD', 'HackerNewsCrawler'),
+                    self.crawl('reddit', 'NVDA', 'RedditCrawler'),
+                )
+                # 不在任何爬取任务中的日志也不计入
+                self.logger.info("[HackerNewsCrawler] Search completed. Total processed: 99")
+
+        asyncio.run(_scenario())
+        self.assertEqual([(e['kind'], e.get('keyword')) for e in events], [('start', 'NVDA'), ('done', None)])
+        self.assertEqual(events[1]['total'], 10)
+        self.assertFalse(self.logger.handlers)
+
+    def test_platform_only_without_run_config(self):
+        events = []
+        with CrawlerLogWatcher('hackernews', lambda p, e: events.append(e), logger_name=self.logger.name):
+            self.logger.info("[HackerNewsCrawler] Found 20 stories on page 1")
+            self.logger.info("[RedditCrawler] Found 25 posts in this batch (Target: 100)")
+        self.assertEqual([e['platform'] for e in events], ['hackernews'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# @Desc    : 邮件发件箱测试（本地 aiosmtpd 服务器 + 临时 SQLite，不访问网络）
+
+import unittest
+
+try:
+    from DailyDigest.email_harness import run_harness
+except ImportError:  # aiosmtpd 未安装
+    run_harness = None
+
+
+@unittest.skipIf(run_harness is None, "requires aiosmtpd")
+class TestEmailOutbox(unittest.TestCase):
+
+    def test_delivers_every_recipient_over_reused_sessions(self):
+        report = run_harness(emails=60, senders=3)
+        self.assertEqual(report['sent'], 60)
+        self.assertEqual(report['delivered_to_server'], 60)
+        self.assertEqual(report['attempts'], {1: 60})
+        # 每个发送线程只建立一次 SMTP 会话
+        self.assertLessEqual(report['smtp_sessions'], 3)
+
+    def test_transient_failures_are_retried(self):
+        report = run_harness(emails=40, senders=2, transient_ratio=0.25, failures_per_recipient=2, max_attempts=3)
+        self.assertEqual(report['sent'], 40)
+        self.assertEqual(report['failed'], 0)
+        self.assertEqual(report['attempts'], {1: 30, 3: 10})
+
+    def test_gives_up_after_max_attempts(self):
+        report = run_harness(emails=20, senders=2, transient_ratio=0.2, failures_per_recipient=5, max_attempts=2)
+        self.assertEqual(report['sent'], 16)
+        self.assertEqual(report['failed'], 4)
+        self.assertEqual(report['attempts'], {1: 16, 2: 4})
+
+    def test_permanent_failures_are_not_retried(self):
+        report = run_harness(emails=20, senders=2, permanent_ratio=0.1)
+        self.assertEqual(report['sent'], 18)
+        self.assertEqual(report['failed'], 2)
+        self.assertEqual(report['attempts'], {1: 20})
+        self.assertTrue(all(error.startswith("Recipient refused: 550") for error in report['errors']))
+
+
+if __name__ == '__main__':
+    unittest.main()
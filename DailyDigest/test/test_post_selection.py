@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+# @Desc    : 帖子筛选测试（去重、token 估算、预算与单条长度上限）
+
+import random
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+
+from DailyDigest.post_selection import (
+    estimate_tokens, select_posts, _simhash, _normalize, _NearDuplicateIndex, POST_OVERHEAD_TOKENS
+)
+
+
+def make_post(note_id, content, liked=0, comments=0, platform="reddit", age_hours=1.0):
+    now_ms = int(datetime.now().timestamp() * 1000)
+    return SimpleNamespace(
+        note_id=note_id,
+        note_url=f"https://example.com/{note_id}",
+        content=content,
+        liked_count=str(liked),
+        comments_count=str(comments),
+        platform=platform,
+        create_time=now_ms - int(age_hours * 3_600_000),
+        last_modify_ts=now_ms,
+    )
+
+
+def random_text(seed, words):
+    rng = random.Random(seed)
+    return " ".join(f"w{rng.randrange(1000)}" for _ in range(words))
+
+
+DISTINCT_TEXTS = [
+    "NVDA earnings beat expectations and guidance looks strong for the next quarter",
+    "Short interest keeps climbing so be careful with leveraged positions here",
+    "Deep dive into the datacenter roadmap and why it matters for two years",
+    "Options flow is unusually bullish today with large call sweeps at the open",
+    "Regulatory news from Europe could weigh on margins later this year",
+    "Management change at the top raises questions about execution risk",
+]
+
+
+class TestEstimateTokens(unittest.TestCase):
+
+    def test_empty_text(self):
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens(None), 0)
+
+    def test_latin_text_is_about_four_chars_per_token(self):
+        self.assertEqual(estimate_tokens("abcd" * 10), 10)
+        self.assertEqual(estimate_tokens("abcde"), 2)
+
+    def test_cjk_characters_count_one_token_each(self):
+        self.assertEqual(estimate_tokens("英伟达财报超预期"), 8)
+        # 4 个汉字 + 8 个其他字符（含空格）
+        self.assertEqual(estimate_tokens("英伟达涨 NVDA up"), 4 + 2)
+        self.assertEqual(estimate_tokens("エヌビディア"), 6)
+        self.assertEqual(estimate_tokens("엔비디아"), 4)
+
+
+class TestNearDuplicates(unittest.TestCase):
+
+    def test_identical_text_has_identical_hash(self):
+        text = _normalize(DISTINCT_TEXTS[0])
+        self.assertEqual(_simhash(text), _simhash(text))
+
+    def test_index_rejects_hash_within_distance(self):
+        index = _NearDuplicateIndex(max_distance=3)
+        h = _simhash(_normalize(DISTINCT_TEXTS[0]))
+        self.assertTrue(index.add_if_new(h))
+        self.assertFalse(index.add_if_new(h ^ 0b101))
+        self.assertTrue(index.add_if_new(h ^ 0b1111))
+
+    def test_near_duplicate_posts_keep_the_higher_scored_one(self):
+        base = ("Loading more NVDA before the earnings call because volume is picking up fast "
+                "and the options market is pricing a big move after the report")
+        posts = [
+            make_post(1, base, liked=10),
+            make_post(2, base + "!!!", liked=500, comments=50),
+            make_post(3, base.upper(), liked=1),
+            make_post(4, DISTINCT_TEXTS[1], liked=5),
+        ]
+        selected = select_posts(posts)
+        self.assertEqual([p.note_id for p in selected], [2, 4])
+
+    def test_distinct_posts_are_all_kept(self):
+        posts = [make_post(i, text, liked=i) for i, text in enumerate(DISTINCT_TEXTS)]
+        self.assertEqual(len(select_posts(posts)), len(DISTINCT_TEXTS))
+
+
+class TestSelectPosts(unittest.TestCase):
+
+    def test_empty_input(self):
+        self.assertEqual(select_posts([]), [])
+
+    def test_token_budget_is_respected(self):
+        posts = [make_post(i, random_text(i, 200), liked=1000 - i) for i in range(60)]
+        # 所有帖子互不重复：数量的减少只来自预算
+        self.assertEqual(len(select_posts(posts, token_budget=10 ** 6)), len(posts))
+
+        budget = 2000
+        selected = select_posts(posts, token_budget=budget, platform_max_share=1.0)
+        self.assertTrue(selected)
+        self.assertLess(len(selected), len(posts))
+        self.assertLessEqual(sum(p.tokens for p in selected), budget)
+        # 按分数贪心装入：选中的是点赞最多的前几条
+        self.assertEqual(sorted(p.note_id for p in selected), list(range(len(selected))))
+
+    def test_content_is_capped_per_post(self):
+        posts = [make_post(1, "x" * 5000, liked=10)]
+        selected = select_posts(posts, max_post_chars=100)
+        self.assertEqual(selected[0].content, "x" * 100 + "…")
+        self.assertEqual(selected[0].tokens,
+                         estimate_tokens("x" * 100 + "…") + estimate_tokens(posts[0].note_url) + POST_OVERHEAD_TOKENS)
+
+    def test_platform_share_defers_but_fills_leftover_budget(self):
+        posts = [make_post(i, random_text(i, 80), liked=100, platform="reddit") for i in range(10)]
+        posts.append(make_post(100, DISTINCT_TEXTS[0], liked=1, platform="hackernews"))
+        post_tokens = select_posts(posts[:1])[0].tokens
+        budget = post_tokens * 6
+        selected = select_posts(posts, token_budget=budget, platform_max_share=0.3)
+
+        # 份额内的帖子先选，之后推迟的帖子填满剩余预算；低分的其他平台帖子不会被挤掉
+        self.assertIn(100, [p.note_id for p in selected])
+        reddit_tokens = sum(p.tokens for p in selected if p.platform == "reddit")
+        self.assertGreater(reddit_tokens, budget * 0.3)
+        self.assertLessEqual(sum(p.tokens for p in selected), budget)
+
+    def test_results_are_sorted_by_score(self):
+        posts = [make_post(i, text, liked=10 ** i) for i, text in enumerate(DISTINCT_TEXTS)]
+        selected = select_posts(posts)
+        scores = [p.score for p in selected]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual(selected[0].note_id, len(DISTINCT_TEXTS) - 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
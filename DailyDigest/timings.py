@@ -0,0 +1,73 @@
+"""
+Per-stage latency spans for the digest pipeline.
+
+A StageTimings collects one span per stage (crawl per platform, DB query, prompt build,
+LLM call, JSON parse, history save) with its duration and stage attributes such as row
+counts and prompt sizes. The collected spans are attached to the digest result and
+appended to a JSON-lines metrics log for later analysis.
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from loguru import logger
+
+# JSON-lines metrics log; relative paths are resolved against the project root
+METRICS_LOG_PATH = Path(__file__).resolve().parents[1] / os.getenv(
+    "DIGEST_METRICS_LOG", "logs/daily_digest_metrics.jsonl"
+)
+
+_metrics_log_lock = threading.Lock()
+
+
+class StageTimings:
+    """Ordered list of stage spans measured against one start time."""
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.spans = []
+
+    @contextmanager
+    def span(self, stage: str, **attrs):
+        """
+        Time the enclosed block as `stage`.
+        Yields the span dict, so the block can add attributes (rows, sizes) as it learns them.
+        """
+        entry = {"stage": stage, **attrs}
+        start = time.perf_counter()
+        try:
+            yield entry
+        except BaseException as e:
+            entry["error"] = type(e).__name__
+            raise
+        finally:
+            entry["start"] = round(start - self._start, 3)
+            entry["seconds"] = round(time.perf_counter() - start, 3)
+            self.spans.append(entry)
+
+    def total_seconds(self) -> float:
+        return round(time.perf_counter() - self._start, 3)
+
+    def to_dict(self) -> dict:
+        """{"started_at", "total_seconds", "spans": [...]} ordered by span start."""
+        return {
+            "started_at": self.started_at.strftime('%Y-%m-%d %H:%M:%S'),
+            "total_seconds": self.total_seconds(),
+            "spans": sorted((dict(s) for s in self.spans), key=lambda s: s["start"]),
+        }
+
+
+def write_metrics_log(kind: str, keyword: str, timings: dict, **fields):
+    """Append one JSON line {"kind", "keyword", ...timings, ...fields} to the metrics log."""
+    record = {"kind": kind, "keyword": keyword, **timings, **fields}
+    try:
+        METRICS_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with _metrics_log_lock, open(METRICS_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except Exception as e:
+        logger.warning(f"Failed to write digest metrics log: {e}")
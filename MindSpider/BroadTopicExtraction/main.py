@@ -115,7 +115,7 @@ class BroadTopicExtraction:
             
             # 步骤2: 提取关键词和生成总结
             logger.info("【步骤2】提取关键词和生成总结...")
-            keywords, summary = self.topic_extractor.extract_keywords_and_summary(
+            keywords, summary = await self.topic_extractor.extract_keywords_and_summary(
                 news_result['news_list'], 
                 max_keywords=max_keywords
             )
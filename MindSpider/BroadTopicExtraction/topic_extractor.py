@@ -8,9 +8,9 @@ BroadTopicExtraction模块 - 话题提取器
 import sys
 import json
 import re
+import asyncio
 from pathlib import Path
 from typing import List, Dict, Tuple
-from openai import OpenAI
 
 # 添加项目根目录到路径
 project_root = Path(__file__).parent.parent
@@ -22,18 +22,21 @@ try:
 except ImportError:
     raise ImportError("无法导入settings.py配置文件")
 
+from llm_client import OpenAICompatibleClient
+
 class TopicExtractor:
     """话题提取器"""
 
     def __init__(self):
         """初始化话题提取器"""
-        self.client = OpenAI(
+        self.model = settings.MINDSPIDER_MODEL_NAME
+        self.client = OpenAICompatibleClient(
             api_key=settings.MINDSPIDER_API_KEY,
-            base_url=settings.MINDSPIDER_BASE_URL
+            base_url=settings.MINDSPIDER_BASE_URL,
+            model_name=self.model
         )
-        self.model = settings.MINDSPIDER_MODEL_NAME
     
-    def extract_keywords_and_summary(self, news_list: List[Dict], max_keywords: int = 100) -> Tuple[List[str], str]:
+    async def extract_keywords_and_summary(self, news_list: List[Dict], max_keywords: int = 100) -> Tuple[List[str], str]:
         """
         从新闻列表中提取关键词和生成总结
         
@@ -54,19 +57,15 @@ class TopicExtractor:
         prompt = self._build_analysis_prompt(news_text, max_keywords)
         
         try:
-            # 调用DeepSeek API
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "你是一个专业的新闻分析师，擅长从热点新闻中提取关键词和撰写分析总结。"},
-                    {"role": "user", "content": prompt}
-                ],
+            # 调用DeepSeek API（共享客户端负责并发限制、超时和重试）
+            result_text = await self.client.complete(
+                prompt,
+                system="你是一个专业的新闻分析师，擅长从热点新闻中提取关键词和撰写分析总结。",
                 max_tokens=1500,
                 temperature=0.3
             )
             
             # 解析返回结果
-            result_text = response.choices[0].message.content
             keywords, summary = self._parse_analysis_result(result_text)
             
             print(f"成功提取 {len(keywords)} 个关键词并生成新闻总结")
@@ -280,7 +279,7 @@ if __name__ == "__main__":
         {"title": "明星最新动态", "source_platform": "娱乐新闻"}
     ]
     
-    keywords, summary = extractor.extract_keywords_and_summary(test_news)
+    keywords, summary = asyncio.run(extractor.extract_keywords_and_summary(test_news))
     
     print(f"提取的关键词: {keywords}")
     print(f"新闻总结: {summary}")
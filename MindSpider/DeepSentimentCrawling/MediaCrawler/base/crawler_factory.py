@@ -0,0 +1,50 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+from base.base_crawler import AbstractCrawler
+
+
+class CrawlerFactory:
+    @staticmethod
+    def create_crawler(platform: str) -> AbstractCrawler:
+        if platform == "xhs":
+            from media_platform.xhs import XiaoHongShuCrawler
+            return XiaoHongShuCrawler()
+        elif platform == "dy":
+            from media_platform.douyin import DouYinCrawler
+            return DouYinCrawler()
+        elif platform == "ks":
+            from media_platform.kuaishou import KuaishouCrawler
+            return KuaishouCrawler()
+        elif platform == "bili":
+            from media_platform.bilibili import BilibiliCrawler
+            return BilibiliCrawler()
+        elif platform == "wb":
+            from media_platform.weibo import WeiboCrawler
+            return WeiboCrawler()
+        elif platform == "tieba":
+            from media_platform.tieba import TieBaCrawler
+            return TieBaCrawler()
+        elif platform == "zhihu":
+            from media_platform.zhihu import ZhihuCrawler
+            return ZhihuCrawler()
+        elif platform == "reddit":
+            from media_platform.reddit import RedditCrawler
+            return RedditCrawler()
+        elif platform == "stocktwits":
+            from media_platform.stocktwits import StocktwitsCrawler
+            return StocktwitsCrawler()
+        elif platform == "hackernews":
+            from media_platform.hackernews import HackerNewsCrawler
+            return HackerNewsCrawler()
+        else:
+            raise ValueError(
+                "Invalid Media Platform Currently only supported xhs, dy, ks, bili, wb, tieba, zhihu, reddit"
+            )
@@ -173,6 +173,14 @@ async def parse_cmd(argv: Optional[Sequence[str]] = None):
                 rich_help_panel="基础配置",
             ),
         ] = config.KEYWORDS,
+        max_notes_count: Annotated[
+            int,
+            typer.Option(
+                "--max_notes_count",
+                help="每个关键词最大爬取帖子数量",
+                rich_help_panel="基础配置",
+            ),
+        ] = config.CRAWLER_MAX_NOTES_COUNT,
         get_comment: Annotated[
             str,
             typer.Option(
@@ -230,6 +238,7 @@ async def parse_cmd(argv: Optional[Sequence[str]] = None):
         config.CRAWLER_TYPE = crawler_type.value
         config.START_PAGE = start
         config.KEYWORDS = keywords
+        config.CRAWLER_MAX_NOTES_COUNT = max_notes_count
         config.ENABLE_GET_COMMENTS = enable_comment
         config.ENABLE_GET_SUB_COMMENTS = enable_sub_comment
         config.SAVE_DATA_OPTION = save_data_option.value
@@ -241,6 +250,7 @@ async def parse_cmd(argv: Optional[Sequence[str]] = None):
             type=config.CRAWLER_TYPE,
             start=config.START_PAGE,
             keywords=config.KEYWORDS,
+            max_notes_count=config.CRAWLER_MAX_NOTES_COUNT,
             get_comment=config.ENABLE_GET_COMMENTS,
             get_sub_comment=config.ENABLE_GET_SUB_COMMENTS,
             save_data_option=config.SAVE_DATA_OPTION,
@@ -79,6 +79,10 @@ START_PAGE = 1
 # 爬取视频/帖子的数量控制
 CRAWLER_MAX_NOTES_COUNT = 150
 
+# 增量爬取：记录每个(平台, 关键词)已入库的最新内容，再次爬取时遇到已入库内容即停止翻页
+# 目前用于 reddit | stocktwits | hackernews
+ENABLE_CRAWL_WATERMARK = True
+
 # 并发爬虫数量控制
 MAX_CONCURRENCY_NUM = 1
 
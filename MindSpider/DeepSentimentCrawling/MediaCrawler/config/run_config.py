@@ -0,0 +1,65 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+"""
+单次爬取运行配置
+
+进程内运行时，每次爬取通过 ContextVar 携带一份不可变配置，
+而不是修改全局 config 模块，因此同一进程内的多个爬取任务互不影响。
+"""
+
+import sys
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+
+@dataclass(frozen=True)
+class CrawlRunConfig:
+    """单次爬取的不可变配置"""
+
+    platform: str
+    keywords: Tuple[str, ...]
+    max_notes: int
+    crawler_type: str = "search"
+    save_data_option: str = "postgresql"
+    enable_get_comments: bool = False
+    max_comments_per_note: int = 10
+    reddit_subreddits: Tuple[str, ...] = field(default_factory=tuple)
+    use_watermark: bool = True
+
+
+crawl_run_config_var: ContextVar[Optional[CrawlRunConfig]] = ContextVar("crawl_run_config", default=None)
+
+
+def get_run_config() -> CrawlRunConfig:
+    """
+    获取当前爬取任务的配置
+    进程内运行时返回 ContextVar 中的配置；命令行运行时由全局 config 构建
+    """
+    run_config = crawl_run_config_var.get()
+    if run_config is not None:
+        return run_config
+
+    # 所在的 config 包（命令行参数会直接覆盖其中的全局值）
+    config = sys.modules[__package__]
+
+    keywords = tuple(k.strip() for k in (config.KEYWORDS or "").split(",") if k.strip())
+    return CrawlRunConfig(
+        platform=config.PLATFORM,
+        keywords=keywords,
+        max_notes=config.CRAWLER_MAX_NOTES_COUNT,
+        crawler_type=config.CRAWLER_TYPE,
+        save_data_option=config.SAVE_DATA_OPTION,
+        enable_get_comments=config.ENABLE_GET_COMMENTS,
+        max_comments_per_note=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
+        reddit_subreddits=tuple(getattr(config, "REDDIT_SUBREDDITS", []) or []),
+        use_watermark=getattr(config, "ENABLE_CRAWL_WATERMARK", True),
+    )
@@ -1,31 +1,63 @@
+import asyncio
+
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from contextlib import asynccontextmanager
-from .models import Base
+from .models import Base, WEIBO_NOTE_LIKED_INDEX, create_index_concurrently
 try:
     import config
     # Check if this is the correct config (MediaCrawler's config has SAVE_DATA_OPTION)
     if not hasattr(config, "SAVE_DATA_OPTION"):
         raise ImportError("Loaded root config instead of MediaCrawler config")
     from config.db_config import mysql_db_config, sqlite_db_config, postgresql_db_config
+    from config.run_config import crawl_run_config_var
 except (ImportError, ModuleNotFoundError, AttributeError):
     # Fallback to relative import (for when running as part of MindSpider package)
     from .. import config
     from ..config.db_config import mysql_db_config, sqlite_db_config, postgresql_db_config
+    from ..config.run_config import crawl_run_config_var
 
-# Keep a cache of engines
+# Keep a cache of engines, keyed by (event loop, db_type).
+# Async engines hold connections bound to the loop that opened them, so each loop gets its own.
 _engines = {}
+_session_factories = {}
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _forget_engine(key):
+    _engines.pop(key, None)
+    _session_factories.pop(key, None)
+
+
+def _prune_closed_loops():
+    """Release engines whose event loop has been closed (their connections can't be awaited any more)."""
+    for key in [k for k in _engines if k[0] is not None and k[0].is_closed()]:
+        engine = _engines[key]
+        # close=False drops the pool without touching connections of the dead loop
+        engine.sync_engine.dispose(close=False)
+        _forget_engine(key)
+
 
 async def close_engines():
-    """Close all cached engines."""
-    for engine in _engines.values():
+    """Dispose the engines of the current event loop."""
+    loop = _running_loop()
+    for key in [k for k in _engines if k[0] is loop]:
+        engine = _engines[key]
+        _forget_engine(key)
         await engine.dispose()
-    _engines.clear()
+    _prune_closed_loops()
+
 
 def clear_engine_cache():
-    """Clear the engine cache (useful when switching event loops)."""
-    _engines.clear()
+    """Release engines of event loops that have been closed (engines of live loops are kept)."""
+    _prune_closed_loops()
 
 
 async def create_database_if_not_exists(db_type: str):
@@ -57,12 +89,14 @@ def get_async_engine(db_type: str = None):
     if db_type is None:
         db_type = config.SAVE_DATA_OPTION
 
-    if db_type in _engines:
-        return _engines[db_type]
-
     if db_type in ["json", "csv"]:
         return None
 
+    key = (_running_loop(), db_type)
+    if key in _engines:
+        return _engines[key]
+    _prune_closed_loops()
+
     if db_type == "sqlite":
         db_url = f"sqlite+aiosqlite:///{sqlite_db_config['db_path']}"
     elif db_type == "mysql" or db_type == "db":
@@ -73,10 +107,20 @@ def get_async_engine(db_type: str = None):
         raise ValueError(f"Unsupported database type: {db_type}")
 
     engine = create_async_engine(db_url, echo=False)
-    _engines[db_type] = engine
+    _engines[key] = engine
     return engine
 
 
+def _get_session_factory(db_type: str):
+    engine = get_async_engine(db_type)
+    if not engine:
+        return None
+    key = (_running_loop(), db_type)
+    if key not in _session_factories:
+        _session_factories[key] = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    return _session_factories[key]
+
+
 async def create_tables(db_type: str = None):
     if db_type is None:
         db_type = config.SAVE_DATA_OPTION
@@ -85,15 +129,27 @@ async def create_tables(db_type: str = None):
     if engine:
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+        if db_type == "postgresql":
+            # Indexes added after the tables were first created are built without blocking writes
+            async with engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await conn.run_sync(create_index_concurrently, WEIBO_NOTE_LIKED_INDEX)
+
+
+def _current_db_type() -> str:
+    """In-process crawl runs carry their own save option; otherwise use the global config."""
+    run_config = crawl_run_config_var.get()
+    if run_config is not None:
+        return run_config.save_data_option
+    return config.SAVE_DATA_OPTION
 
 
 @asynccontextmanager
 async def get_session() -> AsyncSession:
-    engine = get_async_engine(config.SAVE_DATA_OPTION)
-    if not engine:
+    AsyncSessionFactory = _get_session_factory(_current_db_type())
+    if not AsyncSessionFactory:
         yield None
         return
-    AsyncSessionFactory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
     session = AsyncSessionFactory()
     try:
         yield session
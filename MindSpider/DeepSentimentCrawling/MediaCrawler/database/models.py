@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine, Column, Integer, Text, String, BigInteger
+from sqlalchemy import create_engine, Column, Integer, Text, String, BigInteger, UniqueConstraint, Index, case, cast, literal_column, text
+from sqlalchemy.sql.elements import Grouping
+from sqlalchemy.schema import CreateIndex
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -214,6 +216,45 @@ class WeiboNote(Base):
     source_keyword = Column(Text, default='')
     platform = Column(String(50), default='reddit', index=True)
 
+def numeric_text(column):
+    """
+    SQL expression casting a text counter column (e.g. liked_count) to BIGINT.
+    Empty or non-numeric values become 0. Literals are inlined so queries match the expression index below.
+    """
+    return case(
+        (column.regexp_match(literal_column("'^[0-9]+$'")), cast(column, BigInteger)),
+        else_=literal_column("0")
+    )
+
+# Top-K posts per keyword and platform by likes (Daily Digest top posts).
+# PostgreSQL only: the regex in the expression is not indexable on the other backends.
+WEIBO_NOTE_LIKED_INDEX = Index(
+    'idx_weibo_note_keyword_platform_liked',
+    WeiboNote.source_keyword,
+    WeiboNote.platform,
+    Grouping(numeric_text(WeiboNote.liked_count)).desc(),
+)
+WEIBO_NOTE_LIKED_INDEX.ddl_if(dialect='postgresql')
+
+def create_index_concurrently(connection, index):
+    """
+    Build `index` on an existing PostgreSQL table with CREATE INDEX CONCURRENTLY, so crawler inserts are
+    not blocked while it builds (create_all only adds indexes together with new tables).
+    `connection` must be in AUTOCOMMIT mode: CONCURRENTLY cannot run inside a transaction.
+    An index left INVALID by an interrupted concurrent build is dropped and built again.
+    """
+    valid = connection.execute(
+        text("SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"),
+        {"name": index.name}
+    ).scalar()
+    if valid:
+        return
+    if valid is not None:
+        connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}"))
+    # The index itself is declared without postgresql_concurrently, since create_all runs in a transaction
+    ddl = str(CreateIndex(index).compile(dialect=connection.dialect))
+    connection.execute(text(ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)))
+
 class WeiboNoteComment(Base):
     __tablename__ = 'weibo_note_comment'
     id = Column(Integer, primary_key=True)
@@ -432,4 +473,16 @@ class ZhihuCreator(Base):
     column_count = Column(Integer, default=0)
     get_voteup_count = Column(Integer, default=0)
     add_ts = Column(BigInteger)
-    last_modify_ts = Column(BigInteger)
\ No newline at end of file
+    last_modify_ts = Column(BigInteger)
+
+
+class CrawlWatermark(Base):
+    """Newest item already stored per (platform, source_keyword), used to stop incremental crawls early"""
+    __tablename__ = 'crawl_watermark'
+    __table_args__ = (UniqueConstraint('platform', 'source_keyword', name='uq_crawl_watermark_platform_keyword'),)
+    id = Column(Integer, primary_key=True)
+    platform = Column(String(50), nullable=False)
+    source_keyword = Column(String(255), nullable=False)
+    last_create_time = Column(BigInteger, nullable=False)
+    last_note_id = Column(BigInteger, nullable=False)
+    last_modify_ts = Column(BigInteger)
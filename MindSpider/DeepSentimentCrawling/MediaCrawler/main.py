@@ -17,49 +17,11 @@ import cmd_arg
 import config
 from database import db
 from base.base_crawler import AbstractCrawler
+from base.crawler_factory import CrawlerFactory
 from tools.async_file_writer import AsyncFileWriter
 from var import crawler_type_var
 
 
-class CrawlerFactory:
-    @staticmethod
-    def create_crawler(platform: str) -> AbstractCrawler:
-        if platform == "xhs":
-            from media_platform.xhs import XiaoHongShuCrawler
-            return XiaoHongShuCrawler()
-        elif platform == "dy":
-            from media_platform.douyin import DouYinCrawler
-            return DouYinCrawler()
-        elif platform == "ks":
-            from media_platform.kuaishou import KuaishouCrawler
-            return KuaishouCrawler()
-        elif platform == "bili":
-            from media_platform.bilibili import BilibiliCrawler
-            return BilibiliCrawler()
-        elif platform == "wb":
-            from media_platform.weibo import WeiboCrawler
-            return WeiboCrawler()
-        elif platform == "tieba":
-            from media_platform.tieba import TieBaCrawler
-            return TieBaCrawler()
-        elif platform == "zhihu":
-            from media_platform.zhihu import ZhihuCrawler
-            return ZhihuCrawler()
-        elif platform == "reddit":
-            from media_platform.reddit import RedditCrawler
-            return RedditCrawler()
-        elif platform == "stocktwits":
-            from media_platform.stocktwits import StocktwitsCrawler
-            return StocktwitsCrawler()
-        elif platform == "hackernews":
-            from media_platform.hackernews import HackerNewsCrawler
-            return HackerNewsCrawler()
-        else:
-            raise ValueError(
-                "Invalid Media Platform Currently only supported xhs, dy, ks, bili, wb, tieba, zhihu, reddit"
-            )
-
-
 crawler: Optional[AbstractCrawler] = None
 
 
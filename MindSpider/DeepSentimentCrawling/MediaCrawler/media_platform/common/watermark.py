@@ -0,0 +1,111 @@
+import weakref
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from database.models import CrawlWatermark
+from database.db_session import get_session
+from tools.utils import utils
+from config.run_config import get_run_config
+
+# Engines on which the watermark table has already been checked/created
+_checked_engines = weakref.WeakSet()
+
+
+async def _ensure_table(session):
+    engine = session.bind
+    if engine in _checked_engines:
+        return
+    await session.run_sync(lambda s: CrawlWatermark.__table__.create(s.connection(), checkfirst=True))
+    _checked_engines.add(engine)
+
+
+class CrawlWatermarkTracker:
+    """
+    Incremental crawl helper for one (platform, source_keyword).
+    Search results arrive newest first, so once an item at or below the stored watermark
+    shows up, everything after it was saved by an earlier run and pagination can stop.
+    """
+
+    def __init__(self, platform: str, keyword: str, enabled: Optional[bool] = None):
+        self.platform = platform
+        self.keyword = keyword
+        self.enabled = get_run_config().use_watermark if enabled is None else enabled
+        self.watermark: Optional[Tuple[int, int]] = None
+        self.newest: Optional[Tuple[int, int]] = None
+
+    async def load(self):
+        """Read the stored watermark (no-op when disabled or not saving to a database)"""
+        if not self.enabled:
+            return
+        try:
+            async with get_session() as session:
+                if session is None:
+                    self.enabled = False
+                    return
+                await _ensure_table(session)
+                row = (await session.execute(
+                    select(CrawlWatermark.last_create_time, CrawlWatermark.last_note_id).where(
+                        CrawlWatermark.platform == self.platform,
+                        CrawlWatermark.source_keyword == self.keyword,
+                    )
+                )).first()
+            if row:
+                self.watermark = (row.last_create_time, row.last_note_id)
+                utils.logger.info(
+                    f"[Watermark] {self.platform}/{self.keyword}: resuming after "
+                    f"{datetime.fromtimestamp(row.last_create_time / 1000)} (id {row.last_note_id})"
+                )
+        except Exception as e:
+            utils.logger.warning(f"[Watermark] Failed to load {self.platform}/{self.keyword}, doing a full crawl: {e}")
+            self.watermark = None
+
+    def is_seen(self, create_time: int, note_id: int) -> bool:
+        """True if the item is not newer than the stored watermark"""
+        if not self.watermark or not create_time or note_id is None:
+            return False
+        return (create_time, note_id) <= self.watermark
+
+    def observe(self, create_time: int, note_id: int):
+        """Record an item stored by this run"""
+        if not create_time or note_id is None:
+            return
+        if self.newest is None or (create_time, note_id) > self.newest:
+            self.newest = (create_time, note_id)
+
+    async def save(self):
+        """Move the stored watermark forward to the newest item of this run"""
+        if not self.enabled or self.newest is None:
+            return
+        if self.watermark and self.newest <= self.watermark:
+            return
+        now_ts = int(datetime.now().timestamp() * 1000)
+        try:
+            async with get_session() as session:
+                if session is None:
+                    return
+                await _ensure_table(session)
+                existing = (await session.execute(
+                    select(CrawlWatermark).where(
+                        CrawlWatermark.platform == self.platform,
+                        CrawlWatermark.source_keyword == self.keyword,
+                    )
+                )).scalars().first()
+                if existing is None:
+                    session.add(CrawlWatermark(
+                        platform=self.platform,
+                        source_keyword=self.keyword,
+                        last_create_time=self.newest[0],
+                        last_note_id=self.newest[1],
+                        last_modify_ts=now_ts,
+                    ))
+                elif (existing.last_create_time, existing.last_note_id) < self.newest:
+                    existing.last_create_time, existing.last_note_id = self.newest
+                    existing.last_modify_ts = now_ts
+        except IntegrityError:
+            # A concurrent run for the same keyword created the row first; the next run catches up
+            utils.logger.info(f"[Watermark] {self.platform}/{self.keyword} updated concurrently, skipped")
+        except Exception as e:
+            utils.logger.warning(f"[Watermark] Failed to save {self.platform}/{self.keyword}: {e}")
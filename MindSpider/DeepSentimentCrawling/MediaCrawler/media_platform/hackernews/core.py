@@ -7,7 +7,8 @@ from media_platform.hackernews.client import HackerNewsClient
 from database.models import WeiboNote
 from tools.utils import utils
 from var import crawler_type_var, source_keyword_var
-import config
+from config.run_config import get_run_config
+from media_platform.common.watermark import CrawlWatermarkTracker
 
 class HackerNewsCrawler(AbstractCrawler):
     def __init__(self):
@@ -20,18 +21,13 @@ class HackerNewsCrawler(AbstractCrawler):
     async def start(self):
         crawler_type = crawler_type_var.get()
         if crawler_type == "search":
-            if config.KEYWORDS:
-                keywords = config.KEYWORDS.split(',')
-                for keyword in keywords:
-                    keyword = keyword.strip()
-                    if not keyword:
-                        continue
-                    source_keyword_var.set(keyword)
-                    await self.search()
+            for keyword in get_run_config().keywords:
+                source_keyword_var.set(keyword)
+                await self.search()
 
     async def search(self):
         keyword = source_keyword_var.get()
-        target_count = config.CRAWLER_MAX_NOTES_COUNT
+        target_count = get_run_config().max_notes
         
         utils.logger.info(f"[HackerNewsCrawler] Starting crawl for: {keyword}, target: {target_count}")
         
@@ -45,6 +41,9 @@ class HackerNewsCrawler(AbstractCrawler):
         total_crawled = 0
         page = 0
         hits_per_page = 20
+        watermark = CrawlWatermarkTracker(self.platform, keyword)
+        await watermark.load()
+        reached_seen = False
         
         while total_crawled < target_count:
             data = await self.client.search_stories(keyword, hits_per_page=hits_per_page, page=page, min_timestamp=min_timestamp)
@@ -59,25 +58,38 @@ class HackerNewsCrawler(AbstractCrawler):
             utils.logger.info(f"[HackerNewsCrawler] Found {len(hits)} stories on page {page}")
             
             for hit in hits:
-                await self._process_hit(hit, keyword)
+                # search_by_date is newest first: the first already-stored story ends the crawl
+                story_id = int(hit.get('objectID') or 0)
+                create_time = int(hit.get('created_at_i', 0) * 1000)
+                if watermark.is_seen(create_time, story_id):
+                    reached_seen = True
+                    break
+                
+                if await self._process_hit(hit, keyword):
+                    watermark.observe(create_time, story_id)
                 total_crawled += 1
                 if total_crawled >= target_count:
                     break
             
+            if reached_seen:
+                utils.logger.info(f"[HackerNewsCrawler] Reached already-stored stories, stopping pagination.")
+                break
+            
             if total_crawled >= target_count:
                 break
                 
             page += 1
             await asyncio.sleep(1) # Polite delay
             
+        await watermark.save()
         utils.logger.info(f"[HackerNewsCrawler] Search completed. Total processed: {total_crawled}")
 
-    async def _process_hit(self, hit: Dict, keyword: str):
+    async def _process_hit(self, hit: Dict, keyword: str) -> bool:
         try:
             # ID
             story_id = str(hit.get('objectID'))
             if not story_id:
-                return
+                return False
             
             # Content
             title = hit.get('title', '')
@@ -121,6 +133,8 @@ class HackerNewsCrawler(AbstractCrawler):
             # Helper to save (using common store logic)
             from media_platform.common.store import save_or_update_note
             await save_or_update_note(note)
+            return True
             
         except Exception as e:
             utils.logger.error(f"[HackerNewsCrawler] Error processing hit {hit.get('objectID')}: {e}")
+            return False
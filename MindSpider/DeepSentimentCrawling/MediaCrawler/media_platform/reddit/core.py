@@ -7,7 +7,8 @@ from media_platform.reddit.client import RedditClient
 from database.models import WeiboNote, WeiboNoteComment
 from tools.utils import utils
 from var import crawler_type_var, source_keyword_var
-import config
+from config.run_config import get_run_config
+from media_platform.common.watermark import CrawlWatermarkTracker
 
 class RedditCrawler(AbstractCrawler):
     def __init__(self):
@@ -26,14 +27,9 @@ class RedditCrawler(AbstractCrawler):
         """
         crawler_type = crawler_type_var.get()
         if crawler_type == "search":
-            if config.KEYWORDS:
-                keywords = config.KEYWORDS.split(',')
-                for keyword in keywords:
-                    keyword = keyword.strip()
-                    if not keyword:
-                        continue
-                    source_keyword_var.set(keyword)
-                    await self.search()
+            for keyword in get_run_config().keywords:
+                source_keyword_var.set(keyword)
+                await self.search()
         elif crawler_type == "detail":
             # Not fully implemented yet, but structure is here
             pass
@@ -45,12 +41,11 @@ class RedditCrawler(AbstractCrawler):
         Search Reddit and map to WeiboNote with pagination
         """
         keyword = source_keyword_var.get()
-        target_count = config.CRAWLER_MAX_NOTES_COUNT
+        target_count = get_run_config().max_notes
         
         # 准备板块列表
-        subreddits = []
-        if hasattr(config, 'REDDIT_SUBREDDITS') and config.REDDIT_SUBREDDITS:
-            subreddits = config.REDDIT_SUBREDDITS
+        subreddits = list(get_run_config().reddit_subreddits)
+        if subreddits:
             utils.logger.info(f"[RedditCrawler] Applied subreddit filter: {len(subreddits)} subreddits")
         else:
             utils.logger.warning("[RedditCrawler] REDDIT_SUBREDDITS config NOT found or empty.")
@@ -60,6 +55,9 @@ class RedditCrawler(AbstractCrawler):
         try:
             total_crawled = 0
             after_cursor = None
+            watermark = CrawlWatermarkTracker(self.platform, keyword)
+            await watermark.load()
+            reached_seen = False
             
             while total_crawled < target_count:
                 # Calculate remaining needed, capped at 100 (API limit)
@@ -88,12 +86,25 @@ class RedditCrawler(AbstractCrawler):
 
                 for post in posts:
                     post_data = post['data']
-                    await self._process_post(post_data, keyword)
+                    
+                    # Results are sorted by new: the first already-stored post ends the crawl
+                    note_id = self._note_id(post_data)
+                    create_time = int(post_data.get('created_utc', 0) * 1000)
+                    if watermark.is_seen(create_time, note_id):
+                        reached_seen = True
+                        break
+                    
+                    if await self._process_post(post_data, keyword):
+                        watermark.observe(create_time, note_id)
                     total_crawled += 1
                     
                     if total_crawled >= target_count:
                         break
                 
+                if reached_seen:
+                    utils.logger.info("[RedditCrawler] Reached already-stored posts, stopping pagination.")
+                    break
+                
                 # Get next page cursor
                 after_cursor = search_data['data'].get('after')
                 if not after_cursor:
@@ -105,12 +116,30 @@ class RedditCrawler(AbstractCrawler):
                 # Simple delay to be nice to the API
                 await asyncio.sleep(1)
 
+            await watermark.save()
             utils.logger.info(f"[RedditCrawler] Search completed. Total processed: {total_crawled}")
 
         except Exception as e:
             utils.logger.error(f"[RedditCrawler] Search failed: {e}")
 
-    async def _process_post(self, post_data: Dict, keyword: str):
+    @staticmethod
+    def _note_id(post_data: Dict) -> Optional[int]:
+        """
+        Reddit post id (Base36) -> int note_id, None if missing or invalid
+        """
+        reddit_id_str = post_data.get('id', '')
+        if not reddit_id_str:
+            return None
+        # Convert Base36 string to Base10 integer
+        # Reddit IDs are like '1j2k3l', we treat them as base36 numbers
+        # User requirement: Strip prefix (e.g., t3_)
+        clean_id = reddit_id_str.split('_')[-1] if '_' in reddit_id_str else reddit_id_str
+        try:
+            return int(clean_id, 36) # Store as int for BigInteger column
+        except ValueError:
+            return None
+
+    async def _process_post(self, post_data: Dict, keyword: str) -> bool:
         """
         Process a single Reddit post and save as WeiboNote
         """
@@ -118,19 +147,12 @@ class RedditCrawler(AbstractCrawler):
             # 1. ID Conversion (Base36 -> Base10)
             reddit_id_str = post_data.get('id', '')
             if not reddit_id_str:
-                return
-            
-            # Convert Base36 string to Base10 integer
-            # Reddit IDs are like '1j2k3l', we treat them as base36 numbers
-            # User requirement: Strip prefix (e.g., t3_)
-            clean_id = reddit_id_str.split('_')[-1] if '_' in reddit_id_str else reddit_id_str
+                return False
             
-            try:
-                note_id_int = int(clean_id, 36)
-                note_id = note_id_int # Store as int for BigInteger column
-            except ValueError:
+            note_id = self._note_id(post_data)
+            if note_id is None:
                 utils.logger.error(f"[RedditCrawler] Failed to convert ID {reddit_id_str} to int")
-                return
+                return False
 
             # 2. Content Mapping
             title = post_data.get('title', '')
@@ -173,11 +195,13 @@ class RedditCrawler(AbstractCrawler):
             await save_or_update_note(note)
             
             # 5. Fetch Comments (if enabled)
-            if config.ENABLE_GET_COMMENTS:
+            if get_run_config().enable_get_comments:
                 await self._process_comments(post_data, note_id)
+            return True
             
         except Exception as e:
             utils.logger.error(f"[RedditCrawler] Error processing post: {e}")
+            return False
 
     async def _process_comments(self, post_data: Dict, db_note_id: int):
         """
@@ -199,7 +223,7 @@ class RedditCrawler(AbstractCrawler):
             comments_data = comment_listing.get('data', {}).get('children', [])
             
             # 2. Limit count
-            max_comments = config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES
+            max_comments = get_run_config().max_comments_per_note
             comments_data = comments_data[:max_comments]
             
             db_comments = []
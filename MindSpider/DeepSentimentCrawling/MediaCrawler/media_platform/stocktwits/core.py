@@ -7,7 +7,8 @@ from media_platform.stocktwits.client import StocktwitsClient
 from database.models import WeiboNote
 from tools.utils import utils
 from var import crawler_type_var, source_keyword_var
-import config
+from config.run_config import get_run_config
+from media_platform.common.watermark import CrawlWatermarkTracker
 
 class StocktwitsCrawler(AbstractCrawler):
     def __init__(self):
@@ -20,26 +21,24 @@ class StocktwitsCrawler(AbstractCrawler):
     async def start(self):
         crawler_type = crawler_type_var.get()
         if crawler_type == "search":
-            if config.KEYWORDS:
-                keywords = config.KEYWORDS.split(',')
-                for keyword in keywords:
-                    keyword = keyword.strip()
-                    if not keyword:
-                        continue
-                    source_keyword_var.set(keyword)
-                    await self.search()
+            for keyword in get_run_config().keywords:
+                source_keyword_var.set(keyword)
+                await self.search()
 
     async def search(self):
         """
         Fetch Stocktwits stream with pagination
         """
         keyword = source_keyword_var.get()
-        target_count = config.CRAWLER_MAX_NOTES_COUNT
+        target_count = get_run_config().max_notes
         
         utils.logger.info(f"[StocktwitsCrawler] Starting crawl for symbol: {keyword}, target: {target_count}")
         
         total_crawled = 0
         max_id = None # Cursor for next page (id < max)
+        watermark = CrawlWatermarkTracker(self.platform, keyword)
+        await watermark.load()
+        reached_seen = False
         
         while total_crawled < target_count:
             # Note: Stocktwits API doesn't support 'limit' > 30 effectively in some tier, but let's just loop.
@@ -58,32 +57,56 @@ class StocktwitsCrawler(AbstractCrawler):
             utils.logger.info(f"[StocktwitsCrawler] Found {len(messages)} messages in this batch. (Total: {total_crawled})")
             
             for msg in messages:
-                await self._process_message(msg, keyword)
+                # Stream is newest first: the first already-stored message ends the crawl
+                msg_id = int(msg.get('id', 0) or 0)
+                create_time = self._parse_create_time(msg.get('created_at', ''))
+                if watermark.is_seen(create_time, msg_id):
+                    reached_seen = True
+                    break
+                
+                if await self._process_message(msg, keyword):
+                    watermark.observe(create_time, msg_id)
                 total_crawled += 1
                 
                 # Update max_id to track the last seen ID for creating next cursor
                 # Stocktwits pagination: max={id} returns messages with id < {id}
-                current_id = int(msg.get('id', 0))
+                current_id = msg_id
                 if max_id is None or current_id < max_id:
                     max_id = current_id
                 
                 if total_crawled >= target_count:
                     break
             
+            if reached_seen:
+                utils.logger.info(f"[StocktwitsCrawler] Reached already-stored messages, stopping pagination.")
+                break
+            
             if total_crawled >= target_count:
                 break
                 
             # Sleep slightly
             await asyncio.sleep(1)
             
+        await watermark.save()
         utils.logger.info(f"[StocktwitsCrawler] Search completed. Total processed: {total_crawled}")
             
-    async def _process_message(self, msg: Dict, keyword: str):
+    @staticmethod
+    def _parse_create_time(created_at_str: str) -> int:
+        """Created at: "2024-12-10T14:30:00Z" -> ms timestamp, 0 if missing or invalid"""
+        if created_at_str:
+            try:
+                dt = datetime.fromisoformat(created_at_str.replace('Z', '+00:00'))
+                return int(dt.timestamp() * 1000)
+            except:
+                pass
+        return 0
+
+    async def _process_message(self, msg: Dict, keyword: str) -> bool:
         try:
             # ID
             msg_id = msg.get('id')
             if not msg_id:
-                return
+                return False
             
             # Sentiment Extraction
             # entities -> sentiment -> basic (Bullish/Bearish)
@@ -101,15 +124,7 @@ class StocktwitsCrawler(AbstractCrawler):
                 content = body
                 
             # Time
-            # Created at: "2024-12-10T14:30:00Z"
-            created_at_str = msg.get('created_at', '')
-            create_time = 0
-            if created_at_str:
-                try:
-                    dt = datetime.fromisoformat(created_at_str.replace('Z', '+00:00'))
-                    create_time = int(dt.timestamp() * 1000)
-                except:
-                    pass
+            create_time = self._parse_create_time(msg.get('created_at', ''))
             
             if create_time == 0:
                 create_time = int(datetime.now().timestamp() * 1000)
@@ -144,9 +159,11 @@ class StocktwitsCrawler(AbstractCrawler):
             note.platform = "stocktwits" # Unified field we added
             
             await self._save_note(note)
+            return True
             
         except Exception as e:
             utils.logger.error(f"[StocktwitsCrawler] Error processing message {msg.get('id')}: {e}")
+            return False
 
     async def _save_note(self, note: WeiboNote):
         # Save to DB
@@ -0,0 +1,136 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+"""
+MediaCrawler 进程内运行入口
+
+在调用方的事件循环中直接运行 CrawlerFactory.create_crawler(...).start()，
+每次运行使用一份不可变的 CrawlRunConfig，不修改 config/base_config.py，
+因此同一进程内可以并发运行多个爬取任务。
+"""
+
+import asyncio
+import importlib
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple, Union
+
+import config
+from base.crawler_factory import CrawlerFactory
+from config.run_config import CrawlRunConfig, crawl_run_config_var
+from database.db_session import close_engines
+from tools import utils
+from var import crawler_type_var
+
+# 各平台在运行时才导入的模块，嵌入到其他进程时可提前导入
+_PLATFORM_MODULES = {
+    "reddit": ("media_platform.reddit", "media_platform.reddit.store", "media_platform.common.store"),
+    "stocktwits": ("media_platform.stocktwits", "media_platform.common.store"),
+    "hackernews": ("media_platform.hackernews", "media_platform.common.store"),
+}
+
+
+@dataclass(frozen=True)
+class CrawlRunResult:
+    """单次爬取结果"""
+
+    platform: str
+    keywords: Tuple[str, ...]
+    success: bool
+    duration_seconds: float
+    error: str = ""
+
+
+def preload_platforms(platforms: Iterable[str]):
+    """
+    提前导入平台爬虫及其存储模块
+    当宿主进程的 sys.modules 中存在其他名为 config 的模块时，应在导入本模块的同时调用
+    """
+    for platform in platforms:
+        for module_name in _PLATFORM_MODULES.get(platform, ()):
+            importlib.import_module(module_name)
+
+
+async def run_crawl_config(run_config: CrawlRunConfig) -> CrawlRunResult:
+    """按给定配置在当前事件循环中运行一次爬取"""
+
+    async def _run():
+        crawl_run_config_var.set(run_config)
+        crawler_type_var.set(run_config.crawler_type)
+        crawler = CrawlerFactory.create_crawler(platform=run_config.platform)
+        await crawler.start()
+
+    start_time = time.perf_counter()
+    try:
+        # 在独立的 Task 中运行，ContextVar 的修改不会泄漏到调用方
+        await asyncio.create_task(_run())
+        return CrawlRunResult(
+            platform=run_config.platform,
+            keywords=run_config.keywords,
+            success=True,
+            duration_seconds=time.perf_counter() - start_time,
+        )
+    except Exception as e:
+        utils.logger.error(f"[runner] {run_config.platform} crawl failed: {e}")
+        return CrawlRunResult(
+            platform=run_config.platform,
+            keywords=run_config.keywords,
+            success=False,
+            duration_seconds=time.perf_counter() - start_time,
+            error=str(e),
+        )
+
+
+async def run_crawl(
+    platform: str,
+    keywords: Union[str, Iterable[str]],
+    max_notes: int,
+    crawler_type: str = "search",
+    save_data_option: str = "postgresql",
+    enable_get_comments: bool = False,
+    reddit_subreddits: Optional[Iterable[str]] = None,
+    use_watermark: Optional[bool] = None,
+) -> CrawlRunResult:
+    """
+    进程内运行爬虫
+
+    Args:
+        platform: 平台名称，如 reddit | stocktwits | hackernews
+        keywords: 关键词列表，或以英文逗号分隔的字符串
+        max_notes: 每个关键词最大爬取数量
+        crawler_type: 爬取类型
+        save_data_option: 数据保存方式
+        enable_get_comments: 是否爬取评论
+        reddit_subreddits: Reddit 板块过滤，默认使用 base_config 中的 REDDIT_SUBREDDITS
+        use_watermark: 是否增量爬取（遇到已入库内容停止翻页），默认使用 base_config 中的 ENABLE_CRAWL_WATERMARK
+
+    Returns:
+        CrawlRunResult
+    """
+    if isinstance(keywords, str):
+        keywords = keywords.split(",")
+    if reddit_subreddits is None:
+        reddit_subreddits = getattr(config, "REDDIT_SUBREDDITS", []) or []
+    if use_watermark is None:
+        use_watermark = getattr(config, "ENABLE_CRAWL_WATERMARK", True)
+
+    run_config = CrawlRunConfig(
+        platform=platform,
+        keywords=tuple(k.strip() for k in keywords if k and k.strip()),
+        max_notes=max_notes,
+        crawler_type=crawler_type,
+        save_data_option=save_data_option,
+        enable_get_comments=enable_get_comments,
+        max_comments_per_note=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
+        reddit_subreddits=tuple(reddit_subreddits),
+        use_watermark=use_watermark,
+    )
+    return await run_crawl_config(run_config)
+
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# @Desc    : 增量爬取水位线测试（比较规则使用内存对象，保存/读取使用临时 SQLite 数据库）
+
+import asyncio
+import os
+import tempfile
+import unittest
+
+from config.run_config import CrawlRunConfig, crawl_run_config_var
+from database import db_session
+from media_platform.common.watermark import CrawlWatermarkTracker
+
+
+class TestWatermarkCompare(unittest.TestCase):
+
+    def setUp(self):
+        self.tracker = CrawlWatermarkTracker("reddit", "NVDA", enabled=True)
+        self.tracker.watermark = (1000, 5)
+
+    def test_equal_create_time_breaks_tie_by_note_id(self):
+        self.assertTrue(self.tracker.is_seen(1000, 4))
+        self.assertTrue(self.tracker.is_seen(1000, 5))
+        self.assertFalse(self.tracker.is_seen(1000, 6))
+
+    def test_create_time_dominates_note_id(self):
+        self.assertTrue(self.tracker.is_seen(999, 10 ** 9))
+        self.assertFalse(self.tracker.is_seen(1001, 0))
+
+    def test_missing_values_are_never_seen(self):
+        self.assertFalse(self.tracker.is_seen(0, 1))
+        self.assertFalse(self.tracker.is_seen(None, 1))
+        self.assertFalse(self.tracker.is_seen(1000, None))
+        self.tracker.watermark = None
+        self.assertFalse(self.tracker.is_seen(1, 1))
+
+    def test_observe_keeps_newest_with_tie_break(self):
+        self.tracker.observe(2000, 3)
+        self.tracker.observe(2000, 7)
+        self.tracker.observe(2000, 4)
+        self.tracker.observe(1500, 99)
+        self.tracker.observe(0, 100)
+        self.tracker.observe(3000, None)
+        self.assertEqual(self.tracker.newest, (2000, 7))
+
+
+class TestWatermarkPersistence(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.saved_db_path = db_session.sqlite_db_config["db_path"]
+        db_session.sqlite_db_config["db_path"] = os.path.join(self.tmp_dir.name, "watermark.db")
+
+    def tearDown(self):
+        db_session.sqlite_db_config["db_path"] = self.saved_db_path
+        self.tmp_dir.cleanup()
+
+    def run_async(self, coro_fn):
+        async def _run():
+            crawl_run_config_var.set(CrawlRunConfig(platform="reddit", keywords=("NVDA",), max_notes=10,
+                                                    save_data_option="sqlite"))
+            try:
+                return await coro_fn()
+            finally:
+                await db_session.close_engines()
+        return asyncio.run(_run())
+
+    async def stored(self, keyword="NVDA"):
+        tracker = CrawlWatermarkTracker("reddit", keyword, enabled=True)
+        await tracker.load()
+        return tracker.watermark
+
+    def test_save_then_load(self):
+        async def _scenario():
+            tracker = CrawlWatermarkTracker("reddit", "NVDA", enabled=True)
+            await tracker.load()
+            self.assertIsNone(tracker.watermark)
+            tracker.observe(2000, 1)
+            tracker.observe(2000, 2)
+            await tracker.save()
+            return await self.stored()
+        self.assertEqual(self.run_async(_scenario), (2000, 2))
+
+    def test_save_does_not_move_watermark_backward(self):
+        async def _scenario():
+            newer = CrawlWatermarkTracker("reddit", "NVDA", enabled=True)
+            older = CrawlWatermarkTracker("reddit", "NVDA", enabled=True)
+            # 两次运行都在没有水位线时开始；较新的一次先保存
+            await newer.load()
+            await older.load()
+            newer.observe(3000, 1)
+            await newer.save()
+            older.observe(2000, 9)
+            await older.save()
+            after_older = await self.stored()
+
+            # 已加载水位线的运行只观察到更旧的帖子时不写入
+            stale = CrawlWatermarkTracker("reddit", "NVDA", enabled=True)
+            await stale.load()
+            stale.observe(3000, 0)
+            await stale.save()
+            return after_older, await self.stored()
+        self.assertEqual(self.run_async(_scenario), ((3000, 1), (3000, 1)))
+
+    def test_watermarks_are_per_keyword(self):
+        async def _scenario():
+            tracker = CrawlWatermarkTracker("reddit", "AMD", enabled=True)
+            tracker.observe(5000, 1)
+            await tracker.save()
+            return await self.stored("NVDA"), await self.stored("AMD")
+        self.assertEqual(self.run_async(_scenario), (None, (5000, 1)))
+
+    def test_disabled_watermark_neither_loads_nor_saves(self):
+        async def _scenario():
+            enabled = CrawlWatermarkTracker("reddit", "NVDA", enabled=True)
+            enabled.observe(2000, 1)
+            await enabled.save()
+
+            disabled = CrawlWatermarkTracker("reddit", "NVDA", enabled=False)
+            await disabled.load()
+            self.assertIsNone(disabled.watermark)
+            self.assertFalse(disabled.is_seen(1000, 1))
+            disabled.observe(9000, 1)
+            await disabled.save()
+            return await self.stored()
+        self.assertEqual(self.run_async(_scenario), (2000, 1))
+
+    def test_disabled_by_run_config(self):
+        async def _scenario():
+            crawl_run_config_var.set(CrawlRunConfig(platform="reddit", keywords=("NVDA",), max_notes=10,
+                                                    save_data_option="sqlite", use_watermark=False))
+            return CrawlWatermarkTracker("reddit", "NVDA").enabled
+        self.assertFalse(self.run_async(_scenario))
+
+
+if __name__ == '__main__':
+    unittest.main()
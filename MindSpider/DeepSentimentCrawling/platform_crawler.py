@@ -159,6 +159,10 @@ postgresql_db_config = {{
         """
         创建MediaCrawler的基础配置
         
+        只写入与单次运行无关的公共配置（评论数量、无头模式）。
+        平台、关键词、爬取类型、数量和保存方式通过命令行参数传给 main.py，
+        不再写入 base_config.py，避免并发运行时互相覆盖。
+        
         Args:
             platform: 平台名称
             keywords: 关键词列表
@@ -169,49 +173,31 @@ postgresql_db_config = {{
             是否配置成功
         """
         try:
-            # 判断数据库类型，确定 SAVE_DATA_OPTION
-            db_dialect = (config.settings.DB_DIALECT or "mysql").lower()
-            is_postgresql = db_dialect in ("postgresql", "postgres")
-            save_data_option = "postgresql" if is_postgresql else "db"
-            
             base_config_path = self.mediacrawler_path / "config" / "base_config.py"
             
-            # 将关键词列表转换为逗号分隔的字符串
-            keywords_str = ",".join(keywords)
-            
             # 读取原始配置文件
             with open(base_config_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             
-            # 修改关键配置项
+            # 修改公共配置项
             lines = content.split('\n')
             new_lines = []
             
             for line in lines:
-                if line.startswith('PLATFORM = '):
-                    new_lines.append(f'PLATFORM = "{platform}"  # 平台，xhs | dy | ks | bili | wb | tieba | zhihu | reddit')
-                elif line.startswith('KEYWORDS = '):
-                    new_lines.append(f'KEYWORDS = "{keywords_str}"  # 关键词搜索配置，以英文逗号分隔')
-                elif line.startswith('CRAWLER_TYPE = '):
-                    new_lines.append(f'CRAWLER_TYPE = "{crawler_type}"  # 爬取类型，search(关键词搜索) | detail(帖子详情)| creator(创作者主页数据)')
-                elif line.startswith('SAVE_DATA_OPTION = '):
-                    new_lines.append(f'SAVE_DATA_OPTION = "{save_data_option}"  # csv or db or json or sqlite or postgresql')
-                elif line.startswith('CRAWLER_MAX_NOTES_COUNT = '):
-                    new_lines.append(f'CRAWLER_MAX_NOTES_COUNT = {max_notes}')
-                elif line.startswith('ENABLE_GET_COMMENTS = '):
-                    new_lines.append('ENABLE_GET_COMMENTS = True')
-                elif line.startswith('CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES = '):
+                if line.startswith('CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES = '):
                     new_lines.append('CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES = 20')
                 elif line.startswith('HEADLESS = '):
                     new_lines.append('HEADLESS = True')  # 使用无头模式
                 else:
                     new_lines.append(line)
             
-            # 写入新配置
-            with open(base_config_path, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(new_lines))
+            new_content = '\n'.join(new_lines)
+            if new_content != content:
+                # 写入新配置
+                with open(base_config_path, 'w', encoding='utf-8') as f:
+                    f.write(new_content)
             
-            logger.info(f"已配置 {platform} 平台，爬取类型: {crawler_type}，关键词数量: {len(keywords)}，最大爬取数量: {max_notes}，保存数据方式: {save_data_option}")
+            logger.info(f"已配置 {platform} 平台，爬取类型: {crawler_type}，关键词数量: {len(keywords)}，最大爬取数量: {max_notes}")
             return True
             
         except Exception as e:
@@ -264,6 +250,9 @@ postgresql_db_config = {{
                 "--platform", platform,
                 "--lt", login_type,
                 "--type", "search",
+                "--keywords", ",".join(keywords),
+                "--max_notes_count", str(max_notes),
+                "--get_comment", "yes",
                 "--save_data_option", save_data_option
             ]
             
@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MindSpider - 通用异步 LLM 客户端
+Gemini 与 OpenAI 兼容接口（DeepSeek 等）共用的调用层：
+- 每个事件循环复用同一个 SDK 客户端（连接池）
+- 同一服务的所有调用共享并发上限
+- 429/5xx/超时/连接错误按指数退避（带随机抖动）重试
+- 单次请求超时
+- 记录每次调用的耗时和 token 用量
+另有两个离线实现，供基准测试/压测使用：
+- StubLLMClient：固定延迟返回确定性文本，不访问网络
+- ReplayLLMClient：按 prompt 哈希录制真实响应，之后离线回放
+"""
+
+import os
+import json
+import hashlib
+import random
+import asyncio
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "30"))
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+# 每个事件循环各自的 SDK 客户端和信号量（asyncio 原语和 HTTP 连接都不能跨循环使用）
+_loop_states = weakref.WeakKeyDictionary()
+
+
+def _loop_state() -> Dict:
+    loop = asyncio.get_running_loop()
+    state = _loop_states.get(loop)
+    if state is None:
+        state = {"clients": {}, "semaphores": {}}
+        _loop_states[loop] = state
+    return state
+
+
+def status_code_of(exc: Exception) -> Optional[int]:
+    """从 SDK 异常中取 HTTP 状态码（openai: status_code，google-genai: code）"""
+    for attr in ("status_code", "code", "status"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_retryable(exc: Exception) -> bool:
+    """判断异常是否值得重试：限流、服务端错误、超时和连接错误"""
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = status_code_of(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    name = type(exc).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def backoff_delay(attempt: int, base: float = LLM_BACKOFF_BASE_SECONDS, cap: float = LLM_BACKOFF_MAX_SECONDS) -> float:
+    """第 attempt 次重试前的等待时间（full jitter）"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class LLMMetrics:
+    """进程内 LLM 调用统计，按 provider:model 聚合"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, key: str, latency: float, attempts: int, success: bool,
+               input_tokens: int = 0, output_tokens: int = 0):
+        with self._lock:
+            stats = self._stats.setdefault(key, {
+                "calls": 0, "failures": 0, "retries": 0, "latency_seconds": 0.0,
+                "max_latency_seconds": 0.0, "input_tokens": 0, "output_tokens": 0,
+            })
+            stats["calls"] += 1
+            stats["failures"] += 0 if success else 1
+            stats["retries"] += max(attempts - 1, 0)
+            stats["latency_seconds"] += latency
+            stats["max_latency_seconds"] = max(stats["max_latency_seconds"], latency)
+            stats["input_tokens"] += input_tokens or 0
+            stats["output_tokens"] += output_tokens or 0
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """返回各模型的统计副本，附带平均耗时"""
+        with self._lock:
+            result = {}
+            for key, stats in self._stats.items():
+                item = dict(stats)
+                item["avg_latency_seconds"] = stats["latency_seconds"] / stats["calls"] if stats["calls"] else 0.0
+                result[key] = item
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+llm_metrics = LLMMetrics()
+
+
+class AsyncLLMClient(ABC):
+    """
+    异步 LLM 客户端基类
+    子类实现 _create_sdk_client / _complete_once / _stream_once
+    """
+
+    provider = "base"
+
+    def __init__(self, model_name: str, max_concurrency: int = None, timeout: float = None,
+                 max_retries: int = None):
+        self.model_name = model_name
+        self.max_concurrency = max_concurrency or LLM_MAX_CONCURRENCY
+        self.timeout = timeout or LLM_TIMEOUT_SECONDS
+        self.max_retries = LLM_MAX_RETRIES if max_retries is None else max_retries
+
+    @property
+    def metrics_key(self) -> str:
+        return f"{self.provider}:{self.model_name}"
+
+    @property
+    def client_key(self) -> Tuple:
+        """相同 key 的实例共享 SDK 客户端和并发上限"""
+        return (self.provider,)
+
+    def _sdk_client(self):
+        clients = _loop_state()["clients"]
+        if self.client_key not in clients:
+            clients[self.client_key] = self._create_sdk_client()
+        return clients[self.client_key]
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        semaphores = _loop_state()["semaphores"]
+        if self.client_key not in semaphores:
+            semaphores[self.client_key] = asyncio.Semaphore(self.max_concurrency)
+        return semaphores[self.client_key]
+
+    @abstractmethod
+    def _create_sdk_client(self):
+        """创建 SDK 客户端（每个事件循环一个）"""
+        pass
+
+    @abstractmethod
+    async def _complete_once(self, sdk, prompt: str, system: Optional[str], **options) -> Tuple[str, int, int]:
+        """返回 (文本, 输入token数, 输出token数)"""
+        pass
+
+    @abstractmethod
+    def _stream_once(self, sdk, prompt: str, system: Optional[str], **options) -> AsyncIterator[Tuple[str, int, int]]:
+        """逐段产出 (文本, 输入token数, 输出token数)，token 数未知时为 0"""
+        pass
+
+    async def complete(self, prompt: str, system: str = None, **options) -> str:
+        """
+        单次补全，失败时按退避策略重试
+
+        Args:
+            prompt: 用户输入
+            system: 可选的系统提示词
+            options: temperature / max_tokens
+        """
+        start_time = time.perf_counter()
+        attempt = 0
+        async with self._semaphore():
+            while True:
+                attempt += 1
+                try:
+                    text, input_tokens, output_tokens = await asyncio.wait_for(
+                        self._complete_once(self._sdk_client(), prompt, system, **options), self.timeout
+                    )
+                    if not text:
+                        raise ValueError(f"Empty response from {self.provider}")
+                    break
+                except Exception as e:
+                    if attempt > self.max_retries or not is_retryable(e):
+                        llm_metrics.record(self.metrics_key, time.perf_counter() - start_time, attempt, False)
+                        logger.error(f"[LLM] {self.metrics_key} failed after {attempt} attempt(s): {e!r}")
+                        raise
+                    delay = backoff_delay(attempt - 1)
+                    logger.warning(f"[LLM] {self.metrics_key} attempt {attempt} failed ({e!r}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+
+        latency = time.perf_counter() - start_time
+        llm_metrics.record(self.metrics_key, latency, attempt, True, input_tokens, output_tokens)
+        logger.info(
+            f"[LLM] {self.metrics_key} {latency:.2f}s, attempts={attempt}, "
+            f"tokens in/out={input_tokens}/{output_tokens}"
+        )
+        return text
+
+    async def stream(self, prompt: str, system: str = None, **options) -> AsyncIterator[str]:
+        """
+        流式补全，逐段产出文本
+        只在尚未产出任何内容时重试；timeout 作用于每一段之间的等待
+        """
+        start_time = time.perf_counter()
+        attempt = 0
+        input_tokens = output_tokens = total_chars = 0
+        async with self._semaphore():
+            while True:
+                attempt += 1
+                iterator = self._stream_once(self._sdk_client(), prompt, system, **options).__aiter__()
+                try:
+                    while True:
+                        try:
+                            text, in_tokens, out_tokens = await asyncio.wait_for(iterator.__anext__(), self.timeout)
+                        except StopAsyncIteration:
+                            break
+                        input_tokens = in_tokens or input_tokens
+                        output_tokens = out_tokens or output_tokens
+                        if text:
+                            total_chars += len(text)
+                            yield text
+                    if total_chars == 0:
+                        raise ValueError(f"Empty response from {self.provider}")
+                    break
+                except Exception as e:
+                    if total_chars or attempt > self.max_retries or not is_retryable(e):
+                        llm_metrics.record(self.metrics_key, time.perf_counter() - start_time, attempt, False)
+                        logger.error(f"[LLM] {self.metrics_key} stream failed after {attempt} attempt(s): {e!r}")
+                        raise
+                    delay = backoff_delay(attempt - 1)
+                    logger.warning(f"[LLM] {self.metrics_key} stream attempt {attempt} failed ({e!r}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                finally:
+                    aclose = getattr(iterator, "aclose", None)
+                    if aclose:
+                        await aclose()
+
+        latency = time.perf_counter() - start_time
+        llm_metrics.record(self.metrics_key, latency, attempt, True, input_tokens, output_tokens)
+        logger.info(
+            f"[LLM] {self.metrics_key} stream {latency:.2f}s, {total_chars} chars, attempts={attempt}, "
+            f"tokens in/out={input_tokens}/{output_tokens}"
+        )
+
+
+class GeminiClient(AsyncLLMClient):
+    """Google Gemini（google-genai 的 aio 接口）"""
+
+    provider = "gemini"
+
+    def __init__(self, api_key: str, model_name: str, **kwargs):
+        super().__init__(model_name, **kwargs)
+        self.api_key = api_key
+
+    @property
+    def client_key(self) -> Tuple:
+        return (self.provider, self.api_key)
+
+    def _create_sdk_client(self):
+        from google import genai
+        return genai.Client(api_key=self.api_key)
+
+    @staticmethod
+    def _config(system: Optional[str], **options) -> Optional[Dict]:
+        config = {}
+        if system:
+            config["system_instruction"] = system
+        if options.get("temperature") is not None:
+            config["temperature"] = options["temperature"]
+        if options.get("max_tokens") is not None:
+            config["max_output_tokens"] = options["max_tokens"]
+        return config or None
+
+    @staticmethod
+    def _usage(response) -> Tuple[int, int]:
+        usage = getattr(response, "usage_metadata", None)
+        if not usage:
+            return 0, 0
+        return usage.prompt_token_count or 0, usage.candidates_token_count or 0
+
+    async def _complete_once(self, sdk, prompt, system, **options):
+        response = await sdk.aio.models.generate_content(
+            model=self.model_name,
+            contents=prompt,
+            config=self._config(system, **options)
+        )
+        return (response.text if response else None), *self._usage(response)
+
+    async def _stream_once(self, sdk, prompt, system, **options):
+        stream = await sdk.aio.models.generate_content_stream(
+            model=self.model_name,
+            contents=prompt,
+            config=self._config(system, **options)
+        )
+        async for chunk in stream:
+            yield (chunk.text if chunk else None), *self._usage(chunk)
+
+
+class OpenAICompatibleClient(AsyncLLMClient):
+    """OpenAI 兼容接口（DeepSeek 等）"""
+
+    provider = "openai"
+
+    def __init__(self, api_key: str, base_url: str, model_name: str, **kwargs):
+        super().__init__(model_name, **kwargs)
+        self.api_key = api_key
+        self.base_url = base_url
+
+    @property
+    def client_key(self) -> Tuple:
+        return (self.provider, self.base_url, self.api_key)
+
+    def _create_sdk_client(self):
+        from openai import AsyncOpenAI
+        # 重试和超时由本层统一处理
+        return AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0, timeout=self.timeout)
+
+    @staticmethod
+    def _messages(prompt: str, system: Optional[str]):
+        messages = [{"role": "system", "content": system}] if system else []
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    async def _complete_once(self, sdk, prompt, system, **options):
+        response = await sdk.chat.completions.create(
+            model=self.model_name,
+            messages=self._messages(prompt, system),
+            **{k: v for k, v in options.items() if v is not None}
+        )
+        usage = response.usage
+        return (
+            response.choices[0].message.content,
+            usage.prompt_tokens if usage else 0,
+            usage.completion_tokens if usage else 0,
+        )
+
+    async def _stream_once(self, sdk, prompt, system, **options):
+        stream = await sdk.chat.completions.create(
+            model=self.model_name,
+            messages=self._messages(prompt, system),
+            stream=True,
+            **{k: v for k, v in options.items() if v is not None}
+        )
+        async for chunk in stream:
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            usage = getattr(chunk, "usage", None)
+            yield text, (usage.prompt_tokens if usage else 0), (usage.completion_tokens if usage else 0)
+
+
+def approx_tokens(text: str) -> int:
+    """离线客户端使用的粗略 token 数（约 4 字符 1 token）"""
+    return (len(text or "") + 3) // 4
+
+
+def split_chunks(text: str, count: int):
+    """把文本切成 count 段，模拟流式输出"""
+    size = max(1, -(-len(text) // max(count, 1)))
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class StubLLMClient(AsyncLLMClient):
+    """
+    离线桩客户端：固定延迟后返回 responder(prompt) 生成的文本
+    仍然经过并发上限和调用统计，适合在无网络环境下测吞吐
+    """
+
+    provider = "stub"
+
+    def __init__(self, responder: Callable[[str], str] = None, model_name: str = "stub",
+                 latency: float = 1.0, stream_chunks: int = 20, **kwargs):
+        super().__init__(model_name, **kwargs)
+        self.responder = responder or (lambda prompt: f"stub response ({approx_tokens(prompt)} prompt tokens)")
+        self.latency = latency
+        self.stream_chunks = max(stream_chunks, 1)
+
+    @property
+    def client_key(self) -> Tuple:
+        return (self.provider, self.model_name)
+
+    def _create_sdk_client(self):
+        return None
+
+    async def _complete_once(self, sdk, prompt, system, **options):
+        await asyncio.sleep(self.latency)
+        text = self.responder(prompt)
+        return text, approx_tokens(prompt), approx_tokens(text)
+
+    async def _stream_once(self, sdk, prompt, system, **options):
+        text = self.responder(prompt)
+        chunks = split_chunks(text, self.stream_chunks)
+        for i, chunk in enumerate(chunks):
+            await asyncio.sleep(self.latency / len(chunks))
+            last = i == len(chunks) - 1
+            yield chunk, (approx_tokens(prompt) if last else 0), (approx_tokens(text) if last else 0)
+
+
+class ReplayMissError(LookupError):
+    """回放模式下没有找到对应 prompt 的录制结果"""
+
+
+class ReplayLLMClient:
+    """
+    录制/回放客户端，按 (模型, system, prompt, 参数) 的哈希保存响应
+    - record: 调用内部客户端，把响应写入 store_dir/<hash>.json
+    - replay: 只读取 store_dir，缺失时抛出 ReplayMissError，不访问网络
+    接口与 AsyncLLMClient 相同（complete / stream）
+    """
+
+    provider = "replay"
+
+    def __init__(self, store_dir, mode: str = "replay", inner: AsyncLLMClient = None,
+                 model_name: str = None, latency: Optional[float] = 0.0, stream_chunks: int = 20):
+        """
+        Args:
+            store_dir: 录制文件目录
+            mode: record | replay
+            inner: record 模式下实际调用的客户端
+            model_name: 计入哈希的模型名，默认取 inner.model_name
+            latency: 回放时的延迟（秒），None 表示按录制时的耗时
+            stream_chunks: 回放流式输出时切分的段数
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown replay mode: {mode}")
+        if mode == "record" and inner is None:
+            raise ValueError("record mode needs an inner client")
+        self.store_dir = Path(store_dir)
+        self.mode = mode
+        self.inner = inner
+        self.model_name = model_name or inner.model_name
+        self.latency = latency
+        self.stream_chunks = max(stream_chunks, 1)
+
+    @property
+    def metrics_key(self) -> str:
+        return f"{self.provider}:{self.model_name}"
+
+    def prompt_key(self, prompt: str, system: str = None, **options) -> str:
+        raw = json.dumps(
+            {"model": self.model_name, "system": system, "prompt": prompt,
+             "options": {k: v for k, v in sorted(options.items()) if v is not None}},
+            ensure_ascii=False, sort_keys=True
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.store_dir / f"{key}.json"
+
+    def _load(self, key: str) -> Dict:
+        path = self._path(key)
+        if not path.exists():
+            raise ReplayMissError(f"No recorded response for prompt {key[:12]} in {self.store_dir}")
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def _save(self, key: str, prompt: str, text: str, latency: float):
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        record = {
+            "model": self.model_name,
+            "prompt_sha256": key,
+            "prompt_chars": len(prompt),
+            "latency_seconds": round(latency, 3),
+            "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "response": text,
+        }
+        # 先写临时文件再替换，并发录制同一 prompt 时不会读到半个文件
+        tmp_path = self._path(key).with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(record, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self._path(key))
+
+    def _replay_delay(self, record: Dict) -> float:
+        return record.get("latency_seconds", 0.0) if self.latency is None else self.latency
+
+    async def complete(self, prompt: str, system: str = None, **options) -> str:
+        key = self.prompt_key(prompt, system, **options)
+        start_time = time.perf_counter()
+        if self.mode == "record":
+            text = await self.inner.complete(prompt, system, **options)
+            self._save(key, prompt, text, time.perf_counter() - start_time)
+            return text
+
+        try:
+            record = self._load(key)
+        except ReplayMissError:
+            llm_metrics.record(self.metrics_key, time.perf_counter() - start_time, 1, False)
+            raise
+        await asyncio.sleep(self._replay_delay(record))
+        text = record["response"]
+        llm_metrics.record(self.metrics_key, time.perf_counter() - start_time, 1, True,
+                           approx_tokens(prompt), approx_tokens(text))
+        return text
+
+    async def stream(self, prompt: str, system: str = None, **options) -> AsyncIterator[str]:
+        key = self.prompt_key(prompt, system, **options)
+        start_time = time.perf_counter()
+        if self.mode == "record":
+            parts = []
+            async for text in self.inner.stream(prompt, system, **options):
+                parts.append(text)
+                yield text
+            self._save(key, prompt, "".join(parts), time.perf_counter() - start_time)
+            return
+
+        try:
+            record = self._load(key)
+        except ReplayMissError:
+            llm_metrics.record(self.metrics_key, time.perf_counter() - start_time, 1, False)
+            raise
+        chunks = split_chunks(record["response"], self.stream_chunks)
+        delay = self._replay_delay(record) / max(len(chunks), 1)
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            yield chunk
+        llm_metrics.record(self.metrics_key, time.perf_counter() - start_time, 1, True,
+                           approx_tokens(prompt), approx_tokens(record["response"]))
@@ -32,6 +32,7 @@ project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
 
 from config import settings
+from DeepSentimentCrawling.MediaCrawler.database.models import create_index_concurrently
 
 def _env(key: str, default: Optional[str] = None) -> Optional[str]:
     v = os.getenv(key)
@@ -108,6 +109,11 @@ async def main() -> None:
 
     # 保持原有视图创建和释放逻辑
     dialect_name = engine.url.get_backend_name()
+    if dialect_name == "postgresql":
+        # 已存在的表上用 CREATE INDEX CONCURRENTLY 补建索引，不阻塞爬虫写入（需在事务外执行）
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.run_sync(create_index_concurrently, models_bigdata.WEIBO_NOTE_LIKED_INDEX)
     await _create_views_if_needed(dialect_name)
 
     await engine.dispose()
@@ -10,11 +10,22 @@
 """
 
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import Integer, String, BigInteger, Text, ForeignKey
+import sys
+from pathlib import Path
+
+from sqlalchemy import Integer, String, BigInteger, Text, ForeignKey, UniqueConstraint, Index
+from sqlalchemy.sql.elements import Grouping
 
 # 使用 models_sa 中的 Base，确保所有表在同一个 metadata 中，外键引用可以正常工作
 from models_sa import Base
 
+# 添加 MindSpider 目录到路径，复用 MediaCrawler 模型中的表达式，保证索引与 Daily Digest 查询一致
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from DeepSentimentCrawling.MediaCrawler.database.models import numeric_text
+
 class BilibiliVideo(Base):
     __tablename__ = "bilibili_video"
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -239,6 +250,15 @@ class WeiboNote(Base):
     topic_id: Mapped[str | None] = mapped_column(String(64), ForeignKey("daily_topics.topic_id", ondelete="SET NULL"), nullable=True)
     crawling_task_id: Mapped[str | None] = mapped_column(String(64), ForeignKey("crawling_tasks.task_id", ondelete="SET NULL"), nullable=True)
 
+# 按关键词、平台取点赞数 Top-K 的表达式索引（仅 PostgreSQL，与 MediaCrawler database/models.py 一致）
+WEIBO_NOTE_LIKED_INDEX = Index(
+    'idx_weibo_note_keyword_platform_liked',
+    WeiboNote.source_keyword,
+    WeiboNote.platform,
+    Grouping(numeric_text(WeiboNote.liked_count)).desc(),
+)
+WEIBO_NOTE_LIKED_INDEX.ddl_if(dialect='postgresql')
+
 class WeiboNoteComment(Base):
     __tablename__ = "weibo_note_comment"
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -466,3 +486,14 @@ class ZhihuCreator(Base):
     get_voteup_count: Mapped[int | None] = mapped_column(Integer, default=0, nullable=True)
     add_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     last_modify_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+
+
+class CrawlWatermark(Base):
+    __tablename__ = "crawl_watermark"
+    __table_args__ = (UniqueConstraint("platform", "source_keyword", name="uq_crawl_watermark_platform_keyword"),)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    platform: Mapped[str] = mapped_column(String(50), nullable=False)
+    source_keyword: Mapped[str] = mapped_column(String(255), nullable=False)
+    last_create_time: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    last_note_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    last_modify_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
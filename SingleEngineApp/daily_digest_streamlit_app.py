@@ -1,6 +1,9 @@
 import streamlit as st
 import sys
 import os
+import re
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
 
 # Add project root to sys.path
@@ -8,18 +11,240 @@ project_root = Path(__file__).resolve().parents[1]
 if str(project_root) not in sys.path:
     sys.path.append(str(project_root))
 
-from DailyDigest.core import run_digest_generation, run_crawl
-from DailyDigest.email_service import send_report_email
+from DailyDigest.jobs import get_job_manager, ACTIVE_STATUSES, MAX_COMPARE_KEYWORDS
+from DailyDigest.email_service import load_recipients, recipients_path
+from DailyDigest.email_outbox import get_outbox_worker, queue_report_email
+from DailyDigest.models import (
+    get_engine, get_history_version, get_digest_history_page, get_digest_by_id, get_sentiment_series,
+    get_outbox_status
+)
+
+# 后台任务轮询间隔（秒）
+JOB_POLL_SECONDS = 1.0
+# 历史记录每页条数
+HISTORY_PAGE_SIZE = 20
+# 历史列表和情绪走势的缓存时间（秒）：本进程保存新摘要时立即失效，其他进程（如批量任务）写入的记录最多延迟这么久
+HISTORY_CACHE_TTL = 60
 
 st.set_page_config(page_title="Daily Digest", page_icon="📰", layout="wide")
 
+# ===== 缓存数据层 =====
+# Streamlit 每次交互都会重新执行整个脚本：后台服务只初始化一次，查询结果在所有会话间共享。
+# 历史相关的查询把历史版本号作为缓存键，保存新摘要后版本号变化，旧结果不再命中。
+
+@st.cache_resource(show_spinner=False)
+def init_services():
+    """数据库连接池、后台任务管理器和邮件发送线程，进程内只初始化一次"""
+    get_engine()
+    return get_job_manager(), get_outbox_worker()
+
+@st.cache_data(ttl=HISTORY_CACHE_TTL, max_entries=200, show_spinner=False)
+def cached_history_page(keyword, date_from, date_to, cursor, version):
+    return get_digest_history_page(keyword or None, date_from, date_to, cursor=cursor, limit=HISTORY_PAGE_SIZE)
+
+@st.cache_data(ttl=HISTORY_CACHE_TTL, max_entries=100, show_spinner=False)
+def cached_sentiment_series(keyword, granularity, since, version):
+    return get_sentiment_series(keyword, granularity, since=since)
+
+@st.cache_data(max_entries=100, show_spinner=False)
+def cached_digest(history_id):
+    """历史记录详情（写入后不再修改）；找不到时抛出 LookupError，不缓存空结果"""
+    history_data = get_digest_by_id(history_id)
+    if history_data is None:
+        raise LookupError(history_id)
+    return history_data
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def cached_recipients(path, mtime):
+    return load_recipients()
+
+def get_recipients():
+    """收件人列表，recipients.json 修改后（mtime 变化）重新读取"""
+    path = recipients_path()
+    return cached_recipients(str(path), path.stat().st_mtime) if path else []
+
+def invalidate_history_cache():
+    """清空历史列表和情绪走势缓存（例如其他进程写入了新记录）"""
+    cached_history_page.clear()
+    cached_sentiment_series.clear()
+
+# 摘要在后台线程池中生成，页面只提交任务并轮询状态；邮件写入发件箱后由后台线程发送，页面不等待 SMTP
+job_manager, _ = init_services()
+
+def set_job_query_param(job_id):
+    """把任务ID写入URL，刷新页面后可以重新关联到正在运行的任务"""
+    try:
+        if job_id:
+            st.query_params["job"] = job_id
+        elif "job" in st.query_params:
+            del st.query_params["job"]
+    except AttributeError:
+        # 旧版本 Streamlit 不支持修改 query params，可在侧边栏的后台任务列表中重新关联
+        pass
+
+def attach_job(job_id):
+    st.session_state.job_id = job_id
+    set_job_query_param(job_id)
+
+def detach_job():
+    st.session_state.pop('job_id', None)
+    set_job_query_param(None)
+
+def parse_keywords(text):
+    """对比模式的关键词列表：逗号、空格或换行分隔，去重并保持顺序"""
+    keywords = [k.strip() for k in re.split(r"[,，\s]+", text or "") if k.strip()]
+    return list(dict.fromkeys(keywords))
+
+def is_comparison(job):
+    result = job.get('result')
+    return isinstance(result, dict) and result.get('kind') == 'compare'
+
+def reset_history_pages(filters):
+    """筛选条件变化时清空已加载的历史记录"""
+    st.session_state.history_filters = filters
+    st.session_state.history_items = None  # None 表示尚未加载
+    st.session_state.history_cursor = None
+
+def load_history_page():
+    """按当前筛选条件加载下一页历史记录，追加到已加载列表"""
+    keyword, date_from, date_to, version = st.session_state.history_filters
+    page = cached_history_page(keyword, date_from, date_to, st.session_state.history_cursor, version)
+    st.session_state.history_items = (st.session_state.history_items or []) + page['items']
+    st.session_state.history_cursor = page['next_cursor']
+
 st.title("📰 Daily Sentiment Digest")
 st.markdown("一键爬取Reddit、Stocktwits数据并生成情绪摘要分析")
 
+def render_timings(timings):
+    """各阶段耗时面板（爬取、查询、提示词构建、LLM、解析、保存）"""
+    spans = timings.get("spans", [])
+    if not spans:
+        return
+    with st.expander(f"⏱️ Timings ({timings.get('total_seconds', 0):.2f}s)"):
+        rows = []
+        for span in spans:
+            details = {k: v for k, v in span.items() if k not in ("stage", "start", "seconds")}
+            rows.append({
+                "stage": span["stage"],
+                "start (s)": span.get("start", 0),
+                "seconds": span.get("seconds", 0),
+                "details": ", ".join(f"{k}={v}" for k, v in details.items()),
+            })
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+
+def render_sentiment_trend(keyword):
+    """关键词情绪走势图（读取预先汇总的按天/按小时分桶）"""
+    st.markdown("### 📈 情绪走势")
+    granularity = st.radio("粒度", ["day", "hour"], horizontal=True, key=f"trend_granularity_{keyword}",
+                           format_func=lambda g: "按天" if g == "day" else "按小时（近7天）")
+    # 起点取整到小时，同一小时内的重复渲染命中缓存
+    since = (datetime.now() - timedelta(days=7)).replace(minute=0, second=0, microsecond=0) \
+        if granularity == "hour" else None
+    series = cached_sentiment_series(keyword, granularity, since, get_history_version())
+    if len(series) < 2:
+        st.caption("历史数据不足，生成更多摘要后可查看走势")
+        return
+    st.line_chart(series, x="bucket", y=["avg_score", "min_score", "max_score"], height=260)
+    st.bar_chart(series, x="bucket", y="post_count", height=160)
+
+def render_email_status(message_id):
+    """发件箱投递状态（邮件在后台发送，点击刷新查看最新进度）"""
+    status = get_outbox_status(message_id)
+    if not status or not status['total']:
+        return
+    in_flight = status['pending'] + status['sending']
+    summary = f"已发送 {status['sent']}/{status['total']}" + (f"，失败 {status['failed']}" if status['failed'] else "")
+    if in_flight:
+        st.info(f"📬 {summary}，发送中 {in_flight}（后台发送，可继续操作）")
+        st.button("🔄 刷新发送状态", key=f"email_status_{message_id}")
+    elif status['failed']:
+        st.warning(f"📬 {summary}")
+    else:
+        st.success(f"✅ {summary}")
+    failed = [r for r in status['results'] if r['status'] == 'failed' or (r['status'] == 'pending' and r['last_error'])]
+    if failed:
+        st.dataframe(failed, use_container_width=True, hide_index=True)
+
+COMPARE_STAGE_LABELS = {'crawl': "🕷️ 正在爬取...", 'digest': "🧠 正在生成摘要..."}
+
+def render_comparison_column(keyword, entry, stage, running):
+    """对比模式中单个关键词的一列：结果到达前显示当前阶段"""
+    st.markdown(f"### {keyword}")
+    if entry is None:
+        if running:
+            st.info(COMPARE_STAGE_LABELS.get(stage, "⏳ 排队中..."))
+        else:
+            st.warning("未完成")
+        return
+    if not entry['success']:
+        st.error(entry.get('error') or "摘要生成失败")
+        return
+
+    result = entry['result']
+    card = result.get('cover_card') or {}
+    score = float(card.get('sentiment_score', 5))
+    st.metric("情绪评分", f"{score:.1f}/10", card.get('sentiment_label', ''), delta_color="off")
+    if card.get('headline'):
+        st.markdown(f"**{card['headline']}**")
+    caption = f"{result.get('post_count', 0)} 条帖子 · 用时 {entry['timings'].get('total', 0)}s"
+    st.caption(caption + (" · ⚡ 缓存" if entry.get('cache_hit') else ""))
+    for factor in card.get('key_factors', []):
+        st.markdown(f"- {factor}")
+    with st.expander("📝 Summary"):
+        st.markdown(result['summary'])
+    if entry.get('history_id') and st.button("📖 查看完整报告", key=f"compare_open_{keyword}",
+                                             use_container_width=True):
+        st.session_state.view_history_id = entry['history_id']
+        st.rerun()
+
+def render_comparison(compare, running=False):
+    """多关键词对比：每个关键词一列，各列在结果生成后立即显示"""
+    keywords = compare['keywords']
+    entries = compare.get('entries', {})
+    stages = compare.get('stages', {})
+
+    done = [entries[k] for k in keywords if entries.get(k, {}).get('success')]
+    if len(done) >= 2:
+        rows = [{
+            "keyword": e['keyword'],
+            "sentiment_score": float((e['result'].get('cover_card') or {}).get('sentiment_score', 5)),
+            "sentiment": (e['result'].get('cover_card') or {}).get('sentiment_label', ''),
+            "posts": e['result'].get('post_count', 0),
+            "seconds": e['timings'].get('total', 0),
+        } for e in done]
+        chart_col, table_col = st.columns([1, 2])
+        with chart_col:
+            st.bar_chart(rows, x="keyword", y="sentiment_score", height=220)
+        with table_col:
+            st.dataframe(rows, use_container_width=True, hide_index=True)
+
+    for column, keyword in zip(st.columns(len(keywords)), keywords):
+        with column:
+            render_comparison_column(keyword, entries.get(keyword), stages.get(keyword), running)
+
+    if not running and done:
+        render_comparison_trend([e['keyword'] for e in done])
+
+def render_comparison_trend(keywords):
+    """各关键词按天的平均情绪走势（同一张图）"""
+    version = get_history_version()
+    rows = [dict(point, keyword=keyword) for keyword in keywords
+            for point in cached_sentiment_series(keyword, "day", None, version)]
+    if len({row['bucket'] for row in rows}) < 2:
+        return
+    st.markdown("### 📈 情绪走势对比")
+    st.line_chart(rows, x="bucket", y="avg_score", color="keyword", height=260)
+
 # 渲染结果函数
 def render_digest_result(result, keyword):
     """渲染摘要结果，包括卡片、摘要和热门讨论"""
     st.success(f"✅ 基于 {result['post_count']} 条帖子生成摘要")
+    if result.get("cache_hit"):
+        st.caption("⚡ 帖子数据未变化，已直接使用缓存结果（未调用 LLM）")
+    if result.get("truncated"):
+        st.warning("⚠️ 时间窗口内帖子超过读取上限（DIGEST_MAX_POSTS），只使用了最新的部分帖子，更早的帖子未纳入摘要")
+    if result.get("timings"):
+        render_timings(result["timings"])
     
     # Display Cover Card if available
     if result.get("cover_card"):
@@ -240,29 +465,19 @@ def render_digest_result(result, keyword):
             with st.expander(f"热度: {post['score']} | 💬 {post['comments']}"):
                 st.write(post['content'])
 
+    render_sentiment_trend(keyword)
     
     # --- Email Report Section ---
     st.divider()
     st.subheader("📧 Send Report via Email")
     
     # --- Address Book Logic ---
-    import json
-    from pathlib import Path
+    recipients_list = get_recipients()
     
-    RECIPIENTS_FILE = Path("SingleEngineApp/recipients.json")
-    if not RECIPIENTS_FILE.exists():
-        RECIPIENTS_FILE = Path("recipients.json") # Fallback relative path
-        
-    def load_recipients():
-        if RECIPIENTS_FILE.exists():
-            try:
-                with open(RECIPIENTS_FILE, "r") as f:
-                    return json.load(f)
-            except:
-                return []
-        return []
-
-    recipients_list = load_recipients()
+    # Ensure date_str is only date, no time
+    raw_date = str(result.get("date", "Unknown Date"))
+    date_str = raw_date.split(" ")[0]
+    subject = f"WGD Daily Digest: {result.get('cover_card', {}).get('ticker', keyword)} {date_str}"
     
     with st.expander("Email this report", expanded=True):
         email_col1, email_col2 = st.columns([3, 1])
@@ -277,29 +492,26 @@ def render_digest_result(result, keyword):
             st.write("") # Spacer
             st.write("") # Spacer
             send_email_btn = st.button("Send Email", type="primary", use_container_width=True, disabled=not recipients_list)
+        
+        send_all_btn = st.button(f"📨 Send to all ({len(recipients_list)})", use_container_width=True,
+                                 disabled=len(recipients_list) < 2)
             
-        if send_email_btn and selected_recipient:
-            with st.spinner(f"Sending email to {selected_recipient}..."):
-                # Prepare data
-                # Ensure date_str is only date, no time
-                raw_date = str(result.get("date", "Unknown Date"))
-                date_str = raw_date.split(" ")[0]
-                subject = f"WGD Daily Digest: {result.get('cover_card', {}).get('ticker', keyword)} {date_str}"
-                
-                # Call backend
-                success_result = send_report_email(
-                    to_email=selected_recipient,
-                    subject=subject,
-                    summary_md=result["summary"],
-                    cover_card=result.get("cover_card"),
-                    ticker=keyword,
-                    date_str=date_str
-                )
-                
-                if success_result["success"]:
-                    st.success(f"✅ Email sent successfully to {selected_recipient}!")
-                else:
-                    st.error(f"❌ {success_result['message']}")
+        if (send_email_btn and selected_recipient) or send_all_btn:
+            queued = queue_report_email(
+                recipients=recipients_list if send_all_btn else [selected_recipient],
+                subject=subject,
+                summary_md=result["summary"],
+                cover_card=result.get("cover_card"),
+                ticker=keyword,
+                date_str=date_str
+            )
+            if queued["success"]:
+                st.session_state.email_message_id = queued["message_id"]
+            else:
+                st.error(f"❌ {queued['message']}")
+        
+        if st.session_state.get('email_message_id'):
+            render_email_status(st.session_state.email_message_id)
 
 # Sidebar configuration
 with st.sidebar:
@@ -317,7 +529,26 @@ with st.sidebar:
         default_keyword = query_params.get("query", [""])[0]
         auto_run = query_params.get("auto_search", ["false"])[0].lower() == "true"
     
-    keyword = st.text_input("Keyword", value=default_keyword, placeholder="e.g., IONQ, TSLA")
+    # 刷新页面后按URL中的任务ID重新关联
+    try:
+        url_job_id = st.query_params.get("job")
+    except AttributeError:
+        url_job_id = st.experimental_get_query_params().get("job", [None])[0]
+    if url_job_id and 'job_id' not in st.session_state and not st.session_state.get('job_done') == url_job_id:
+        st.session_state.job_id = url_job_id
+    
+    compare_mode = st.toggle("🆚 多关键词对比", key="compare_mode",
+                             help=f"同时生成最多 {MAX_COMPARE_KEYWORDS} 个关键词的摘要并排对比")
+    if compare_mode:
+        compare_keywords = parse_keywords(st.text_input(
+            "Keywords", key="compare_keywords", placeholder="e.g., NVDA, AMD, INTC"
+        ))
+        if len(compare_keywords) > MAX_COMPARE_KEYWORDS:
+            st.caption(f"最多对比 {MAX_COMPARE_KEYWORDS} 个关键词，只使用前 {MAX_COMPARE_KEYWORDS} 个")
+            compare_keywords = compare_keywords[:MAX_COMPARE_KEYWORDS]
+        keyword = ""
+    else:
+        keyword = st.text_input("Keyword", value=default_keyword, placeholder="e.g., IONQ, TSLA")
     hours = st.slider("Time Window (Hours)", min_value=1, max_value=72, value=24)
     
     st.divider()
@@ -331,36 +562,58 @@ with st.sidebar:
     
     generate_btn = st.button("🚀 生成 Digest", type="primary", use_container_width=True)
 
+    # 后台任务（其他页面/刷新前提交的任务也可以在这里重新关联）
+    active_jobs = job_manager.active_jobs()
+    if active_jobs:
+        st.markdown("---")
+        st.subheader("⏳ 后台任务")
+        for job in active_jobs:
+            label = f"{job['keyword']} ({job['hours']}h) · {'排队中' if job['status'] == 'queued' else job['stage'] or '运行中'}"
+            if st.button(label, key=f"attach_{job['job_id']}", use_container_width=True,
+                         disabled=st.session_state.get('job_id') == job['job_id']):
+                st.session_state.pop('view_history_id', None)
+                attach_job(job['job_id'])
+                st.rerun()
+
     # 历史记录
     st.markdown("---")
     st.subheader("📚 历史记录")
     
-    # 刷新历史列表按钮
+    # 筛选条件：关键词、日期范围；条件变化或点击刷新时从第一页重新加载
+    history_keyword = st.text_input("按关键词筛选", key="history_keyword", placeholder="例如 TSLA，留空显示全部")
+    history_dates = st.date_input("日期范围", value=[], key="history_dates")
+    date_from = history_dates[0] if len(history_dates) > 0 else None
+    date_to = history_dates[1] if len(history_dates) > 1 else date_from
+    # 保存新摘要后版本号变化，已加载的列表随之重置
+    history_filters = (history_keyword.strip(), date_from, date_to, get_history_version())
+    
     if st.button("🔄 刷新列表", use_container_width=True):
-        st.rerun()
+        # 手动刷新时丢弃缓存，显示其他进程刚写入的记录
+        invalidate_history_cache()
+        reset_history_pages(history_filters)
+    elif st.session_state.get('history_filters') != history_filters:
+        reset_history_pages(history_filters)
     
-    # 获取历史记录列表
     try:
-        from DailyDigest.models import get_digest_history_list
-        history_list = get_digest_history_list(limit=20)
+        if st.session_state.history_items is None:
+            load_history_page()
         
-        if history_list:
-            # 使用选择框显示历史
-            history_options = [
-                f"{h['created_at']} - {h['keyword']} ({h['sentiment_label']}, {h['post_count']}条)"
-                for h in history_list
-            ]
-            
-            selected_index = st.selectbox(
-                "选择历史记录",
-                range(len(history_options)),
-                format_func=lambda i: history_options[i],
-                key="history_selector"
-            )
-            
-            if st.button("📖 查看此记录", use_container_width=True):
-                st.session_state.view_history_id = history_list[selected_index]['id']
-                st.rerun()
+        history_items = st.session_state.history_items
+        if history_items:
+            # 固定高度的滚动列表，滚到底部点击"加载更多"继续向前翻
+            with st.container(height=420):
+                for h in history_items:
+                    label = f"{h['created_at']} · {h['keyword']} ({h['sentiment_label']}, {h['post_count']}条)"
+                    if st.button(label, key=f"history_{h['id']}", use_container_width=True,
+                                 disabled=st.session_state.get('view_history_id') == h['id']):
+                        st.session_state.view_history_id = h['id']
+                        st.rerun()
+                if st.session_state.history_cursor is not None:
+                    if st.button("⬇️ 加载更多", key="history_more", use_container_width=True):
+                        load_history_page()
+                        st.rerun()
+                else:
+                    st.caption(f"共 {len(history_items)} 条，已全部加载")
         else:
             st.info("暂无历史记录")
     except Exception as e:
@@ -371,8 +624,10 @@ with st.sidebar:
 # 检查是否要查看历史记录
 if 'view_history_id' in st.session_state and st.session_state.view_history_id:
     try:
-        from DailyDigest.models import get_digest_by_id
-        history_data = get_digest_by_id(st.session_state.view_history_id)
+        try:
+            history_data = cached_digest(st.session_state.view_history_id)
+        except LookupError:
+            history_data = None
         
         if history_data:
             st.info(f"📖 正在查看历史记录 - {history_data['keyword']} ({history_data['created_at']})")
@@ -399,65 +654,69 @@ if 'view_history_id' in st.session_state and st.session_state.view_history_id:
         st.error(f"加载历史记录失败: {e}")
         del st.session_state.view_history_id
 # Handle "Generate" Action (State Update)
-if generate_btn or (auto_run and keyword):
-    if not keyword:
+if generate_btn or (auto_run and keyword and not st.session_state.get('auto_run_submitted')):
+    if auto_run:
+        # URL 自动运行只提交一次，轮询刷新时不再重复提交
+        st.session_state.auto_run_submitted = True
+    if compare_mode and generate_btn:
+        if len(compare_keywords) < 2:
+            st.error("请输入至少两个关键词（用逗号分隔）")
+        else:
+            st.session_state.pop('view_history_id', None)
+            attach_job(job_manager.submit_comparison(compare_keywords, hours, auto_crawl=auto_crawl,
+                                                     max_count=max_posts))
+    elif not keyword:
         st.error("请输入关键词")
     else:
-        if auto_crawl:
-            # 分开调用爬取和生成，实现同步进度显示
-            with st.status("🔄 正在处理...", expanded=True) as status:
-                # 步骤1: 爬取数据 (Reddit + Stocktwits + Hacker News)
-                st.write("📡 步骤 1/2: 正在爬取 Reddit, Stocktwits 和 Hacker News 数据...")
-                st.info("💡 过程: Reddit Crawl -> Stocktwits Crawl -> Hacker News Crawl")
-                
-                try:
-                    # 调用爬取函数
-                    crawl_success, crawl_message, post_count = run_crawl(keyword, max_posts, hours)
-                    
-                    # 显示爬取结果
-                    if crawl_success:
-                        st.write(f"✅ {crawl_message}")
-                        
-                        # 步骤2: 生成摘要
-                        st.write(f"📊 步骤 2/2: 生成情绪摘要...")
-                        
-                        # 调用生成函数
-                        digest_result = run_digest_generation(keyword, hours)
-                        
-                        # 检查摘要生成结果
-                        if digest_result["success"]:
-                            status.update(label="✅ 处理完成！", state="complete", expanded=False)
-                            # Store in session state
-                            st.session_state['current_result'] = digest_result
-                            st.session_state['current_keyword'] = keyword
-                        else:
-                            status.update(label="⚠️ 摘要生成失败", state="error")
-                            st.error(digest_result["message"])
-                    else:
-                        status.update(label="❌ 爬取失败", state="error")
-                        st.error(crawl_message)
-                        
-                except Exception as e:
-                    status.update(label="❌ 处理失败", state="error")
-                    st.error(f"发生错误: {str(e)}")
-            
+        # 提交后台任务，页面立即返回，之后轮询任务状态
+        st.session_state.pop('view_history_id', None)
+        attach_job(job_manager.submit(keyword, hours, auto_crawl=auto_crawl, max_count=max_posts))
+
+def render_job_progress(job):
+    """显示任务进度事件和流式生成的摘要"""
+    for event in job['progress']:
+        st.write(event['message'])
+    if job.get('partial_summary'):
+        st.markdown(job['partial_summary'])
+
+# 当前关联的后台任务
+job_running = False
+if st.session_state.get('job_id'):
+    job = job_manager.get(st.session_state.job_id)
+    if job is None:
+        st.warning("未找到该后台任务")
+        detach_job()
+    elif job['status'] in ACTIVE_STATUSES:
+        job_running = True
+        label = "⏳ 排队中..." if job['status'] == 'queued' else "🔄 正在处理..."
+        with st.status(label, expanded=not is_comparison(job)):
+            st.caption(f"任务 {job['job_id'][:8]} · {job['keyword']} · 任务在后台运行，刷新或关闭页面不会中断")
+            render_job_progress(job)
+        if is_comparison(job) and not st.session_state.get('view_history_id'):
+            # 对比任务：已完成的关键词先显示，其余列显示当前阶段
+            render_comparison(job['result'], running=True)
+    else:
+        # 任务结束：成功的结果放入会话状态，失败的显示原因
+        st.session_state.job_done = job['job_id']
+        detach_job()
+        job_manager.forget(job['job_id'])
+        if job['status'] == 'succeeded' and is_comparison(job):
+            st.session_state['current_comparison'] = job['result']
+            st.session_state.pop('current_result', None)
+            st.rerun()
+        elif job['status'] == 'succeeded' and job.get('result'):
+            st.session_state['current_result'] = job['result']
+            st.session_state['current_keyword'] = job['keyword']
+            st.session_state.pop('current_comparison', None)
+            # 新记录已写入历史表（历史版本号已变化）：重新渲染，侧边栏列表随之刷新
+            st.rerun()
         else:
-            # 仅生成摘要（使用已有数据）
-            with st.spinner(f"正在分析 '{keyword}' 的情绪..."):
-                try:
-                    result = run_digest_generation(keyword, hours)
-                    
-                    if result["success"]:
-                        # Store in session state
-                        st.session_state['current_result'] = result
-                        st.session_state['current_keyword'] = keyword
-                    else:
-                        st.warning(result["message"])
-                        if "No posts found" in result["message"]:
-                            st.info("提示: 请先勾选'自动爬取数据'或手动运行爬虫获取数据")
-                            
-                except Exception as e:
-                    st.error(f"发生错误: {str(e)}")
+            with st.status("⚠️ 处理失败", state="error", expanded=True):
+                render_job_progress(job)
+            message = job.get('error') or "未知错误"
+            st.error(message)
+            if "No posts found" in message:
+                st.info("提示: 请先勾选'自动爬取数据'或手动运行爬虫获取数据")
 
 # Remove view_history logic here because it's handled above or we check state priority
 # Render Logic: Decide what to show
@@ -471,8 +730,20 @@ if 'view_history_id' in st.session_state and st.session_state.view_history_id:
     # IF 'view_history_id' is NOT present, THEN we check for 'current_result'.
     pass 
 
+elif job_running:
+    # 任务进度已在上方显示
+    pass
+
+elif 'current_comparison' in st.session_state:
+    render_comparison(st.session_state['current_comparison'])
+
 elif 'current_result' in st.session_state:
     render_digest_result(st.session_state['current_result'], st.session_state['current_keyword'])
 
 else:
     st.info("👈 在侧边栏输入关键词并点击'生成 Digest'开始")
+
+# 任务运行中：无论当前显示什么（包括查看历史记录），等待后刷新页面以更新进度、接收结果
+if job_running:
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()